@@ -0,0 +1,6 @@
+import os
+
+# Benchmarks run against their own database; the app modules read these at import
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "postgresql://localhost/fitness_tracker_bench")
+os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
@@ -0,0 +1,61 @@
+"""
+Benchmark the training-load analytics over five years of daily training.
+
+Rows are generated in the same (epoch_seconds, volume, intensity_code) shape
+the history query returns, so the timings cover array construction as well
+as the vectorized computations. No database is needed.
+
+    python -m benchmarks.bench_analytics --years 5 --sets-per-day 24
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+from src.analytics.history import history_from_rows
+from src.analytics.training_load import compute_training_load
+
+
+def generate_rows(years: int, sets_per_day: int, seed: int = 42):
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1, 7, 0, tzinfo=timezone.utc).timestamp()
+    rows = []
+    for day in range(years * 365):
+        session_start = start + day * 86400 + rng.randint(0, 600) * 60
+        for i in range(sets_per_day):
+            weight = rng.choice([0, 45, 95, 135, 185, 225, 275])
+            rows.append((
+                session_start + 180.0 * i,
+                rng.randint(1, 15) * weight,
+                rng.randint(0, 2),
+            ))
+    return rows
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--sets-per-day", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.years, args.sets_per_day)
+    history, build = timed(lambda: history_from_rows(rows), args.repeat)
+    _, compute = timed(lambda: compute_training_load(history), args.repeat)
+
+    print(f"{len(rows)} sets over {args.years * 365} days")
+    for name, samples in (("history_from_rows", build), ("compute_training_load", compute)):
+        print(f"  {name:<22} median {statistics.median(samples) * 1000:8.2f} ms   best {min(samples) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Response size and server time for the heaviest user's session list and
+stats, per content coding, against the seeded benchmark database.
+
+    python -m benchmarks.bench_compression --repeat 10
+"""
+import argparse
+import os
+from benchmarks import BENCH_DATABASE_URL
+from benchmarks.harness import measure
+
+CODINGS = ("identity", "gzip", "br")
+PATHS = ("/sessions/", "/stats/training-load?days=365", "/stats/calendar")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response sizes and times per content coding")
+    parser.add_argument("--url", default=BENCH_DATABASE_URL)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.url
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    from fastapi.testclient import TestClient
+    from benchmarks.loadtest import load_accounts
+    from main import app
+    from src.auth import create_access_token
+
+    [username] = load_accounts(args.url, 1)
+    token = create_access_token({"sub": username})
+    with TestClient(app) as client:
+        for path in PATHS:
+            for coding in CODINGS:
+                headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": coding}
+                # Content-Length is the size on the wire; httpx decodes the body
+                response = client.get(path, headers=headers)
+                size = int(response.headers.get("content-length", len(response.content)))
+                timing = measure(lambda: client.get(path, headers=headers), args.repeat)
+                print(f"{path:<32} {coding:<9} {size:>10,} bytes   median {timing['median_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Flat set-level export versus rebuilding the same table from nested JSON.
+
+For the heaviest seeded user, times GET /sessions/ followed by flattening
+the session tree in Python (what consumers did before the export),
+against GET /sessions/export in each format. Reports wall time, bytes on
+the wire and the peak Python memory allocated while handling one request.
+
+    python -m benchmarks.bench_export --repeat 5
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from benchmarks import BENCH_DATABASE_URL
+
+
+def flatten_sessions(sessions: list) -> list:
+    return [
+        (session["started_at"], session["finished_at"], workout["name"], workout["started_at"], workout["finished_at"],
+         set_["started_at"], set_["finished_at"], set_["reps"]["count"], set_["reps"]["intensity"], set_["reps"]["weight"])
+        for session in sessions
+        for workout in session["workouts"]
+        for set_ in workout["sets"]
+    ]
+
+
+def _measure(fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": sorted(timings)[len(timings) // 2] * 1000, "peak_mb": peak / 1e6, "result": result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=BENCH_DATABASE_URL)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.url
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    from fastapi.testclient import TestClient
+    from benchmarks.loadtest import load_accounts
+    from main import app
+    from src.auth import create_access_token
+    from src.export import available_formats
+
+    [username] = load_accounts(args.url, 1)
+    # identity, so the sizes compare the formats themselves
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': username})}", "Accept-Encoding": "identity"}
+    with TestClient(app) as client:
+        def nested():
+            response = client.get("/sessions/", headers=headers)
+            return len(response.content), len(flatten_sessions(response.json()))
+
+        cases = {"nested JSON + flatten": nested}
+        for fmt in available_formats():
+            def flat(fmt=fmt):
+                response = client.get("/sessions/export", params={"format": fmt}, headers=headers)
+                return len(response.content), None
+            cases[f"export {fmt}"] = flat
+
+        for name, fn in cases.items():
+            timing = _measure(fn, args.repeat)
+            size, rows = timing["result"]
+            print(f"{name:<24} median {timing['median_ms']:8.1f} ms  {size:>12,} bytes  peak {timing['peak_mb']:7.1f} MB"
+                  + (f"  ({rows:,} sets)" if rows is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
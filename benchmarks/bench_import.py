@@ -0,0 +1,108 @@
+"""
+Throughput and peak memory of the streaming session importer.
+
+Writes a synthetic export of --sessions sessions (JSON Lines or one JSON
+array) to a temporary file, imports it for a throwaway user with
+src.processor.import_file and reports sessions/s, sets/s and the process's
+peak RSS. Run it at two sizes to check that memory does not grow with
+the file; the imported rows are deleted afterwards.
+
+    python -m benchmarks.bench_import --sessions 50000 --format array --workers 2
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, delete
+from benchmarks import BENCH_DATABASE_URL
+from benchmarks.generator import BODYWEIGHT, EXERCISES, INTENSITIES
+from src.db_models import User, ImportCheckpointDB
+from src.processor import import_file
+
+
+def synthetic_session(rng: random.Random, started: datetime) -> dict:
+    cursor = started
+    workouts = []
+    for name in rng.sample(EXERCISES, rng.randint(3, 6)):
+        workout_started = cursor
+        base_weight = None if name in BODYWEIGHT else rng.choice(range(45, 320, 5))
+        sets = []
+        for i in range(rng.randint(3, 5)):
+            set_started = cursor
+            cursor += timedelta(seconds=rng.randint(30, 90))
+            sets.append({
+                "started_at": set_started.isoformat(),
+                "finished_at": cursor.isoformat(),
+                "reps": {
+                    "count": rng.randint(3, 15),
+                    "intensity": rng.choice(INTENSITIES),
+                    "weight": None if base_weight is None else base_weight + 10 * i,
+                },
+            })
+            cursor += timedelta(seconds=rng.randint(60, 180))
+        workouts.append({"name": name, "started_at": workout_started.isoformat(), "finished_at": cursor.isoformat(), "sets": sets})
+    return {"session": {"started_at": started.isoformat(), "finished_at": cursor.isoformat(), "notes": "imported", "workouts": workouts}}
+
+
+def write_export(path: str, sessions: int, fmt: str, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    # Two hours apart, ending now
+    day = datetime.now().replace(microsecond=0) - timedelta(hours=2 * sessions)
+    with open(path, "w") as file:
+        if fmt == "array":
+            file.write("[\n")
+        for i in range(sessions):
+            record = json.dumps(synthetic_session(rng, day + timedelta(hours=2 * i)))
+            if fmt == "array":
+                file.write(record + (",\n" if i < sessions - 1 else "\n"))
+            else:
+                file.write(record + "\n")
+        if fmt == "array":
+            file.write("]\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=BENCH_DATABASE_URL)
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--format", choices=("jsonl", "array"), default="jsonl")
+    parser.add_argument("--method", choices=("copy", "insert"), default="copy")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"export.{args.format}")
+        write_export(path, args.sessions, args.format)
+        size = os.path.getsize(path)
+
+        with engine.begin() as conn:
+            user_id = conn.execute(
+                User.__table__.insert().returning(User.id),
+                {"username": "bench_import", "email": "bench_import@example.com", "password_hash": "x"}
+            ).scalar_one()
+        try:
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            started = time.perf_counter()
+            stats = import_file(engine, path, user_id=user_id, chunk_size=args.chunk_size, workers=args.workers, method=args.method)
+            elapsed = time.perf_counter() - started
+            rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        finally:
+            with engine.begin() as conn:
+                # Cascades to the imported sessions and personal records
+                conn.execute(delete(User).where(User.id == user_id))
+                conn.execute(delete(ImportCheckpointDB).where(ImportCheckpointDB.source == os.path.abspath(path)))
+
+    print(f"{args.format} {size / 1e6:,.1f} MB, {args.method}, {args.workers} workers")
+    print(f"  {stats['imported']:,} sessions, {stats['sets']:,} sets in {elapsed:.1f}s")
+    print(f"  {stats['imported'] / elapsed:,.0f} sessions/s, {stats['sets'] / elapsed:,.0f} sets/s")
+    print(f"  peak RSS {rss_after / 1024:,.0f} MB (before import {rss_before / 1024:,.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measure what logging costs the thread that serves a request.
+
+Compares the old style (print / f-strings into a synchronous handler)
+with the queue pipeline from src.logging_setup, for enabled records and
+for records below the configured level. Each case runs against a
+temporary file and against a slow sink that stalls every write (a
+stand-in for a blocked stdout pipe or log shipper).
+
+    python -m benchmarks.bench_logging --calls 50000 --stall-ms 0.5
+"""
+import argparse
+import logging
+import tempfile
+import time
+from src import logging_setup
+
+
+class _StallingSink:
+    def __init__(self, stall: float):
+        self.stall = stall
+
+    def write(self, text):
+        time.sleep(self.stall)
+
+    def flush(self):
+        pass
+
+
+def _per_call(fn, n: int) -> float:
+    started = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def run_cases(sink, n: int) -> dict:
+    username = "bench_user"
+    results = {"print": _per_call(lambda i: print(f"DEBUG: Login attempt for username: {username}", file=sink), n)}
+
+    sync_logger = logging.getLogger("bench.sync")
+    sync_logger.propagate = False
+    sync_logger.handlers = [logging.StreamHandler(sink)]
+    sync_logger.handlers[0].setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    sync_logger.setLevel(logging.INFO)
+    results["sync handler, f-string"] = _per_call(
+        lambda i: sync_logger.info(f"Session created for user {username} with {i} workouts"), n
+    )
+    results["disabled debug, f-string"] = _per_call(
+        lambda i: sync_logger.debug(f"Session created for user {username} with {i} workouts"), n
+    )
+    results["disabled debug, lazy"] = _per_call(
+        lambda i: sync_logger.debug("Session created for user %s with %d workouts", username, i), n
+    )
+
+    logging_setup.configure_logging(level="INFO", fmt="json", sample_rates="bench.sampled=0.01", stream=sink)
+    queued = logging.getLogger("bench.queued")
+    sampled = logging.getLogger("bench.sampled")
+    try:
+        results["queue pipeline"] = _per_call(
+            lambda i: queued.info("Session created for user %s with %d workouts", username, i, extra={"user_id": i}), n
+        )
+        results["queue pipeline, 1% sampled"] = _per_call(
+            lambda i: sampled.info("Session created for user %s with %d workouts", username, i, extra={"user_id": i}), n
+        )
+    finally:
+        logging_setup.shutdown_logging()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=50_000)
+    parser.add_argument("--stall-ms", type=float, default=0.5, help="delay per write of the slow sink")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile("w") as file:
+        fast = run_cases(file, args.calls)
+    # Fewer calls against the stalling sink, or the synchronous cases take minutes
+    slow = run_cases(_StallingSink(args.stall_ms / 1000), max(100, args.calls // 100))
+
+    print(f"{'us per call on the calling thread':<30} {'file':>10} {'stalled sink':>14}")
+    for name in fast:
+        print(f"{name:<30} {fast[name]:>10.2f} {slow[name]:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
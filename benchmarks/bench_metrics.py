@@ -0,0 +1,54 @@
+"""
+Measure the per-request cost of MetricsMiddleware.
+
+Drives a trivial ASGI app directly (no server, no HTTP parsing) with and
+without the middleware and reports the difference per request.
+
+    python -m benchmarks.bench_metrics --requests 200000
+"""
+import argparse
+import asyncio
+import time
+from src.metrics import MetricsMiddleware, Registry
+
+
+class _Route:
+    path = "/sessions/{user_id}"
+
+
+async def _app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message):
+    pass
+
+
+async def _drive(app, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        await app({"type": "http", "method": "GET", "path": "/sessions/1"}, _receive, _send)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    bare = asyncio.run(_drive(_app, args.requests))
+    instrumented = asyncio.run(_drive(MetricsMiddleware(_app, Registry()), args.requests))
+    overhead = (instrumented - bare) / args.requests * 1e6
+    print(f"bare         {bare / args.requests * 1e6:6.2f} us/request")
+    print(f"instrumented {instrumented / args.requests * 1e6:6.2f} us/request")
+    print(f"overhead     {overhead:6.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure the per-request cost of the shared rate limiter.
+
+Drives a one-route FastAPI app directly over ASGI with and without a
+limit on the route, for in-memory storage, a local Redis stand-in
+(fakeredis, no network) and optionally a real Redis (--redis-url).
+Requests carry a bearer token, so the per-user key function is included.
+
+    python -m benchmarks.bench_rate_limit --requests 5000 --redis-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI, Request
+from src.auth import create_access_token
+from src.rate_limit import create_limiter
+
+
+def _app(limiter=None):
+    app = FastAPI()
+
+    if limiter is None:
+        @app.get("/")
+        def root(request: Request):
+            return {}
+    else:
+        app.state.limiter = limiter
+
+        @app.get("/")
+        @limiter.limit("1000000/minute")
+        def root(request: Request):
+            return {}
+
+    return app
+
+
+async def _drive(app, n: int, headers) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/", "raw_path": b"/", "query_string": b"", "root_path": "",
+        "headers": headers, "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    started = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--redis-url", help="also measure against this Redis server")
+    args = parser.parse_args()
+
+    headers = [(b"authorization", f"Bearer {create_access_token({'sub': 'bench'})}".encode())]
+    storages = {"memory": ("memory://", {})}
+    try:
+        import fakeredis
+        import redis
+        pool = redis.ConnectionPool(connection_class=fakeredis.FakeRedisConnection, server=fakeredis.FakeServer())
+        storages["fakeredis"] = ("redis://", {"connection_pool": pool})
+    except ImportError:
+        print("fakeredis not installed, skipping the stand-in")
+    if args.redis_url:
+        storages["redis"] = (args.redis_url, {})
+
+    bare = asyncio.run(_drive(_app(), args.requests, headers)) / args.requests * 1e6
+    print(f"{'no limit':<10} {bare:8.1f} us/request")
+    for name, (uri, options) in storages.items():
+        limited = asyncio.run(_drive(_app(create_limiter(uri, options, enabled=True)), args.requests, headers))
+        limited = limited / args.requests * 1e6
+        print(f"{name:<10} {limited:8.1f} us/request   overhead {limited - bare:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark full-text session search against a large seeded Postgres database.
+
+Sessions (each with one workout) are generated server-side with
+generate_series, so seeding 10M sessions takes minutes rather than hours.
+Use a dedicated database; --reset drops and recreates every table in it.
+
+    python -m benchmarks.bench_search --url postgresql://localhost/fitness_tracker_bench \\
+        --reset --sessions 10000000 --users 10000
+"""
+import argparse
+import random
+import statistics
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from benchmarks import BENCH_DATABASE_URL
+from src.database.database import Base
+from src.search import search_sessions
+import src.db_models  # noqa: F401  (registers the tables on Base)
+
+WORDS = [
+    "bench", "squat", "deadlift", "press", "row", "curl", "heavy", "light",
+    "tired", "strong", "recovery", "tempo", "pause", "volume", "deload",
+    "shoulder", "knee", "grip", "cardio", "mobility",
+]
+EXERCISES = ["Bench Press", "Squats", "Deadlift", "Overhead Press", "Barbell Row", "Pull-ups", "Lunges", "Dips"]
+SEED_CHUNK = 1_000_000
+
+
+def seed(engine, n_sessions: int, n_users: int):
+    words = "ARRAY[" + ",".join(f"'{w}'" for w in WORDS) + "]"
+    exercises = "ARRAY[" + ",".join(f"'{e}'" for e in EXERCISES) + "]"
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (username, email, password_hash, created_at) "
+            "SELECT 'bench_' || g, 'bench_' || g || '@example.com', 'x', now() "
+            "FROM generate_series(1, :users) g"
+        ), {"users": n_users})
+    for lo in range(1, n_sessions + 1, SEED_CHUNK):
+        hi = min(lo + SEED_CHUNK - 1, n_sessions)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO sessions (user_id, started_at, finished_at, notes) "
+                "SELECT 1 + g % :users, ts, ts + interval '1 hour', "
+                f"  ({words})[1 + (g * 7919) % {len(WORDS)}] || ' ' || ({words})[1 + (g * 104729) % {len(WORDS)}] "
+                "FROM generate_series(CAST(:lo AS bigint), :hi) g, "
+                "LATERAL (SELECT timestamp '2025-01-01' + (g % 365) * interval '1 day' AS ts) t"
+            ), {"users": n_users, "lo": lo, "hi": hi})
+            conn.execute(text(
+                "INSERT INTO workouts (session_id, name, started_at, finished_at) "
+                f"SELECT id, ({exercises})[1 + id % {len(EXERCISES)}], started_at, finished_at "
+                "FROM sessions WHERE id BETWEEN :lo AND :hi"
+            ), {"lo": lo, "hi": hi})
+        print(f"  seeded {hi} sessions")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=BENCH_DATABASE_URL)
+    parser.add_argument("--reset", action="store_true", help="drop, recreate and reseed all tables")
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        started = time.perf_counter()
+        seed(engine, args.sessions, args.users)
+        print(f"Seeded {args.sessions} sessions in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(7)
+    SessionLocal = sessionmaker(bind=engine)
+    samples = []
+    with SessionLocal() as db:
+        n_users = db.execute(text("SELECT count(*) FROM users")).scalar_one()
+        for _ in range(args.queries):
+            user_id = rng.randint(1, n_users)
+            query = rng.choice(WORDS + [w[:3] for w in WORDS])
+            started = time.perf_counter()
+            search_sessions(db, user_id, query, page=1, page_size=args.page_size)
+            samples.append(time.perf_counter() - started)
+
+    samples.sort()
+    print(f"{args.queries} searches: median {statistics.median(samples) * 1000:.2f} ms, "
+          f"p95 {samples[int(len(samples) * 0.95) - 1] * 1000:.2f} ms, max {samples[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measure worker startup: importing main, running the lifespan (tables and
+pool warm-up) and serving the first request, each in a fresh interpreter.
+
+    python -m benchmarks.bench_startup --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from benchmarks import BENCH_DATABASE_URL
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    client.get("/health")
+    served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "first_request_ms": (served - ready) * 1000,
+    "total_ms": (served - started) * 1000,
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=BENCH_DATABASE_URL)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    env = {**os.environ, "DATABASE_URL": args.url}
+    runs = []
+    for _ in range(args.repeat):
+        result = subprocess.run([sys.executable, "-c", _PROBE], env=env, capture_output=True, text=True, check=True)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    for phase in runs[0]:
+        samples = [run[phase] for run in runs]
+        print(f"{phase:<18} median {statistics.median(samples):8.1f} ms   min {min(samples):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Compare two benchmark result files, e.g. main against a feature branch.
+
+    python -m benchmarks.compare results/main.json results/feature.json
+"""
+import argparse
+import json
+
+
+def _medians(results: dict, prefix: str = ""):
+    for name, value in results.items():
+        if isinstance(value, dict) and "median_ms" in value:
+            yield prefix + name, value["median_ms"]
+        elif isinstance(value, dict):
+            yield from _medians(value, prefix + name + ".")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare median timings of two benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.candidate) as file:
+        candidate = json.load(file)
+
+    before = dict(_medians(baseline["results"]))
+    after = dict(_medians(candidate["results"]))
+    print(f"{'benchmark':<32} {'baseline ms':>12} {'candidate ms':>13} {'change':>8}")
+    for name in sorted(before.keys() & after.keys()):
+        change = (after[name] - before[name]) / before[name] * 100 if before[name] else 0.0
+        print(f"{name:<32} {before[name]:>12.3f} {after[name]:>13.3f} {change:>+7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
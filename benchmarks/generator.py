@@ -0,0 +1,173 @@
+"""
+Seeded synthetic data generator for benchmarks.
+
+Fills a database with users, sessions, workouts, sets and reps that look like
+real training logs: a few heavy users and a long tail of light ones, 3-6
+exercises per session with 3-5 sets each, progressive weights and all
+timestamps inside the last year (the API rejects anything older). The same
+seed always produces the same data.
+
+    python -m benchmarks.generator --url postgresql://localhost/fitness_tracker_bench --reset --sets 1000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from bcrypt import hashpw, gensalt
+from sqlalchemy import create_engine, func, insert, select, text
+from benchmarks import BENCH_DATABASE_URL
+from src.database.database import Base
+from src.db_models import User, SessionDB, WorkoutDB, SetDB, RepsDB
+from src.snapshots import build_snapshot
+
+BENCHMARK_PASSWORD = "benchmark-password"
+EXERCISES = [
+    "Bench Press", "Incline Bench Press", "Squats", "Front Squats", "Deadlift",
+    "Romanian Deadlift", "Overhead Press", "Barbell Row", "Pull-ups", "Chin-ups",
+    "Dips", "Lunges", "Leg Press", "Lat Pulldown", "Bicep Curls",
+    "Tricep Extensions", "Calf Raises", "Face Pulls", "Hip Thrusts", "Push-ups",
+]
+BODYWEIGHT = {"Pull-ups", "Chin-ups", "Dips", "Push-ups"}
+INTENSITIES = ("low", "medium", "high")
+
+
+def username(i: int) -> str:
+    return f"bench_user_{i}"
+
+
+def _next_ids(conn):
+    return {
+        model: conn.execute(select(func.coalesce(func.max(model.id), 0))).scalar_one() + 1
+        for model in (SessionDB, WorkoutDB, SetDB, RepsDB)
+    }
+
+
+def generate(engine, total_sets: int, users: int = 0, seed: int = 42, batch_size: int = 20_000, now: datetime = None) -> dict:
+    """
+    Insert roughly `total_sets` sets spread over `users` users (default: one
+    user per 5,000 sets). Rows are written in batches so memory stays flat.
+    Returns a summary of what was generated.
+    """
+    rng = random.Random(seed)
+    users = users or max(1, total_sets // 5_000)
+    now = now or datetime.now().replace(microsecond=0)
+    password_hash = hashpw(BENCHMARK_PASSWORD.encode("utf-8"), gensalt()).decode("utf-8")
+
+    with engine.begin() as conn:
+        user_ids = conn.execute(
+            insert(User).returning(User.id),
+            [
+                {"username": username(i), "email": f"{username(i)}@example.com", "password_hash": password_hash, "created_at": now}
+                for i in range(users)
+            ]
+        ).scalars().all()
+        ids = _next_ids(conn)
+
+    # A few users train a lot, most train a little
+    activity = [rng.paretovariate(1.2) for _ in user_ids]
+    rows = {SessionDB: [], WorkoutDB: [], SetDB: [], RepsDB: []}
+    counts = dict.fromkeys(rows, 0)
+
+    def flush():
+        with engine.begin() as conn:
+            for model in (SessionDB, WorkoutDB, SetDB, RepsDB):
+                if rows[model]:
+                    conn.execute(insert(model), rows[model])
+                    counts[model] += len(rows[model])
+                    rows[model].clear()
+
+    sets_left = total_sets
+    while sets_left > 0:
+        user_id = rng.choices(user_ids, weights=activity)[0]
+        started = now - timedelta(days=rng.randint(1, 360), minutes=rng.randint(0, 600))
+        session_id = ids[SessionDB]
+        ids[SessionDB] += 1
+        cursor = started
+        # The summary columns and snapshot every write path keeps (see SessionDB)
+        set_count = volume = 0
+        snapshot_workouts = []
+        exercises = rng.sample(EXERCISES, rng.randint(3, 6))
+        for name in exercises:
+            workout_id = ids[WorkoutDB]
+            ids[WorkoutDB] += 1
+            workout_started = cursor
+            base_weight = None if name in BODYWEIGHT else rng.choice(range(45, 320, 5))
+            snapshot_sets = []
+            for i in range(rng.randint(3, 5)):
+                set_id = ids[SetDB]
+                ids[SetDB] += 1
+                set_started = cursor
+                cursor += timedelta(seconds=rng.randint(30, 90))
+                rows[SetDB].append({"id": set_id, "workout_id": workout_id, "started_at": set_started, "finished_at": cursor})
+                reps = {
+                    "id": ids[RepsDB],
+                    "set_id": set_id,
+                    "count": rng.randint(3, 15),
+                    "intensity": rng.choice(INTENSITIES),
+                    "weight": None if base_weight is None else base_weight + 10 * i,
+                }
+                rows[RepsDB].append(reps)
+                ids[RepsDB] += 1
+                set_count += 1
+                volume += reps["count"] * (reps["weight"] or 0)
+                snapshot_sets.append((set_id, set_started, cursor, reps["count"], reps["intensity"], reps["weight"]))
+                cursor += timedelta(seconds=rng.randint(60, 180))
+                sets_left -= 1
+            rows[WorkoutDB].append({"id": workout_id, "session_id": session_id, "name": name, "started_at": workout_started, "finished_at": cursor})
+            snapshot_workouts.append((workout_id, name, workout_started, cursor, snapshot_sets))
+        notes = rng.choice([None, "felt strong", "tired today", "new gym", "deload week"])
+        rows[SessionDB].append({
+            "id": session_id,
+            "user_id": user_id,
+            "started_at": started,
+            "finished_at": cursor,
+            "notes": notes,
+            "workout_count": len(exercises),
+            "set_count": set_count,
+            "total_volume": volume,
+            "snapshot": build_snapshot(session_id, 1, started, cursor, notes, snapshot_workouts),
+        })
+        if len(rows[SetDB]) >= batch_size:
+            flush()
+    flush()
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for model in (SessionDB, WorkoutDB, SetDB, RepsDB):
+                table = model.__tablename__
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+            conn.execute(text("ANALYZE"))
+
+    return {
+        "seed": seed,
+        "users": len(user_ids),
+        "sessions": counts[SessionDB],
+        "workouts": counts[WorkoutDB],
+        "sets": counts[SetDB],
+    }
+
+
+def reset(engine) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with seeded synthetic training data")
+    parser.add_argument("--url", default=BENCH_DATABASE_URL)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    parser.add_argument("--sets", type=int, default=100_000, help="number of sets to generate (1k to 10M)")
+    parser.add_argument("--users", type=int, default=0, help="number of users (default: one per 5,000 sets)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if args.reset:
+        reset(engine)
+    started = time.perf_counter()
+    summary = generate(engine, args.sets, args.users, args.seed)
+    print(f"Generated {summary} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
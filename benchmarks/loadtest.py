@@ -0,0 +1,289 @@
+"""
+Concurrent load test for the API.
+
+A fixed number of virtual users each loop for --duration seconds, picking
+login, create-session or list-session requests according to --mix, and the
+throughput and p50/p95/p99 latency of every operation are reported. By
+default requests go to main.app in-process through httpx's ASGI transport;
+--workers N starts a local uvicorn with N worker processes instead, --serve
+starts the production launcher (serve.py) with its own worker sizing, and
+--url targets a server that is already running.
+
+Accounts come from the seeded benchmark database (python -m
+benchmarks.generator) and access tokens are minted locally, so a remote
+server must use the same SECRET_KEY and database.
+
+    python -m benchmarks.loadtest --concurrency 32 --duration 30 --mix login=1,create=2,list=7
+    python -m benchmarks.loadtest --workers 4 --pool-size 10 --rate-limits
+    python -m benchmarks.loadtest --serve --mix create=1
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from benchmarks import BENCH_DATABASE_URL
+from benchmarks.harness import write_results
+
+OPERATIONS = ("login", "create", "list")
+DEFAULT_MIX = "login=1,create=2,list=7"
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("the mix needs at least one operation with a positive weight")
+    return weights
+
+
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, round(q / 100 * len(samples)) - 1))]
+
+
+class OperationStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+
+    def record(self, seconds: float, status) -> None:
+        self.latencies.append(seconds)
+        self.statuses[status] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        samples = sorted(self.latencies)
+        errors = sum(n for status, n in self.statuses.items() if status == "error" or status >= 400)
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p95_ms": round(percentile(samples, 95) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+            "max_ms": round(samples[-1] * 1000, 3) if samples else 0.0,
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items(), key=str)},
+        }
+
+
+def load_accounts(database_url: str, limit: int):
+    """Usernames of seeded benchmark users, heaviest first"""
+    from sqlalchemy import create_engine, func, select
+    from benchmarks import generator
+    from src.db_models import User, SessionDB
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(User.username)
+                .outerjoin(SessionDB, SessionDB.user_id == User.id)
+                .where(User.username.like(generator.username(0)[:-1] + "%"))
+                .group_by(User.id)
+                .order_by(func.count(SessionDB.id).desc(), User.id)
+                .limit(limit)
+            ).scalars().all()
+    finally:
+        engine.dispose()
+    if not rows:
+        raise SystemExit(f"No benchmark users in {database_url}; run python -m benchmarks.generator first")
+    return rows
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, env: dict, serve: bool = False):
+    """
+    Start uvicorn with `workers` processes, or serve.py when `serve` is
+    set, and wait until it answers
+    """
+    import httpx
+
+    port = _free_port()
+    if serve:
+        command = [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port)]
+        if workers:
+            command += ["--workers", str(workers)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--log-level", "warning"]
+    process = subprocess.Popen(command, env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"server exited with status {process.returncode}")
+        try:
+            if httpx.get(url + "/", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("server did not start within 30s")
+
+
+async def run_load(client, accounts, weights: dict, concurrency: int, duration: float, warmup: float, seed: int):
+    from benchmarks import generator
+    from benchmarks.run import session_payload
+    from src.auth import create_access_token
+
+    import httpx
+
+    headers = {name: {"Authorization": f"Bearer {create_access_token({'sub': name})}"} for name in accounts}
+    payload = session_payload()
+    operations = list(weights)
+    operation_weights = [weights[name] for name in operations]
+
+    async def login(account):
+        return await client.post("/users/login", json={"username": account, "password": generator.BENCHMARK_PASSWORD})
+
+    async def create(account):
+        return await client.post("/sessions/", json=payload, headers=headers[account])
+
+    async def list_sessions(account):
+        return await client.get("/sessions/", headers=headers[account])
+
+    requests = {"login": login, "create": create, "list": list_sessions}
+    stats = {name: OperationStats() for name in operations}
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    async def virtual_user(rng):
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return
+            operation = rng.choices(operations, operation_weights)[0]
+            try:
+                status = (await requests[operation](rng.choice(accounts))).status_code
+            except httpx.HTTPError:
+                status = "error"
+            finished = time.perf_counter()
+            # Requests still in flight at the deadline are not counted
+            if now >= measure_from and finished <= deadline:
+                stats[operation].record(finished - now, status)
+
+    await asyncio.gather(*(virtual_user(random.Random(seed + i)) for i in range(concurrency)))
+    return stats
+
+
+async def _run(args, weights, accounts, base_url):
+    import httpx
+
+    if base_url is None:
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+    else:
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.concurrency))
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+        if isinstance(transport, httpx.ASGITransport):
+            # ASGITransport doesn't run the lifespan, so start the app the way a server would
+            async with transport.app.router.lifespan_context(transport.app):
+                return await run_load(client, accounts, weights, args.concurrency, args.duration, args.warmup, args.seed)
+        return await run_load(client, accounts, weights, args.concurrency, args.duration, args.warmup, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the API with a mix of concurrent requests")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="base URL of a running server (default: main.app in-process)")
+    target.add_argument("--workers", type=int, help="start a local uvicorn with this many worker processes")
+    target.add_argument("--serve", action="store_true", help="start the production launcher, serve.py")
+    parser.add_argument("--database-url", default=BENCH_DATABASE_URL, help="seeded benchmark database")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before the measurement")
+    parser.add_argument("--accounts", type=int, default=50, help="number of seeded users to spread requests over")
+    parser.add_argument("--pool-size", type=int, help="DB_POOL_SIZE for the app under test")
+    parser.add_argument("--max-overflow", type=int, help="DB_MAX_OVERFLOW for the app under test")
+    parser.add_argument("--threads", type=int, help="THREADPOOL_SIZE for the app under test")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the rate limiters on (off by default)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # The app reads these at import, so set them before main is loaded
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if args.rate_limits else "false"
+    if args.pool_size is not None:
+        os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+    if args.max_overflow is not None:
+        os.environ["DB_MAX_OVERFLOW"] = str(args.max_overflow)
+    if args.threads is not None:
+        os.environ["THREADPOOL_SIZE"] = str(args.threads)
+    if args.url and (args.pool_size is not None or args.max_overflow is not None or args.threads is not None or args.rate_limits):
+        print("--pool-size, --max-overflow, --threads and --rate-limits only apply to apps started by this script", file=sys.stderr)
+
+    accounts = load_accounts(args.database_url, args.accounts)
+    server = None
+    base_url = args.url
+    if args.workers or args.serve:
+        server, base_url = start_server(args.workers, dict(os.environ), serve=args.serve)
+
+    try:
+        stats = asyncio.run(_run(args, weights, accounts, base_url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results = {name: operation.summary(args.duration) for name, operation in stats.items()}
+    total = OperationStats()
+    for operation in stats.values():
+        total.latencies += operation.latencies
+        total.statuses.update(operation.statuses)
+    results["total"] = total.summary(args.duration)
+
+    print(f"{'operation':<10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, summary in results.items():
+        print(
+            f"{name:<10} {summary['requests']:>9} {summary['errors']:>7} {summary['throughput_rps']:>9.1f} "
+            f"{summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f}"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        config = {
+            "target": args.url or ("serve.py" if args.serve else f"uvicorn --workers {args.workers}" if args.workers else "in-process"),
+            "mix": weights,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "accounts": len(accounts),
+            "pool_size": os.getenv("DB_POOL_SIZE"),
+            "max_overflow": os.getenv("DB_MAX_OVERFLOW"),
+            "threads": args.threads,
+            "rate_limits": args.rate_limits if not args.url else "server setting",
+        }
+        write_results(args.output, results, config)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
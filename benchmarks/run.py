@@ -0,0 +1,121 @@
+"""
+Repeatable API benchmarks against a seeded database.
+
+Requests go through the real ASGI app in-process (FastAPI TestClient), so the
+timings include routing, validation, auth, SQL and serialization but no
+network. Rate limiting is switched off for the run. Results are written as
+JSON so runs on different branches can be compared with benchmarks.compare.
+
+    python -m benchmarks.run --reset --sets 100000 --output results/main.json
+"""
+import argparse
+import os
+from datetime import datetime, timedelta
+from benchmarks import BENCH_DATABASE_URL
+from benchmarks.harness import measure, write_results
+
+BENCHMARKS = ("create_session", "list_my_sessions", "list_user_sessions", "login", "auth_overhead")
+
+
+def session_payload(workouts: int = 5, sets: int = 5) -> dict:
+    started = datetime.now().replace(microsecond=0) - timedelta(hours=2)
+    payload = {"started_at": started.isoformat(), "notes": "benchmark session", "workouts": []}
+    cursor = started
+    for w in range(workouts):
+        workout = {"name": f"Exercise {w}", "started_at": cursor.isoformat(), "sets": []}
+        for s in range(sets):
+            workout["sets"].append({
+                "started_at": cursor.isoformat(),
+                "finished_at": (cursor + timedelta(seconds=45)).isoformat(),
+                "reps": {"count": 8, "intensity": "medium", "weight": 135 + 10 * s},
+            })
+            cursor += timedelta(minutes=2)
+        workout["finished_at"] = cursor.isoformat()
+        payload["workouts"].append(workout)
+    payload["finished_at"] = (cursor + timedelta(minutes=1)).isoformat()
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API benchmarks and write JSON results")
+    parser.add_argument("--url", default=BENCH_DATABASE_URL)
+    parser.add_argument("--reset", action="store_true", help="drop, recreate and regenerate the dataset first")
+    parser.add_argument("--sets", type=int, default=100_000, help="dataset size when generating")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma-separated subset of: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    args = parser.parse_args()
+
+    # The app reads DATABASE_URL at import, so point it at the benchmark database first
+    os.environ["DATABASE_URL"] = args.url
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine, func, select
+    from benchmarks import generator
+    from main import app
+    from src.auth import create_access_token
+    from src.db_models import User, SessionDB
+    from src.rate_limit import limiter
+
+    engine = create_engine(args.url)
+    dataset = {"url": engine.url.render_as_string(hide_password=True)}
+    if args.reset:
+        generator.reset(engine)
+        dataset.update(generator.generate(engine, args.sets, seed=args.seed))
+        print(f"Generated {dataset}")
+
+    with engine.connect() as conn:
+        heaviest_user, session_count = conn.execute(
+            select(User.id, func.count(SessionDB.id))
+            .join(SessionDB, SessionDB.user_id == User.id)
+            .group_by(User.id)
+            .order_by(func.count(SessionDB.id).desc())
+            .limit(1)
+        ).one()
+        heaviest_name = conn.execute(select(User.username).where(User.id == heaviest_user)).scalar_one()
+    dataset.update({"heaviest_user_sessions": session_count})
+
+    limiter.enabled = False
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': heaviest_name})}"}
+
+    def expect(response, status=200):
+        if response.status_code != status:
+            raise RuntimeError(f"{response.request.method} {response.request.url} -> {response.status_code}: {response.text[:200]}")
+
+    payload = session_payload()
+    cases = {
+        "create_session": lambda: expect(client.post("/sessions/", json=payload, headers=headers)),
+        "list_my_sessions": lambda: expect(client.get("/sessions/", headers=headers)),
+        "list_user_sessions": lambda: expect(client.get(f"/sessions/{heaviest_user}", headers=headers)),
+        "login": lambda: expect(client.post("/users/login", json={
+            "username": heaviest_name, "password": generator.BENCHMARK_PASSWORD
+        })),
+    }
+
+    results = {}
+    for name in args.only.split(","):
+        name = name.strip()
+        if name == "auth_overhead":
+            # Same trivial work with and without JWT decoding and the user lookup
+            anonymous = measure(lambda: expect(client.get("/")), args.repeat)
+            authenticated = measure(lambda: expect(client.get("/users/me", headers=headers)), args.repeat)
+            results[name] = {
+                "anonymous": anonymous,
+                "authenticated": authenticated,
+                "overhead_median_ms": round(authenticated["median_ms"] - anonymous["median_ms"], 3),
+            }
+        elif name in cases:
+            results[name] = measure(cases[name], args.repeat)
+        else:
+            parser.error(f"unknown benchmark {name!r}")
+        print(f"{name:<20} {results[name]}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    write_results(args.output, results, dataset)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
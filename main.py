@@ -1,51 +1,130 @@
-from fastapi import FastAPI, Depends, Request
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware  # Add this import
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from src.database.database import get_db, Base, engine
-from src.routes import sessions, users
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from src.logging_setup import configure_logging, shutdown_logging
+from src.database.database import Base, get_engine, get_shard_engines, warm_pool, dispose_engine, THREADPOOL_SIZE, ShardMoving
+from src.database.sharding import prepare_shards
+from src.routes import sessions, users, stats, exercises, admin
+from src.query_audit import QueryAuditMiddleware
+from src.compression import CompressionMiddleware
+from src.profiling import ProfilingMiddleware, ProfiledRoute
+from src.rate_limit import limiter
+from src.health import HealthProber, app_databases, pool_status
+from src.auth import require_metrics_token
+from src.metrics import MetricsMiddleware, registry as metrics_registry, render_pools, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+import anyio.to_thread
+import logging
 import os
 
-# Create rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
-app = FastAPI(title="Fitness Tracker API", version="1.0.0")
-
-# Add CORS middleware - ADD THIS SECTION
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",  # Local development
-        "http://localhost:3001",  # Alternative React port
-        "https://fitness-tracker-frontend-bice.vercel.app",  
-    ],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-)
-
-# Add rate limiting middleware
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-# Create database tables (only in development)
-if os.getenv("ENVIRONMENT") != "production":
-    Base.metadata.create_all(bind=engine)
-
-app.include_router(sessions.router)
-app.include_router(users.router)
-
-@app.get("/")
-def root():
-    return {"message": "Fitness Tracker API", "status": "healthy"}
-
-@app.get("/health")
-def health_check(db: Session = Depends(get_db)):
-    try:
-        db.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connect to the database when the server starts rather than at import"""
+    configure_logging()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    engine = get_engine()
+    # Create database tables (only in development)
+    if os.getenv("ENVIRONMENT") != "production":
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+        await run_in_threadpool(prepare_shards, get_shard_engines())
+    opened = await run_in_threadpool(warm_pool, engine)
+    logger.info("Database pool warmed with %d connections", opened)
+    # Probe once before serving, so /readyz is accurate from the start
+    await app.state.health.probe()
+    app.state.health.start()
+    yield
+    await app.state.health.stop()
+    await run_in_threadpool(dispose_engine)
+    shutdown_logging()
+
+async def _shard_moving_handler(request: Request, exc: ShardMoving) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Your data is being moved, try again shortly"},
+        status_code=503,
+        headers={"Retry-After": "5"},
+    )
+
+def create_app() -> FastAPI:
+    """Build the application; does no I/O until the server runs its lifespan"""
+    app = FastAPI(title="Fitness Tracker API", version="1.0.0", lifespan=lifespan)
+    app.router.route_class = ProfiledRoute
+
+    # Add CORS middleware - ADD THIS SECTION
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:3000",  # Local development
+            "http://localhost:3001",  # Alternative React port
+            "https://fitness-tracker-frontend-bice.vercel.app",
+        ],
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        allow_headers=["*"],
+    )
+
+    # Negotiated gzip/brotli for session and stats responses above a size threshold
+    app.add_middleware(CompressionMiddleware)
+
+    # Opt-in SQL query budget / N+1 reporting (QUERY_AUDIT=1)
+    app.add_middleware(QueryAuditMiddleware)
+
+    # Profile requests carrying X-Profile: $PROFILE_TOKEN, or a PROFILE_SAMPLE_RATE sample (see /admin/profiles)
+    app.add_middleware(ProfilingMiddleware)
+
+    # Record per-route request, latency, size and database metrics (outermost, so it times everything)
+    app.add_middleware(MetricsMiddleware)
+
+    # Shared rate limiter used by the route decorators (see src/rate_limit.py)
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    # A write refused because the user's data started moving to another shard
+    app.add_exception_handler(ShardMoving, _shard_moving_handler)
+
+    app.include_router(sessions.router)
+    app.include_router(users.router)
+    app.include_router(stats.router)
+    app.include_router(exercises.router)
+    app.include_router(admin.router)
+
+    @app.get("/")
+    def root():
+        return {"message": "Fitness Tracker API", "status": "healthy"}
+
+    # Probes the databases in the background; the health endpoints below are
+    # async and answer from its last result, without touching the database
+    app.state.health = HealthProber()
+
+    @app.get("/health")
+    async def health_check():
+        ready, report = app.state.health.readiness()
+        if ready:
+            return {"status": "healthy", "database": "connected"}
+        errors = [database["error"] for database in report["databases"].values() if not database["ok"]]
+        return {"status": "unhealthy", "database": "disconnected", "error": "; ".join(errors) or "stale probe"}
+
+    @app.get("/livez", include_in_schema=False)
+    async def livez():
+        live, report = app.state.health.liveness()
+        return JSONResponse(report, status_code=200 if live else 503)
+
+    @app.get("/readyz", include_in_schema=False)
+    async def readyz():
+        ready, report = app.state.health.readiness()
+        return JSONResponse(report, status_code=200 if ready else 503)
+
+    # Per-route traffic and database timings: only for scrapers holding METRICS_TOKEN
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+    async def metrics():
+        # async so it renders on the event loop thread, where the metrics are recorded
+        pools = {name: pool_status(engine) for name, engine in app_databases().items()}
+        return Response(content=metrics_registry.render() + render_pools(pools), media_type=METRICS_CONTENT_TYPE)
+
+    return app
+
+# For `uvicorn main:app`; `uvicorn --factory main:create_app` builds a fresh one
+app = create_app()
@@ -1,15 +1,15 @@
-from src.database.database import Base, engine
+from src.database.database import Base, get_engine
 
 def drop_all_tables():
     """Drop all tables"""
     print("Dropping all tables...")
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=get_engine())
     print("All tables dropped!")
 
 def create_all_tables():
     """Create all tables"""
     print("Creating all tables...")
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
     print("All tables created!")
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Bring an existing database up to the current schema in place.
+
+create_all only creates missing tables, so databases created before these
+changes need this once:
+- sessions.in_progress, sessions.version and users.shard columns
+- the sessions summary columns (workout_count, set_count, total_volume),
+  filled in from the existing workouts and sets
+- sessions.snapshot; existing sessions are read from their rows until
+  `python -m src.snapshots --repair` has built theirs
+- the indexes on the foreign key columns, on sessions (user_id, started_at)
+  and the full-text search indexes
+- ON DELETE CASCADE on the user -> session -> workout -> set -> reps and
+  user -> personal record foreign keys
+
+Indexes are built CONCURRENTLY and foreign keys are re-added NOT VALID
+and then validated, so neither slow scan blocks writes. Running it again
+is a no-op. An interrupted concurrent build leaves an INVALID index behind
+that counts as present; drop it and run this again.
+
+    DATABASE_URL=postgresql://... python scripts/migrate_schema.py --dry-run
+"""
+import argparse
+import os
+import sys
+from typing import List
+from sqlalchemy import inspect, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (table, column, definition)
+COLUMNS = [
+    ("sessions", "in_progress", "boolean NOT NULL DEFAULT false"),
+    ("sessions", "version", "integer NOT NULL DEFAULT 1"),
+    ("users", "shard", "integer"),
+    ("sessions", "workout_count", "integer NOT NULL DEFAULT 0"),
+    ("sessions", "set_count", "integer NOT NULL DEFAULT 0"),
+    ("sessions", "total_volume", "bigint NOT NULL DEFAULT 0"),
+    ("sessions", "snapshot", "jsonb"),
+]
+
+# (table, column, statement): run once the column has been added
+BACKFILLS = [
+    ("sessions", "total_volume",
+     "UPDATE sessions SET workout_count = s.workouts, set_count = s.sets, total_volume = s.volume "
+     "FROM (SELECT w.session_id, count(DISTINCT w.id) AS workouts, count(st.id) AS sets, "
+     "coalesce(sum(r.count * coalesce(r.weight, 0)), 0) AS volume "
+     "FROM workouts w LEFT JOIN sets st ON st.workout_id = w.id LEFT JOIN reps r ON r.set_id = st.id "
+     "GROUP BY w.session_id) s "
+     "WHERE sessions.id = s.session_id"),
+]
+
+# (table, index, definition): the indexes create_all makes, built before the
+# foreign keys are validated so cascading deletes don't scan whole tables
+INDEXES = [
+    ("workouts", "ix_workouts_session_id", "(session_id)"),
+    ("sets", "ix_sets_workout_id", "(workout_id)"),
+    ("reps", "ix_reps_set_id", "(set_id)"),
+    ("sessions", "ix_sessions_user_id_started_at", "(user_id, started_at)"),
+    ("sessions", "ix_sessions_notes_search", "USING gin (to_tsvector('english', coalesce(notes, '')))"),
+    ("workouts", "ix_workouts_name_search", "USING gin (to_tsvector('english', name))"),
+]
+
+# (table, column, referenced table)
+CASCADES = [
+    ("sessions", "user_id", "users"),
+    ("workouts", "session_id", "sessions"),
+    ("sets", "workout_id", "workouts"),
+    ("reps", "set_id", "sets"),
+    ("personal_records", "user_id", "users"),
+]
+
+
+def migration_statements(inspector) -> List[str]:
+    """The statements still needed on the database behind inspector, in order"""
+    statements = []
+    added = set()
+    for table, column, definition in COLUMNS:
+        if column not in {c["name"] for c in inspector.get_columns(table)}:
+            statements.append(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            added.add((table, column))
+    statements += [statement for table, column, statement in BACKFILLS if (table, column) in added]
+
+    for table, name, definition in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            statements.append(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+
+    for table, column, referred in CASCADES:
+        for fk in inspector.get_foreign_keys(table):
+            if fk["constrained_columns"] != [column] or fk["referred_table"] != referred:
+                continue
+            if (fk.get("options") or {}).get("ondelete", "").upper() == "CASCADE":
+                continue
+            name = fk["name"]
+            statements.append(
+                f"ALTER TABLE {table} DROP CONSTRAINT {name}, "
+                f"ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referred} (id) ON DELETE CASCADE NOT VALID"
+            )
+            statements.append(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+    return statements
+
+
+def run_statement(engine, statement: str) -> None:
+    if statement.startswith("CREATE INDEX CONCURRENTLY"):
+        # Can't run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(statement))
+    else:
+        # Each in its own transaction, so a validation holds no other locks
+        with engine.begin() as conn:
+            conn.execute(text(statement))
+
+
+def main():
+    from src.database.database import get_engine
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true", help="print the statements without running them")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    statements = migration_statements(inspect(engine))
+    if not statements:
+        print("Schema is up to date")
+        return
+    for statement in statements:
+        print(statement + ";")
+        if not args.dry_run:
+            run_statement(engine, statement)
+
+
+if __name__ == "__main__":
+    main()
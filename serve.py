@@ -0,0 +1,151 @@
+"""
+Production server launcher.
+
+Starts the API under several worker processes. It uses uvloop and
+httptools when they are installed. Workers are sized from the CPU count,
+capped so that every worker's database pool fits within
+DB_MAX_CONNECTIONS. Each worker's threadpool is sized to its pool: sync
+endpoints hold a connection for the whole request, so extra threads
+would only queue on the pool.
+
+When gunicorn is installed, it supervises UvicornWorker processes; the
+app can be preloaded in the master with --preload, and `kill -HUP`
+replaces the workers gracefully (picking up new code only without
+--preload). Without gunicorn, uvicorn's own
+supervisor runs the workers. It also restarts them on SIGHUP, but it
+cannot preload.
+
+    python serve.py --port 8000
+    python serve.py --workers 4 --preload --max-requests 10000
+    python serve.py --print-config
+"""
+import argparse
+import os
+import sys
+from importlib.util import find_spec
+from src.database.database import POOL_SIZE, MAX_OVERFLOW
+
+# Connections the database accepts from this deployment across all workers
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "90"))
+# Overrides the computed worker count (the variable gunicorn and uvicorn use too)
+WEB_CONCURRENCY = os.getenv("WEB_CONCURRENCY")
+
+APP = "main:create_app"
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects taskset/cpuset, unlike os.cpu_count)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_workers(cpus: int, pool_size: int = POOL_SIZE, max_overflow: int = MAX_OVERFLOW,
+                 db_max_connections: int = DB_MAX_CONNECTIONS, workers: int = None, threads: int = None) -> dict:
+    """
+    Worker and thread counts for a machine.
+
+    2 * cpus + 1 workers keeps the CPUs busy while some workers wait on
+    the database. The count is lowered when that many full pools would
+    exceed db_max_connections. Each worker gets one thread per connection
+    it can hold.
+    """
+    connections_per_worker = pool_size + max_overflow
+    if workers is None:
+        workers = max(1, min(2 * cpus + 1, db_max_connections // connections_per_worker))
+    if threads is None:
+        threads = connections_per_worker
+    return {
+        "workers": workers,
+        "threads": threads,
+        "connections": workers * connections_per_worker,
+    }
+
+
+def server_backend(preload: bool = False) -> str:
+    has_gunicorn = find_spec("gunicorn") is not None
+    if preload and not has_gunicorn:
+        raise SystemExit("--preload needs gunicorn (pip install gunicorn)")
+    return "gunicorn" if has_gunicorn else "uvicorn"
+
+
+def gunicorn_command(args, plan: dict) -> list:
+    command = [
+        sys.executable, "-m", "gunicorn", f"{APP}()",
+        "--worker-class", "uvicorn.workers.UvicornWorker",
+        "--bind", f"{args.host}:{args.port}",
+        "--workers", str(plan["workers"]),
+        "--backlog", str(args.backlog),
+        "--keep-alive", str(args.keep_alive),
+        "--graceful-timeout", str(args.graceful_timeout),
+        "--log-level", args.log_level,
+    ]
+    if args.preload:
+        command.append("--preload")
+    if args.max_requests:
+        command += ["--max-requests", str(args.max_requests),
+                    "--max-requests-jitter", str(max(1, args.max_requests // 10))]
+    return command
+
+
+def run_uvicorn(args, plan: dict) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else plan["workers"],
+        reload=args.reload,
+        loop="uvloop" if find_spec("uvloop") else "asyncio",
+        http="httptools" if find_spec("httptools") else "h11",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_max_requests=args.max_requests or None,
+        log_level=args.log_level,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(WEB_CONCURRENCY) if WEB_CONCURRENCY else None,
+                        help="worker processes (default: from CPUs and DB_MAX_CONNECTIONS)")
+    parser.add_argument("--threads", type=int, default=int(os.environ["THREADPOOL_SIZE"]) if "THREADPOOL_SIZE" in os.environ else None,
+                        help="threadpool size per worker (default: DB_POOL_SIZE + DB_MAX_OVERFLOW)")
+    parser.add_argument("--preload", action="store_true", help="import the app once in the master (gunicorn only)")
+    parser.add_argument("--reload", action="store_true", help="single process that restarts on code changes (development)")
+    parser.add_argument("--max-requests", type=int, default=0, help="recycle a worker after this many requests")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--keep-alive", type=int, default=5, help="idle keep-alive timeout in seconds")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="seconds in-flight requests get at shutdown")
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument("--print-config", action="store_true", help="show the computed settings and exit")
+    args = parser.parse_args()
+
+    plan = plan_workers(available_cpus(), workers=1 if args.reload else args.workers, threads=args.threads)
+    backend = "uvicorn" if args.reload else server_backend(args.preload)
+    # Read by each worker's lifespan (see main.py)
+    os.environ["THREADPOOL_SIZE"] = str(plan["threads"])
+
+    if args.print_config:
+        print(f"backend      {backend}")
+        print(f"workers      {plan['workers']}")
+        print(f"threads      {plan['threads']} per worker")
+        print(f"connections  up to {plan['connections']} (DB_MAX_CONNECTIONS={DB_MAX_CONNECTIONS})")
+        print(f"event loop   {'uvloop' if find_spec('uvloop') else 'asyncio'}, {'httptools' if find_spec('httptools') else 'h11'}")
+        return
+
+    if backend == "gunicorn":
+        command = gunicorn_command(args, plan)
+        # Replace this process so signals (HUP, TERM, TTIN/TTOU) reach gunicorn directly
+        os.execv(command[0], command)
+    run_uvicorn(args, plan)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import numpy as np
+from sqlalchemy import Float, case, cast, extract, func, select
+from sqlalchemy.orm import Session
+from typing import NamedTuple
+from ..db_models import SessionDB, WorkoutDB, SetDB, RepsDB
+
+# Intensity levels as small integer codes, in increasing order of effort
+INTENSITY_CODES = {"low": 0, "medium": 1, "high": 2}
+
+
+class TrainingHistory(NamedTuple):
+    """A user's set history as parallel columns, sorted by set start time"""
+    timestamps: np.ndarray  # datetime64[s]
+    volume: np.ndarray      # float64, reps x weight (bodyweight sets count as 0)
+    intensity: np.ndarray   # int8 codes from INTENSITY_CODES
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+def history_from_rows(rows) -> TrainingHistory:
+    """Build columnar arrays from (epoch_seconds, volume, intensity_code) rows"""
+    columns = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return TrainingHistory(
+        timestamps=columns[:, 0].astype(np.int64).astype("datetime64[s]"),
+        volume=np.ascontiguousarray(columns[:, 1]),
+        intensity=columns[:, 2].astype(np.int8),
+    )
+
+
+def load_history(db: Session, user_id: int) -> TrainingHistory:
+    """
+    Load every set of a user's finished sessions with a single query.
+
+    Timestamps, volume and intensity codes are computed in SQL so every row is
+    purely numeric and converts to an array in one call, without building a
+    Python datetime per set.
+    """
+    intensity_code = case(
+        {name: code for name, code in INTENSITY_CODES.items()},
+        value=RepsDB.intensity,
+        else_=0
+    )
+    stmt = select(
+            cast(extract("epoch", SetDB.started_at), Float),
+            RepsDB.count * func.coalesce(RepsDB.weight, 0),
+            intensity_code
+        )\
+        .join(RepsDB, RepsDB.set_id == SetDB.id)\
+        .join(WorkoutDB, WorkoutDB.id == SetDB.workout_id)\
+        .join(SessionDB, SessionDB.id == WorkoutDB.session_id)\
+        .where(SessionDB.user_id == user_id, SessionDB.in_progress.is_(False))\
+        .order_by(SetDB.started_at)
+    return history_from_rows(db.execute(stmt).all())
@@ -0,0 +1,121 @@
+import numpy as np
+from datetime import date
+from typing import Optional
+from .history import TrainingHistory, INTENSITY_CODES
+
+ACUTE_WINDOW_DAYS = 7
+CHRONIC_WINDOW_DAYS = 28
+FATIGUE_TIME_CONSTANT = 7
+FITNESS_TIME_CONSTANT = 42
+
+
+def daily_volume(history: TrainingHistory, end: Optional[date] = None):
+    """
+    Bin set volume into calendar days.
+
+    Returns (days, volume) where days is a contiguous datetime64[D] range from
+    the first training day to `end` (or the last training day if later).
+    """
+    if len(history) == 0:
+        return np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.float64)
+
+    set_days = history.timestamps.astype("datetime64[D]")
+    first = set_days[0]
+    last = set_days[-1]
+    if end is not None:
+        last = max(last, np.datetime64(end, "D"))
+
+    n_days = int((last - first).astype(np.int64)) + 1
+    offsets = (set_days - first).astype(np.int64)
+    volume = np.bincount(offsets, weights=history.volume, minlength=n_days)
+    return np.arange(first, last + 1, dtype="datetime64[D]"), volume
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` days; days before the start count as rest"""
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums / window
+
+
+def acute_chronic_ratio(values: np.ndarray, acute: int = ACUTE_WINDOW_DAYS, chronic: int = CHRONIC_WINDOW_DAYS) -> np.ndarray:
+    """Acute:chronic workload ratio per day (NaN where the chronic load is zero)"""
+    acute_load = rolling_mean(values, acute)
+    chronic_load = rolling_mean(values, chronic)
+    ratio = np.full(len(values), np.nan)
+    np.divide(acute_load, chronic_load, out=ratio, where=chronic_load > 0)
+    return ratio
+
+
+def ewma(values: np.ndarray, time_constant: float) -> np.ndarray:
+    """
+    Exponentially weighted moving average with decay exp(-1 / time_constant).
+
+    The recurrence y[t] = d * y[t-1] + (1 - d) * x[t] is solved in closed form
+    with a cumulative sum of x[i] / d**i. The d**-i weights grow without bound,
+    so the series is processed in blocks short enough to stay within float64
+    range, carrying the last value of each block into the next.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if len(values) == 0:
+        return out
+
+    decay = np.exp(-1.0 / time_constant)
+    alpha = 1.0 - decay
+    # Keep decay**-block below ~1e150
+    block = int(max(1, min(4096, 150 * np.log(10) / -np.log(decay))))
+    powers = decay ** np.arange(block)
+    inverse_powers = 1.0 / powers
+
+    previous = 0.0
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        n = len(chunk)
+        weighted = np.cumsum(chunk * inverse_powers[:n]) * powers[:n]
+        out[start:start + n] = alpha * weighted + previous * powers[:n] * decay
+        previous = out[start + n - 1]
+    return out
+
+
+def weekly_volume(days: np.ndarray, history: TrainingHistory):
+    """
+    Weekly volume totals split by intensity.
+
+    Returns (week_starts, volume) where week_starts are the Mondays of each
+    week and volume has one column per intensity code.
+    """
+    n_codes = len(INTENSITY_CODES)
+    if len(days) == 0:
+        return np.empty(0, dtype="datetime64[D]"), np.empty((0, n_codes))
+
+    # 1970-01-01 was a Thursday, so shift by 3 days to align weeks on Monday
+    first_monday = days[0] - ((days[0].astype(np.int64) + 3) % 7)
+    n_weeks = int((days[-1] - first_monday).astype(np.int64)) // 7 + 1
+
+    set_weeks = (history.timestamps.astype("datetime64[D]") - first_monday).astype(np.int64) // 7
+    flat = np.bincount(
+        set_weeks * n_codes + history.intensity,
+        weights=history.volume,
+        minlength=n_weeks * n_codes,
+    )
+    week_starts = first_monday + 7 * np.arange(n_weeks)
+    return week_starts, flat.reshape(n_weeks, n_codes)
+
+
+def compute_training_load(history: TrainingHistory, end: Optional[date] = None) -> dict:
+    """Compute every daily and weekly training-load series from a history"""
+    days, volume = daily_volume(history, end)
+    fitness = ewma(volume, FITNESS_TIME_CONSTANT)
+    fatigue = ewma(volume, FATIGUE_TIME_CONSTANT)
+    week_starts, weekly = weekly_volume(days, history)
+    return {
+        "days": days,
+        "daily_volume": volume,
+        "acwr": acute_chronic_ratio(volume),
+        "fitness": fitness,
+        "fatigue": fatigue,
+        "form": fitness - fatigue,
+        "week_starts": week_starts,
+        "weekly_volume": weekly,
+    }
@@ -5,7 +5,7 @@ from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from .database.database import get_db
+from .database.database import get_db, ShardMoving
 from .db_models import User
 import os
 import secrets
@@ -15,9 +15,14 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 REFRESH_TOKEN_EXPIRE_MINUTES = 60 * 24 * 30  # 30 days
+# Comma-separated usernames allowed to use the /admin routes
+ADMIN_USERNAMES = frozenset(name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip())
+# Bearer token scrapers send to read /metrics; unset disables the endpoint
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+metrics_security = HTTPBearer(auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -91,39 +96,64 @@ def verify_refresh_token(token: str):
             detail="Invalid refresh token"
         )
 
+def user_from_token(token: str, db: Session) -> Optional[User]:
+    """The user an access token belongs to, or None if it doesn't verify"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    username: str = payload.get("sub")
+    # Reject refresh tokens in regular auth
+    if payload.get("type", "access") == "refresh" or username is None:
+        return None
+    # Look up user by username only (no user_id in token)
+    user = db.query(User).filter(User.username == username).first()
+    if user is not None and hasattr(db, "route_to"):
+        # The shard map is the user's own row, so routing costs no query
+        db.route_to(user)
+    return user
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
     """Get current user from JWT token (without exposing user_id in token)"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        token_type = payload.get("type", "access")
-        
-        # Reject refresh tokens in regular auth
-        if token_type == "refresh":
-            raise credentials_exception
-            
-        if username is None:
-            raise credentials_exception
-            
-    except JWTError:
-        raise credentials_exception
-    
-    # Look up user by username only (no user_id in token)
-    user = db.query(User).filter(User.username == username).first()
+        user = user_from_token(credentials.credentials, db)
+    except ShardMoving:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Your data is being moved, try again shortly",
+            headers={"Retry-After": "5"},
+        )
     if user is None:
-        raise credentials_exception
-    
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 def get_current_user_id(current_user: User = Depends(get_current_user)) -> int:
     """Helper function to get user ID after authentication"""
-    return current_user.id
\ No newline at end of file
+    return current_user.id
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    """Authenticated user who is listed in ADMIN_USERNAMES"""
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+def require_metrics_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(metrics_security)) -> None:
+    """Request carrying METRICS_TOKEN as its bearer token"""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not secrets.compare_digest(credentials.credentials, METRICS_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
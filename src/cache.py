@@ -0,0 +1,214 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached value is served for at most. Invalidations that don't reach
+# this process (written by another worker without CACHE_GENERATION_URI, or by
+# the CLI importer) are picked up within this long.
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+# Where the per-user generation counters live: redis://host:6379/0 shares them
+# between all workers and instances, so a write anywhere invalidates every
+# process's entries on their next read; unset keeps them per process
+CACHE_GENERATION_URI = os.getenv("CACHE_GENERATION_URI", "")
+
+# Every UserCache registers itself here so a write can drop all derived data for a user
+_caches: List["UserCache"] = []
+
+
+class LocalGenerations:
+    """Per-user generation counters in this process"""
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> int:
+        return self._counts.get(user_id, 0)
+
+    def bump(self, user_id: int) -> int:
+        with self._lock:
+            self._counts[user_id] = self._counts.get(user_id, 0) + 1
+            return self._counts[user_id]
+
+
+class SharedGenerations:
+    """Per-user generation counters in Redis, shared by every process using the same URI"""
+
+    def __init__(self, uri: str = None, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(uri, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._client = client
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"cache-generation:{user_id}"
+
+    def get(self, user_id: int) -> int:
+        return int(self._client.get(self._key(user_id)) or 0)
+
+    def bump(self, user_id: int) -> int:
+        # INCR is atomic, so every write gets its own generation
+        return int(self._client.incr(self._key(user_id)))
+
+
+# Bumped per user on every invalidation. Entries remember the generation they
+# were computed at and are only served while it is still current, so a value
+# computed from data that was overwritten meanwhile is never served.
+_generations = SharedGenerations(CACHE_GENERATION_URI) if CACHE_GENERATION_URI else LocalGenerations()
+
+
+def use_generations(generations) -> None:
+    """Swap the generation store (tests, or a server configured at runtime)"""
+    global _generations
+    _generations = generations
+
+
+def _generation(user_id: int) -> Optional[int]:
+    """The user's current generation, or None when the store can't be reached"""
+    try:
+        return _generations.get(user_id)
+    except Exception as e:
+        logger.warning("Cache generation lookup failed; computing uncached: %s", e)
+        return None
+
+
+class UserCache:
+    """
+    LRU cache for data derived from one user's training history.
+
+    Entries are grouped by user so that writing a session can drop everything
+    derived from that user's data in one call. Each worker process has its own
+    entries. An entry is served while the user's generation is the one it was
+    computed at and it is younger than `ttl`; with CACHE_GENERATION_URI set
+    the generation is shared, so writes in any process invalidate it,
+    otherwise only writes in this one do and other processes' entries can be
+    up to `ttl` stale.
+
+    Caches created with invalidate_on_write=False hold values that writers
+    update in place (see advance()) instead of dropping them.
+    """
+
+    def __init__(self, name: str, max_users: int = 1024, invalidate_on_write: bool = True, ttl: float = CACHE_TTL):
+        self.name = name
+        self.max_users = max_users
+        self.invalidate_on_write = invalidate_on_write
+        self.ttl = ttl
+        # user_id -> {key: (value, generation, stored_at)}
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def _lookup(self, user_id: int, key: Hashable, generation: Optional[int]) -> Optional[Any]:
+        with self._lock:
+            entries = self._entries.get(user_id)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                return None
+            value, stored_generation, stored_at = entry
+            if stored_generation != generation or time.monotonic() - stored_at > self.ttl:
+                del entries[key]
+                return None
+            self._entries.move_to_end(user_id)
+            return value
+
+    def get(self, user_id: int, key: Hashable = None) -> Optional[Any]:
+        return self._lookup(user_id, key, _generation(user_id))
+
+    def set(self, user_id: int, value: Any, key: Hashable = None, generation: Optional[int] = None) -> None:
+        """Store a value computed at `generation` (default: now), unless the user has written since"""
+        current = _generation(user_id)
+        if current is None or (generation is not None and generation != current):
+            return
+        with self._lock:
+            self._entries.setdefault(user_id, {})[key] = (value, current, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, user_id: int, compute: Callable[[], Any], key: Hashable = None) -> Any:
+        generation = _generation(user_id)
+        value = self._lookup(user_id, key, generation)
+        if value is None:
+            value = compute()
+            if generation is not None:
+                self.set(user_id, value, key, generation=generation)
+        return value
+
+    def advance(self, user_id: int, generation: int, update: Callable[[Any], None], key: Hashable = None) -> None:
+        """
+        Apply the write that produced `generation` to the cached value in
+        place. Only a value from the generation just before it can be
+        brought up to date; anything older missed other writes and is dropped.
+        """
+        with self._lock:
+            entries = self._entries.get(user_id)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                return
+            value, stored_generation, stored_at = entry
+            if stored_generation != generation - 1:
+                del entries[key]
+                return
+            update(value)
+            entries[key] = (value, generation, stored_at)
+
+    def invalidate(self, user_id: int, keys: Optional[List[Hashable]] = None, generation: Optional[int] = None) -> None:
+        """
+        Drop the user's entries, or just `keys`. The rest stay valid for the
+        invalidation that produced `generation`, if they were current just before it.
+        """
+        with self._lock:
+            if keys is None:
+                self._entries.pop(user_id, None)
+                return
+            entries = self._entries.get(user_id)
+            if not entries:
+                return
+            for key in keys:
+                entries.pop(key, None)
+            if generation is not None:
+                for key, (value, stored_generation, stored_at) in list(entries.items()):
+                    if stored_generation == generation - 1:
+                        entries[key] = (value, generation, stored_at)
+                    else:
+                        del entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def invalidate_user(user_id: int, keys: Optional[Dict[str, List[Hashable]]] = None) -> Optional[int]:
+    """
+    Drop every cached value derived from this user's sessions, in every
+    process sharing the generation store; returns the new generation (None
+    if the store couldn't be reached), for UserCache.advance().
+
+    `keys` narrows this for the caches it names (by name) to just those
+    keys, for writes known to affect only part of the derived data; caches
+    it doesn't name are dropped for the user as usual. The narrowing only
+    spares this process's entries: elsewhere the new generation drops them all.
+    """
+    keys = keys or {}
+    try:
+        generation = _generations.bump(user_id)
+    except Exception:
+        # Other processes keep serving their entries until CACHE_TTL
+        logger.exception("Cache generation bump failed for user %s", user_id)
+        generation = None
+    for cache in _caches:
+        if cache.invalidate_on_write:
+            cache.invalidate(user_id, keys.get(cache.name) if generation is not None else None, generation)
+    return generation
+
+
+def clear_all() -> None:
+    """Empty every cache (used when the underlying database is reset)"""
+    for cache in _caches:
+        cache.clear()
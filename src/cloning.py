@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from .models import SessionClone
+from .db_models import SessionDB
+from .cache import invalidate_user
+from .suggest import record_workouts
+from .snapshots import write_snapshot
+from .editing import EditConflict
+from .validation.validation import to_utc_naive, validate_datetime
+
+# One statement for the whole tree. Each level's new ids are drawn from its
+# sequence alongside the old ones, so children can be pointed at their new
+# parents without a round trip; Postgres evaluates each CTE once and checks
+# the foreign keys at the end of the statement.
+CLONE_TREE = text("""
+    WITH new_session AS (
+        INSERT INTO sessions (user_id, started_at, finished_at, notes, in_progress, version, workout_count, set_count, total_volume)
+        SELECT user_id, :started_at, :finished_at, :notes, false, 1, workout_count, set_count, total_volume
+        FROM sessions WHERE id = :session_id
+        RETURNING id
+    ),
+    workout_ids AS (
+        SELECT id AS old_id, nextval(pg_get_serial_sequence('workouts', 'id')) AS new_id
+        FROM workouts WHERE session_id = :session_id
+    ),
+    new_workouts AS (
+        INSERT INTO workouts (id, session_id, name, started_at, finished_at)
+        SELECT workout_ids.new_id, new_session.id, w.name, w.started_at + :offset, w.finished_at + :offset
+        FROM workout_ids JOIN workouts w ON w.id = workout_ids.old_id CROSS JOIN new_session
+        RETURNING name
+    ),
+    set_ids AS (
+        SELECT s.id AS old_id, nextval(pg_get_serial_sequence('sets', 'id')) AS new_id, workout_ids.new_id AS workout_id
+        FROM sets s JOIN workout_ids ON s.workout_id = workout_ids.old_id
+    ),
+    new_sets AS (
+        INSERT INTO sets (id, workout_id, started_at, finished_at)
+        SELECT set_ids.new_id, set_ids.workout_id, s.started_at + :offset, s.finished_at + :offset
+        FROM set_ids JOIN sets s ON s.id = set_ids.old_id
+    ),
+    new_reps AS (
+        INSERT INTO reps (set_id, count, intensity, weight)
+        SELECT set_ids.new_id, r.count, r.intensity, r.weight
+        FROM set_ids JOIN reps r ON r.set_id = set_ids.old_id
+    )
+    SELECT new_session.id, new_workouts.name FROM new_session LEFT JOIN new_workouts ON true
+""")
+
+
+def clone_session(db: Session, user_id: int, session_id: int, clone: SessionClone) -> Optional[dict]:
+    """
+    Copy one of the user's sessions, with every workout, set and rep moved
+    by the same offset, and commit; returns the new session's snapshot, or
+    None if the user has no such session.
+
+    The copy is made inside the database (see CLONE_TREE), so it takes the
+    same few statements whatever the session's size: the copy, then
+    reading it back once for its snapshot. Its summary columns are the
+    original's, and personal records are left alone: a copy only repeats
+    values that have already been counted.
+    """
+    source = db.execute(
+        select(SessionDB.started_at, SessionDB.finished_at, SessionDB.notes, SessionDB.in_progress)
+        .where(SessionDB.id == session_id, SessionDB.user_id == user_id)
+    ).one_or_none()
+    if source is None:
+        return None
+    if source.in_progress:
+        raise EditConflict("Session is still being recorded")
+
+    if clone.offset_seconds is not None:
+        offset = timedelta(seconds=clone.offset_seconds)
+    else:
+        started_at = to_utc_naive(clone.started_at) if clone.started_at else datetime.now(timezone.utc).replace(tzinfo=None)
+        offset = started_at - source.started_at
+    started_at = validate_datetime(source.started_at + offset, "Session start time")
+    notes = clone.notes if "notes" in clone.model_fields_set else source.notes
+
+    try:
+        rows = db.execute(CLONE_TREE, {
+            "session_id": session_id,
+            "started_at": started_at,
+            "finished_at": source.finished_at + offset,
+            "notes": notes,
+            "offset": offset,
+        }).all()
+        snapshot = write_snapshot(db, rows[0][0])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    record_workouts(user_id, invalidate_user(user_id), [name for _, name in rows if name is not None])
+    return snapshot
@@ -0,0 +1,215 @@
+import gzip
+import os
+import threading
+import zlib
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from pydantic import BaseModel
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Bodies smaller than this are sent as is; compression wouldn't pay for itself
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+# Path prefixes whose responses are compressed
+COMPRESSED_PATHS = ("/sessions", "/stats")
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/x-ndjson")
+# Larger bodies are compressed in the threadpool instead of on the event loop
+_OFFLOAD_SIZE = 64 * 1024
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Content codings this server can produce, most preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str]) -> str:
+    """Best coding the client accepts, or "identity" """
+    if not accept_encoding:
+        return "identity"
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    best, best_quality = "identity", 0.0
+    for coding in supported_encodings():
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+class EncodedBody:
+    """
+    A JSON response body together with its compressed forms.
+
+    Each coding is produced on first request and kept, so a cached
+    EncodedBody is serialized and compressed once, not on every hit.
+    """
+
+    def __init__(self, body: bytes):
+        self._variants = {"identity": body}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "EncodedBody":
+        return cls(model.model_dump_json().encode())
+
+    def get(self, encoding: str) -> bytes:
+        variant = self._variants.get(encoding)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get(encoding)
+                if variant is None:
+                    variant = self._variants[encoding] = compress(self._variants["identity"], encoding)
+        return variant
+
+    def response(self, request: Request) -> Response:
+        """The body in the best coding the client accepts"""
+        encoding = "identity"
+        if len(self._variants["identity"]) >= COMPRESSION_MIN_SIZE:
+            encoding = negotiate(request.headers.get("accept-encoding"))
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.get(encoding), media_type="application/json", headers=headers)
+
+
+class _StreamEncoder:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress = self._compressor.process
+            self.finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress = self._compressor.compress
+            self.finish = self._compressor.flush
+
+
+def _varying_on_encoding(send):
+    """send, adding Accept-Encoding to the response's Vary header"""
+    async def send_with_vary(message):
+        if message["type"] == "http.response.start":
+            headers = list(message.get("headers", []))
+            for i, (name, value) in enumerate(headers):
+                if name == b"vary":
+                    if b"accept-encoding" not in value.lower() and value != b"*":
+                        headers[i] = (name, value + b", Accept-Encoding")
+                    break
+            else:
+                headers.append((b"vary", b"Accept-Encoding"))
+            message = {**message, "headers": headers}
+        await send(message)
+    return send_with_vary
+
+
+class CompressionMiddleware:
+    """
+    Negotiated gzip/brotli compression for responses under COMPRESSED_PATHS.
+
+    Single-message bodies below COMPRESSION_MIN_SIZE are left alone;
+    streamed bodies are compressed as they go. Responses that already
+    carry a Content-Encoding (precompressed EncodedBody responses) pass
+    through untouched. All of them get Vary: Accept-Encoding.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None, paths: Tuple[str, ...] = COMPRESSED_PATHS):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate(accept_encoding)
+        # Every response here depends on Accept-Encoding, compressed or not,
+        # so shared caches must key on it either way
+        send = _varying_on_encoding(send)
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        minimum_size = COMPRESSION_MIN_SIZE if self.minimum_size is None else self.minimum_size
+        state = {"start": None, "encoder": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = b""
+                for name, value in headers:
+                    if name == b"content-encoding":
+                        state["passthrough"] = True
+                    elif name == b"content-type":
+                        content_type = value
+                if not content_type.decode("latin-1").startswith(_COMPRESSIBLE_TYPES):
+                    state["passthrough"] = True
+                if state["passthrough"]:
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether compression applies
+                    state["start"] = message
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+            if start is not None:
+                state["start"] = None
+                if not more_body and len(body) < minimum_size:
+                    state["passthrough"] = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers = [(name, value) for name, value in start.get("headers", []) if name != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    if len(body) >= _OFFLOAD_SIZE:
+                        body = await run_in_threadpool(compress, body, encoding)
+                    else:
+                        body = compress(body, encoding)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                state["encoder"] = _StreamEncoder(encoding)
+                await send({**start, "headers": headers})
+
+            encoder = state["encoder"]
+            chunk = encoder.compress(body)
+            if not more_body:
+                chunk += encoder.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
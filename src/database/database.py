@@ -1,24 +1,185 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base  # Updated import
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.sql import column, table
+from sqlalchemy.orm import Session, sessionmaker, declarative_base  # Updated import
 from dotenv import load_dotenv
+from typing import List, Optional
 import os
+import hashlib
+import threading
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Connection pool sizing, tunable per deployment (see benchmarks/loadtest.py)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections opened at startup so the first requests don't pay for them
+POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(POOL_SIZE)))
+# Threads for sync endpoints. Each one can hold a pooled connection, so
+# threads beyond POOL_SIZE + MAX_OVERFLOW would only wait on the pool
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", str(POOL_SIZE + MAX_OVERFLOW)))
 
-# Safety check
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set")
+# Databases holding user data, comma-separated; unset means everything lives
+# in DATABASE_URL. DATABASE_URL stays the directory (users, and the shard map
+# in users.shard) and may also be listed here as a shard.
+SHARD_URLS = [url.strip() for url in os.getenv("SHARD_URLS", "").split(",") if url.strip()]
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Tables whose rows belong to one user and live on that user's shard
+SHARDED_TABLES = frozenset({"sessions", "workouts", "sets", "reps", "personal_records", "import_checkpoints"})
+# users.shard while the user's data is being moved (see sharding.move_user)
+SHARD_MOVING = -1
+
+
+def default_shard(user_id: int, shards: int) -> int:
+    """Where a new user's data goes: a stable hash of the id, so placement doesn't depend on insert order"""
+    digest = hashlib.blake2b(user_id.to_bytes(8, "big"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+class ShardMoving(Exception):
+    """The user's data is being moved between shards; retry shortly"""
+
+
+class ShardedSession(Session):
+    """
+    A Session that sends user-owned tables (SHARDED_TABLES) to the shard of
+    the user it was routed to with route_to(), and everything else to the
+    directory database. Statements on no particular table (text()) follow
+    the user too, once routed. bind_arguments={"shard": n} picks a shard
+    explicitly. Without shards it is a plain Session.
+
+    Every transaction on the user's shard first share-locks the user's row
+    there and checks the user still lives on it (see _hold_user_row), so a
+    move waits for writes already under way and refuses later ones with
+    ShardMoving instead of losing them.
+    """
+
+    def __init__(self, *args, directory=None, shards: Optional[List] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.directory = directory
+        self.shards = shards or []
+        self.user_id: Optional[int] = None
+        self.user_shard: Optional[int] = None
+
+    def route_to(self, user) -> None:
+        if not self.shards:
+            return
+        if user.shard == SHARD_MOVING:
+            raise ShardMoving(f"User {user.id} is being moved between shards")
+        self.user_id = user.id
+        self.user_shard = user.shard if user.shard is not None else default_shard(user.id, len(self.shards))
+
+    def get_bind(self, mapper=None, clause=None, shard: Optional[int] = None, **kwargs):
+        if not self.shards:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if shard is not None:
+            return self.shards[shard]
+        if mapper is not None and mapper.local_table.name not in SHARDED_TABLES:
+            return self.directory
+        if self.user_shard is not None:
+            return self.shards[self.user_shard]
+        if mapper is None:
+            return self.directory
+        raise RuntimeError(f"Query on {mapper.local_table.name} before the session was routed to a user")
+
+
+# The users table, without importing the models (they import Base from here)
+_users = table("users", column("id"), column("shard"))
+
+
+@event.listens_for(ShardedSession, "after_begin")
+def _hold_user_row(db: ShardedSession, transaction, connection) -> None:
+    """
+    Share-lock the routed user's row on their shard for the transaction.
+    move_user locks it exclusively before copying and deletes it (or points
+    it elsewhere) before unlocking, so a session routed before the move
+    can't write rows the move would miss. On a shard that isn't the
+    directory the row is the user's stub, whose shard is NULL.
+    """
+    if db.user_shard is None or connection.engine is not db.shards[db.user_shard]:
+        return
+    row = connection.execute(select(_users.c.shard).where(_users.c.id == db.user_id).with_for_update(read=True)).one_or_none()
+    if row is None or row[0] not in (None, db.user_shard):
+        raise ShardMoving(f"User {db.user_id} is being moved between shards")
+
+
+# Bound to the engine when it is first created (see get_engine)
+SessionLocal = sessionmaker(class_=ShardedSession, autocommit=False, autoflush=False)
 
 Base = declarative_base()  # Modern SQLAlchemy 2.0 way
 
+_engine = None
+_shard_engines: List = []
+_engine_lock = threading.Lock()
+
+def get_database_url() -> str:
+    url = os.getenv("DATABASE_URL")
+    # Safety check
+    if not url:
+        raise ValueError("DATABASE_URL environment variable is not set")
+    return url
+
+def get_engine():
+    """The process-wide engine, created on first use so importing the app does no I/O"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                url = get_database_url()
+                engine = _create_engine(url)
+                _shard_engines[:] = [engine if shard_url == url else _create_engine(shard_url) for shard_url in SHARD_URLS]
+                SessionLocal.configure(bind=engine, directory=engine, shards=list(_shard_engines))
+                _engine = engine
+    return _engine
+
+def _create_engine(url: str):
+    return create_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT)
+
+def get_shard_engines() -> List:
+    """One engine per shard, in SHARD_URLS order (empty when not sharded)"""
+    get_engine()
+    return list(_shard_engines)
+
+def engine_for_user(user):
+    """The engine holding this user's sessions (the only engine when not sharded)"""
+    shards = get_shard_engines()
+    if not shards:
+        return get_engine()
+    if user.shard == SHARD_MOVING:
+        raise ShardMoving(f"User {user.id} is being moved between shards")
+    return shards[user.shard if user.shard is not None else default_shard(user.id, len(shards))]
+
+def warm_pool(engine, connections: int = POOL_WARMUP) -> int:
+    """Open up to `connections` pooled connections now; returns how many were opened"""
+    opened = []
+    try:
+        for _ in range(min(connections, POOL_SIZE)):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+def dispose_engine() -> None:
+    """Close pooled connections (at shutdown); the engine reconnects if used again"""
+    if _engine is not None:
+        _engine.dispose()
+    for engine in _shard_engines:
+        if engine is not _engine:
+            engine.dispose()
+
+def __getattr__(name):
+    # `from src.database.database import engine` keeps working, lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
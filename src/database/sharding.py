@@ -0,0 +1,231 @@
+import argparse
+import logging
+import sys
+import time
+from typing import Dict, List, Tuple
+from sqlalchemy import delete, func, insert, select, text, update
+from sqlalchemy.orm import Session
+from .database import Base, SHARD_MOVING, default_shard
+from ..db_models import User, SessionDB, WorkoutDB, SetDB, RepsDB, PersonalRecordDB
+
+logger = logging.getLogger(__name__)
+
+# Rows copied per INSERT when moving a user
+MOVE_BATCH_SIZE = 1000
+
+# Each shard's id sequences start at shard << ID_RANGE_BITS, so rows keep
+# their ids when they move (see prepare_shard)
+ID_RANGE_BITS = 48
+
+
+def place_user(db: Session, user: User) -> None:
+    """
+    Pin a newly added user to their default shard and give them a stub row
+    there, which the shard's foreign keys and cascades hang off. Call after
+    adding the user, before the commit.
+    """
+    if not getattr(db, "shards", None):
+        return
+    # The placement hashes the id
+    db.flush()
+    user.shard = default_shard(user.id, len(db.shards))
+    if db.shards[user.shard] is not db.directory:
+        db.execute(insert(User).values(**stub_user(user.id)), bind_arguments={"shard": user.shard})
+
+
+def stub_user(user_id: int) -> dict:
+    # Real usernames can't contain '-', so stubs never collide with them
+    return {"id": user_id, "username": f"user-{user_id}", "email": f"user-{user_id}@shard", "password_hash": ""}
+
+
+def user_rows(user_id: int):
+    """(table, select) for each table holding the user's data, parents first"""
+    sessions = select(SessionDB.id).where(SessionDB.user_id == user_id)
+    workouts = select(WorkoutDB.id).where(WorkoutDB.session_id.in_(sessions))
+    sets = select(SetDB.id).where(SetDB.workout_id.in_(workouts))
+    return [
+        (SessionDB.__table__, select(SessionDB.__table__).where(SessionDB.user_id == user_id)),
+        (WorkoutDB.__table__, select(WorkoutDB.__table__).where(WorkoutDB.session_id.in_(sessions))),
+        (SetDB.__table__, select(SetDB.__table__).where(SetDB.workout_id.in_(workouts))),
+        (RepsDB.__table__, select(RepsDB.__table__).where(RepsDB.set_id.in_(sets))),
+        (PersonalRecordDB.__table__, select(PersonalRecordDB.__table__).where(PersonalRecordDB.user_id == user_id)),
+    ]
+
+
+def move_user(directory, shards: List, user_id: int, target: int) -> int:
+    """
+    Move a user's data to another shard; returns the rows copied.
+
+    The user is marked SHARD_MOVING first, so their requests get 503 instead
+    of writing to a shard that is being copied. Requests routed before that
+    may still be writing: the user's row on the source is then locked, which
+    waits for their transactions and makes later ones refuse (see
+    ShardedSession). Under that lock the rows are copied with their ids in
+    one transaction on the target, the shard map is flipped and the source
+    rows deleted (one cascading DELETE). If the copy fails, the user goes
+    back to the source untouched.
+    """
+    with directory.begin() as conn:
+        shard = conn.execute(select(User.shard).where(User.id == user_id).with_for_update()).one_or_none()
+        if shard is None:
+            raise LookupError(f"No user with id {user_id}")
+        source = shard[0] if shard[0] is not None else default_shard(user_id, len(shards))
+        if source == SHARD_MOVING:
+            raise RuntimeError(f"User {user_id} is already being moved")
+        if source == target:
+            return 0
+        conn.execute(update(User).where(User.id == user_id).values(shard=SHARD_MOVING))
+
+    copied = 0
+    try:
+        with shards[source].begin() as reader:
+            # Exclusive row lock: in-flight writers finish first, new ones see SHARD_MOVING
+            reader.execute(update(User).where(User.id == user_id).values(shard=SHARD_MOVING))
+            with shards[target].begin() as writer:
+                if shards[target] is not directory:
+                    writer.execute(insert(User).values(**stub_user(user_id)))
+                for table, query in user_rows(user_id):
+                    result = reader.execute(query, execution_options={"stream_results": True, "max_row_buffer": MOVE_BATCH_SIZE})
+                    for batch in result.mappings().partitions(MOVE_BATCH_SIZE):
+                        writer.execute(insert(table), [dict(row) for row in batch])
+                        copied += len(batch)
+
+            if shards[source] is directory:
+                # The locked row is the real user: flip it here, and only the data goes
+                reader.execute(update(User).where(User.id == user_id).values(shard=target))
+                reader.execute(delete(SessionDB).where(SessionDB.user_id == user_id))
+                reader.execute(delete(PersonalRecordDB).where(PersonalRecordDB.user_id == user_id))
+            else:
+                with directory.begin() as conn:
+                    conn.execute(update(User).where(User.id == user_id).values(shard=target))
+                reader.execute(delete(User).where(User.id == user_id))
+    except Exception:
+        with directory.begin() as conn:
+            conn.execute(update(User).where(User.id == user_id).values(shard=source))
+        raise
+    logger.info("Moved user %s from shard %d to %d", user_id, source, target, extra={"user_id": user_id, "rows": copied})
+    return copied
+
+
+def shard_loads(directory, shards: List) -> Dict[int, Dict[int, int]]:
+    """Sessions per user, per shard (users without sessions count as 0)"""
+    with directory.connect() as conn:
+        placement = {
+            user_id: shard if shard is not None else default_shard(user_id, len(shards))
+            for user_id, shard in conn.execute(select(User.id, User.shard))
+        }
+    loads: Dict[int, Dict[int, int]] = {shard: {} for shard in range(len(shards))}
+    for user_id, shard in placement.items():
+        if shard != SHARD_MOVING:
+            loads[shard][user_id] = 0
+    for shard, engine in enumerate(shards):
+        with engine.connect() as conn:
+            for user_id, sessions in conn.execute(select(SessionDB.user_id, func.count()).group_by(SessionDB.user_id)):
+                # Data still on a shard the user has left doesn't count
+                if placement.get(user_id) == shard:
+                    loads[shard][user_id] = sessions
+    return loads
+
+
+def plan_moves(loads: Dict[int, Dict[int, int]], max_moves: int = 10, tolerance: float = 0.1) -> List[Tuple[int, int, int]]:
+    """
+    (user_id, source, target) moves that even out the shards' loads.
+
+    Greedy: repeatedly moves the largest user that fits from the busiest
+    shard to the quietest, without overshooting the gap between them,
+    until every shard is within `tolerance` of the mean.
+    """
+    loads = {shard: dict(users) for shard, users in loads.items()}
+    totals = {shard: sum(users.values()) for shard, users in loads.items()}
+    mean = sum(totals.values()) / max(1, len(totals))
+    moves = []
+    while len(moves) < max_moves:
+        busiest = max(totals, key=totals.get)
+        quietest = min(totals, key=totals.get)
+        gap = totals[busiest] - totals[quietest]
+        if totals[busiest] <= mean * (1 + tolerance) or gap <= 0:
+            break
+        candidates = [(load, user_id) for user_id, load in loads[busiest].items() if 0 < load < gap]
+        if not candidates:
+            break
+        # Closest to half the gap evens the pair out the most
+        load, user_id = min(candidates, key=lambda candidate: abs(candidate[0] - gap / 2))
+        del loads[busiest][user_id]
+        loads[quietest][user_id] = load
+        totals[busiest] -= load
+        totals[quietest] += load
+        moves.append((user_id, busiest, quietest))
+    return moves
+
+
+def prepare_shard(engine, shard: int) -> None:
+    """Start every id sequence of a Postgres shard in its own range, so moved rows never collide"""
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("id ranges can only be set on Postgres shards")
+    start = shard << ID_RANGE_BITS
+    with engine.begin() as conn:
+        for table in ("sessions", "workouts", "sets", "reps", "personal_records"):
+            conn.execute(
+                text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                     f"greatest(:start, (SELECT coalesce(max(id), 0) FROM {table}) + 1), false)"),
+                {"start": start}
+            )
+
+
+def prepare_shards(shards: List) -> None:
+    """Create the tables on every shard, and give each Postgres shard its id range"""
+    for shard, engine in enumerate(shards):
+        Base.metadata.create_all(bind=engine)
+        if engine.dialect.name == "postgresql":
+            prepare_shard(engine, shard)
+
+
+def main():
+    from .database import get_engine, get_shard_engines
+
+    parser = argparse.ArgumentParser(description="Inspect and rebalance user-sharded storage (SHARD_URLS)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="users and sessions per shard")
+    commands.add_parser("prepare", help="create the tables and id ranges on every shard")
+    move = commands.add_parser("move", help="move one user to a shard")
+    move.add_argument("username")
+    move.add_argument("--to", type=int, required=True)
+    rebalance = commands.add_parser("rebalance", help="move users until shards are within --tolerance of the mean")
+    rebalance.add_argument("--max-moves", type=int, default=10)
+    rebalance.add_argument("--tolerance", type=float, default=0.1)
+    rebalance.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    directory = get_engine()
+    shards = get_shard_engines()
+    if not shards:
+        parser.error("SHARD_URLS is not set")
+
+    if args.command == "prepare":
+        prepare_shards(shards)
+        print(f"{len(shards)} shards ready")
+    elif args.command == "status":
+        for shard, users in shard_loads(directory, shards).items():
+            print(f"shard {shard}: {len(users):>8,} users {sum(users.values()):>10,} sessions")
+    elif args.command == "move":
+        with directory.connect() as conn:
+            user_id = conn.execute(select(User.id).where(User.username == args.username)).scalar()
+        if user_id is None:
+            parser.error(f"no user named {args.username!r}")
+        if not 0 <= args.to < len(shards):
+            parser.error(f"--to must be between 0 and {len(shards) - 1}")
+        started = time.perf_counter()
+        rows = move_user(directory, shards, user_id, args.to)
+        print(f"Moved {args.username} ({rows:,} rows) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    else:
+        moves = plan_moves(shard_loads(directory, shards), args.max_moves, args.tolerance)
+        for user_id, source, target in moves:
+            print(f"user {user_id}: shard {source} -> {target}")
+            if not args.dry_run:
+                move_user(directory, shards, user_id, target)
+        if not moves:
+            print("Shards are balanced")
+
+
+if __name__ == "__main__":
+    main()
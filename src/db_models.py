@@ -1,37 +1,85 @@
-from sqlalchemy import Column, BigInteger, String, Integer, Text, DateTime, ForeignKey, CheckConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import func, literal_column, text, Column, BigInteger, Boolean, String, Integer, Float, Text, DateTime, JSON, ForeignKey, CheckConstraint, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred, relationship
 from .database.database import Base
 from datetime import datetime, timezone
 
+# BIGINT keys, except on SQLite (local shard stand-ins), which only
+# autoincrements INTEGER PRIMARY KEY columns
+Id = BigInteger().with_variant(Integer, "sqlite")
+# JSON documents: JSONB on Postgres (compact, compared by value); None is SQL NULL
+Document = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+# Every foreign key down the user -> session -> workout -> set -> reps tree is
+# ON DELETE CASCADE, and the relationships are passive_deletes: deleting a row
+# is one statement and the database removes its children through their
+# foreign key indexes, instead of the ORM loading and deleting each one.
+
 class User(Base):
     __tablename__ = "users"
-    id = Column(BigInteger, primary_key=True)
+    id = Column(Id, primary_key=True)
     username = Column(String(50), unique=True, nullable=False)
     email = Column(String(100), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Which SHARD_URLS database holds the user's data; NULL means
+    # default_shard(id), and SHARD_MOVING while a move is in progress
+    shard = Column(Integer, nullable=True)
 
-    
     # One user has many sessions
-    sessions = relationship("SessionDB", back_populates="user", cascade="all, delete")
+    sessions = relationship("SessionDB", back_populates="user", cascade="all, delete", passive_deletes=True)
+    # One user has one personal record row per exercise
+    personal_records = relationship("PersonalRecordDB", back_populates="user", cascade="all, delete", passive_deletes=True)
 
 class SessionDB(Base):
     __tablename__ = "sessions"
-    id = Column(BigInteger, primary_key=True)
-    user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
+    __table_args__ = (
+        # Per-user history scans (lists, calendar, date ranges)
+        Index("ix_sessions_user_id_started_at", "user_id", "started_at"),
+        # Full-text search over notes (see session_notes_document), maintained by Postgres on write
+        Index(
+            "ix_sessions_notes_search",
+            text("to_tsvector('english', coalesce(notes, ''))"),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
+    id = Column(Id, primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     started_at = Column(DateTime, nullable=False)
     finished_at = Column(DateTime, nullable=False)
     notes = Column(Text)
+    # Still being recorded over /sessions/live; left out of session lists until finished
+    in_progress = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+    # Bumped by every PATCH; an edit must name the version it was made against
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    # Summary of the tree below, kept up to date by every write so list views
+    # and the calendar read only this table. Volume is reps x weight, with
+    # bodyweight sets counting 0 (as in the stats).
+    workout_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    set_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    total_volume = Column(BigInteger, nullable=False, default=0, server_default=text("0"))
+    # The whole tree as GET /sessions returns it, rewritten by every write
+    # (see src/snapshots.py); NULL while in progress, and until backfilled.
+    # Deferred: loading sessions as objects doesn't drag the document along
+    snapshot = deferred(Column(Document, nullable=True))
     
     # Belongs to one user
     user = relationship("User", back_populates="sessions")
     # One session has many workouts
-    workouts = relationship("WorkoutDB", back_populates="session", cascade="all, delete")
+    workouts = relationship("WorkoutDB", back_populates="session", cascade="all, delete", passive_deletes=True)
 
 class WorkoutDB(Base):
     __tablename__ = "workouts"
-    id = Column(BigInteger, primary_key=True)
-    session_id = Column(BigInteger, ForeignKey("sessions.id"), nullable=False)
+    __table_args__ = (
+        # Full-text search over names (see workout_name_document)
+        Index(
+            "ix_workouts_name_search",
+            text("to_tsvector('english', name)"),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
+    id = Column(Id, primary_key=True)
+    session_id = Column(BigInteger, ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(100), nullable=False)
     started_at = Column(DateTime, nullable=False)
     finished_at = Column(DateTime, nullable=False)
@@ -39,27 +87,75 @@ class WorkoutDB(Base):
     # Belongs to one session
     session = relationship("SessionDB", back_populates="workouts")
     # One workout has many sets
-    sets = relationship("SetDB", back_populates="workout", cascade="all, delete")
+    sets = relationship("SetDB", back_populates="workout", cascade="all, delete", passive_deletes=True)
 
 class SetDB(Base):
     __tablename__ = "sets"
-    id = Column(BigInteger, primary_key=True)
-    workout_id = Column(BigInteger, ForeignKey("workouts.id"), nullable=False)
+    id = Column(Id, primary_key=True)
+    workout_id = Column(BigInteger, ForeignKey("workouts.id", ondelete="CASCADE"), nullable=False, index=True)
     started_at = Column(DateTime, nullable=False)
     finished_at = Column(DateTime, nullable=False)
     
     # Belongs to one workout
     workout = relationship("WorkoutDB", back_populates="sets")
     # Each set has one rep object
-    reps = relationship("RepsDB", back_populates="set", uselist=False, cascade="all, delete")
+    reps = relationship("RepsDB", back_populates="set", uselist=False, cascade="all, delete", passive_deletes=True)
 
 class RepsDB(Base):
     __tablename__ = "reps"
-    id = Column(BigInteger, primary_key=True)
-    set_id = Column(BigInteger, ForeignKey("sets.id"), nullable=False)
+    id = Column(Id, primary_key=True)
+    set_id = Column(BigInteger, ForeignKey("sets.id", ondelete="CASCADE"), nullable=False, index=True)
     count = Column(Integer, nullable=False)
     intensity = Column(String(20), nullable=False)
     weight = Column(Integer, nullable=True)
     
     # Belongs to one set
-    set = relationship("SetDB", back_populates="reps")
\ No newline at end of file
+    set = relationship("SetDB", back_populates="reps")
+
+class PersonalRecordDB(Base):
+    __tablename__ = "personal_records"
+    __table_args__ = (
+        UniqueConstraint("user_id", "exercise", name="uq_personal_records_user_exercise"),
+    )
+    id = Column(Id, primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    exercise = Column(String(100), nullable=False)
+    # Heaviest single set, and the reps it was done for
+    heaviest_weight = Column(Integer, nullable=True)
+    heaviest_weight_reps = Column(Integer, nullable=True)
+    heaviest_weight_at = Column(DateTime, nullable=True)
+    # Most reps in a single set, and the weight it was done at
+    most_reps = Column(Integer, nullable=True)
+    most_reps_weight = Column(Integer, nullable=True)
+    most_reps_at = Column(DateTime, nullable=True)
+    # Best Epley estimated one-rep max over all weighted sets
+    best_estimated_1rm = Column(Float, nullable=True)
+    best_estimated_1rm_at = Column(DateTime, nullable=True)
+    # Best total volume (reps x weight) for this exercise within one session
+    best_session_volume = Column(BigInteger, nullable=True)
+    best_session_volume_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Belongs to one user
+    user = relationship("User", back_populates="personal_records")
+
+class ImportCheckpointDB(Base):
+    __tablename__ = "import_checkpoints"
+    # One row per import source (see src/processor.py), updated in the same
+    # transaction as each imported chunk so a resumed import never repeats one
+    source = Column(String(500), primary_key=True)
+    source_size = Column(BigInteger, nullable=False)
+    # Byte offset just past the last record already imported or rejected
+    offset = Column(BigInteger, nullable=False, default=0)
+    records = Column(BigInteger, nullable=False, default=0)
+    imported = Column(BigInteger, nullable=False, default=0)
+    rejected = Column(BigInteger, nullable=False, default=0)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+# Full-text search documents. Queries must use these exact expressions for the
+# GIN expression indexes on sessions and workouts to apply.
+SEARCH_CONFIG = literal_column("'english'")
+session_notes_document = func.to_tsvector(SEARCH_CONFIG, func.coalesce(SessionDB.notes, literal_column("''")))
+workout_name_document = func.to_tsvector(SEARCH_CONFIG, WorkoutDB.name)
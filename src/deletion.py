@@ -0,0 +1,146 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Optional
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+from .db_models import User, SessionDB, WorkoutDB
+from .records import recompute_personal_records
+from .cache import invalidate_user
+from .suggest import forget_user
+from .editing import EditConflict
+
+logger = logging.getLogger(__name__)
+
+# Sessions (with everything under them) removed per transaction by chunked deletes
+DELETE_CHUNK_SESSIONS = int(os.getenv("DELETE_CHUNK_SESSIONS", "500"))
+# Accounts with more sessions than this are deleted in the background, in chunks
+BACKGROUND_DELETE_SESSIONS = int(os.getenv("BACKGROUND_DELETE_SESSIONS", "2000"))
+
+
+def delete_session(db: Session, user_id: int, session_id: int) -> Optional[dict]:
+    """
+    Delete one of the user's sessions and commit. The database cascades the
+    DELETE to its workouts, sets and reps, so this is the same few
+    statements for any session size. Personal records are rebuilt for the
+    session's exercises. Returns the changes for editing.invalidate_edit(),
+    or None if the user has no such session.
+    """
+    in_progress = db.execute(
+        select(SessionDB.in_progress).where(SessionDB.id == session_id, SessionDB.user_id == user_id)
+    ).scalar_one_or_none()
+    if in_progress is None:
+        return None
+    if in_progress:
+        raise EditConflict("Session is still being recorded")
+
+    names = db.execute(select(WorkoutDB.name).where(WorkoutDB.session_id == session_id)).scalars().all()
+    try:
+        started_at = db.execute(
+            delete(SessionDB)
+            .where(SessionDB.id == session_id, SessionDB.user_id == user_id)
+            .returning(SessionDB.started_at)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+        recompute_personal_records(db, user_id, names)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"years": [started_at.year], "added_names": [], "removed_names": names}
+
+
+def count_sessions(db: Session, user_id: int) -> int:
+    # An index-only scan of ix_sessions_user_id_started_at
+    return db.execute(select(func.count()).where(SessionDB.user_id == user_id)).scalar_one()
+
+
+def delete_account(db: Session, user_id: int) -> None:
+    """Delete a user and all their data with one statement (the database cascades it) and commit"""
+    statement = delete(User).where(User.id == user_id).execution_options(synchronize_session=False)
+    if getattr(db, "user_shard", None) is not None and db.shards[db.user_shard] is not db.directory:
+        # On a shard the data hangs off the user's stub row
+        db.execute(statement, bind_arguments={"shard": db.user_shard})
+    db.execute(statement)
+    db.commit()
+    _forget(user_id)
+
+
+def retire_account(db: Session, user_id: int) -> None:
+    """
+    Make an account unusable straight away, ahead of a chunked delete.
+
+    Tokens are resolved by username, so renaming the user revokes them and
+    blocks logins; the username and email are free again at once. The
+    replacement names can't collide with real ones, which can't contain '-'.
+    """
+    db.execute(
+        update(User).where(User.id == user_id)
+        .values(username=f"deleted-{user_id}", email=f"deleted-{user_id}@invalid")
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    _forget(user_id)
+
+
+def delete_account_in_chunks(engine, user_id: int, chunk_size: int = DELETE_CHUNK_SESSIONS, pause: float = 0.0, directory=None) -> int:
+    """
+    Delete a user's sessions chunk_size at a time, one transaction each, then
+    the user; returns the number of sessions deleted. engine holds the
+    user's data; with sharding, directory is where their users row lives.
+
+    Each transaction's locks and WAL stay small however long the history
+    is, so other writers are never blocked for long. pause (seconds)
+    between chunks throttles the delete further. Safe to rerun after an
+    interruption.
+    """
+    deleted = 0
+    while True:
+        chunk = select(SessionDB.id)\
+            .where(SessionDB.user_id == user_id)\
+            .order_by(SessionDB.id)\
+            .limit(chunk_size)\
+            .scalar_subquery()
+        with engine.begin() as conn:
+            removed = conn.execute(delete(SessionDB).where(SessionDB.id.in_(chunk))).rowcount
+        deleted += removed
+        if removed < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    for database in {engine, directory or engine}:
+        with database.begin() as conn:
+            conn.execute(delete(User).where(User.id == user_id))
+    _forget(user_id)
+    logger.info("Deleted account %s in chunks", user_id, extra={"user_id": user_id, "sessions": deleted})
+    return deleted
+
+
+def _forget(user_id: int) -> None:
+    invalidate_user(user_id)
+    forget_user(user_id)
+
+
+def main():
+    from .database.database import get_engine, engine_for_user
+
+    parser = argparse.ArgumentParser(description="Delete a user's account and data in chunks")
+    parser.add_argument("username")
+    parser.add_argument("--chunk-size", type=int, default=DELETE_CHUNK_SESSIONS, help="sessions per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between chunks")
+    args = parser.parse_args()
+
+    directory = get_engine()
+    with directory.connect() as conn:
+        user = conn.execute(select(User.id, User.shard).where(User.username == args.username)).one_or_none()
+    if user is None:
+        parser.error(f"no user named {args.username!r}")
+    started = time.perf_counter()
+    deleted = delete_account_in_chunks(engine_for_user(user), user.id, args.chunk_size, args.pause, directory)
+    print(f"Deleted {args.username} with {deleted:,} sessions in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
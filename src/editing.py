@@ -0,0 +1,224 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+from .models import SessionPatch, Workout, Set
+from .db_models import SessionDB, WorkoutDB, SetDB, RepsDB
+from .records import recompute_personal_records
+from .cache import invalidate_user
+from .suggest import record_workouts
+from .snapshots import load_trees, session_snapshot
+from .validation.validation import (
+    to_utc_naive,
+    validate_time_order,
+    validate_session_limits,
+    validate_workout_limits
+)
+
+
+class EditConflict(Exception):
+    """The session changed since the client read it, or can't be edited yet"""
+
+
+def _new_set(set_: Set, workout_id: Optional[int] = None) -> SetDB:
+    db_set = SetDB(workout_id=workout_id, started_at=set_.started_at, finished_at=set_.finished_at)
+    db_set.reps = RepsDB(count=set_.reps.count, intensity=set_.reps.intensity, weight=set_.reps.weight)
+    return db_set
+
+
+def _new_workout(workout: Workout, session_id: int) -> WorkoutDB:
+    db_workout = WorkoutDB(
+        session_id=session_id,
+        name=workout.name,
+        started_at=workout.started_at,
+        finished_at=workout.finished_at
+    )
+    db_workout.sets = [_new_set(set_) for set_ in workout.sets]
+    return db_workout
+
+
+def _changed(row, values: Dict[str, Optional[datetime]], what: str) -> Dict[str, object]:
+    """The values actually given, after checking the row's resulting times are in order"""
+    values = {key: value for key, value in values.items() if value is not None}
+    started_at = values.get("started_at", row.started_at)
+    finished_at = values.get("finished_at", row.finished_at)
+    validate_time_order(to_utc_naive(started_at), to_utc_naive(finished_at), what)
+    return values
+
+
+def apply_session_patch(db: Session, user_id: int, session_id: int, patch: SessionPatch) -> dict:
+    """
+    Apply a diff to one of the user's sessions, writing only the rows it
+    touches, and commit.
+
+    The session's version is bumped by an UPDATE conditional on the
+    version the client sent, which also locks the row until commit, so
+    of two concurrent edits against the same version one gets
+    EditConflict. Personal records are recomputed for the exercises whose
+    sets changed, and the snapshot is rebuilt. Returns what the edit
+    affected, for invalidate_edit(), and the new snapshot.
+    Unknown ids raise LookupError, invalid results ValueError; either way
+    nothing is written.
+    """
+    current = db.execute(
+        select(SessionDB.started_at, SessionDB.finished_at, SessionDB.version, SessionDB.in_progress)
+        .where(SessionDB.id == session_id, SessionDB.user_id == user_id)
+    ).one_or_none()
+    if current is None:
+        raise LookupError("Session not found")
+    if current.in_progress:
+        raise EditConflict("Session is still being recorded")
+
+    session_values = _changed(current, {"started_at": patch.started_at, "finished_at": patch.finished_at}, "Session")
+    if "notes" in patch.model_fields_set:
+        session_values["notes"] = patch.notes
+    bumped = db.execute(
+        update(SessionDB)
+        .where(SessionDB.id == session_id, SessionDB.version == patch.version)
+        .values(version=SessionDB.version + 1, **session_values)
+        .returning(SessionDB.version, SessionDB.started_at)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    if bumped is None:
+        raise EditConflict(f"Session was modified (version {current.version}, not {patch.version}); reload it and retry")
+
+    try:
+        changes = _apply_tree_changes(db, session_id, patch)
+        summary = validate_session_tree(db, session_id)
+        [db_session] = load_trees(db, SessionDB.id == session_id)
+        snapshot = session_snapshot(db_session)
+        db.execute(
+            update(SessionDB).where(SessionDB.id == session_id).values(snapshot=snapshot, **summary)
+            .execution_options(synchronize_session=False)
+        )
+
+        exercises = set(changes["exercises"])
+        if "started_at" in session_values:
+            # Records are dated by session start
+            exercises.update(db.execute(select(WorkoutDB.name).where(WorkoutDB.session_id == session_id)).scalars())
+        recompute_personal_records(db, user_id, exercises)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    changes["version"] = bumped.version
+    changes["snapshot"] = snapshot
+    changes["years"] = sorted({current.started_at.year, bumped.started_at.year})
+    return changes
+
+
+def _apply_tree_changes(db: Session, session_id: int, patch: SessionPatch) -> dict:
+    added_names: List[str] = [workout.name for workout in patch.add_workouts]
+    removed_names: List[str] = []
+    exercises = set(added_names)
+
+    if {workout.id for workout in patch.update_workouts} & set(patch.remove_workouts):
+        raise ValueError("A workout can't be both updated and removed")
+    for workout in patch.update_workouts:
+        if {set_.id for set_ in workout.update_sets} & set(workout.remove_sets):
+            raise ValueError("A set can't be both updated and removed")
+    workout_ids = [workout.id for workout in patch.update_workouts] + list(patch.remove_workouts)
+    workouts = {}
+    if workout_ids:
+        workouts = {
+            row.id: row for row in db.execute(
+                select(WorkoutDB.id, WorkoutDB.name, WorkoutDB.started_at, WorkoutDB.finished_at)
+                .where(WorkoutDB.id.in_(workout_ids), WorkoutDB.session_id == session_id)
+            )
+        }
+    for workout_id in workout_ids:
+        if workout_id not in workouts:
+            raise LookupError(f"Workout {workout_id} not found in session")
+
+    set_ids = [set_.id for workout in patch.update_workouts for set_ in workout.update_sets] \
+        + [set_id for workout in patch.update_workouts for set_id in workout.remove_sets]
+    sets = {}
+    if set_ids:
+        sets = {
+            row.id: row for row in db.execute(
+                select(SetDB.id, SetDB.workout_id, SetDB.started_at, SetDB.finished_at, RepsDB.id.label("reps_id"))
+                .join(RepsDB, RepsDB.set_id == SetDB.id)
+                .where(SetDB.id.in_(set_ids), SetDB.workout_id.in_(list(workouts)))
+            )
+        }
+
+    set_updates, reps_updates, workout_updates, removed_sets = [], [], [], []
+    new_rows = [_new_workout(workout, session_id) for workout in patch.add_workouts]
+    for workout in patch.update_workouts:
+        stored = workouts[workout.id]
+        for set_id in [set_.id for set_ in workout.update_sets] + workout.remove_sets:
+            if set_id not in sets or sets[set_id].workout_id != workout.id:
+                raise LookupError(f"Set {set_id} not found in workout {workout.id}")
+
+        values = _changed(stored, {"started_at": workout.started_at, "finished_at": workout.finished_at}, "Workout")
+        if workout.name is not None and workout.name != stored.name:
+            values["name"] = workout.name
+            added_names.append(workout.name)
+            removed_names.append(stored.name)
+            exercises.update((workout.name, stored.name))
+        if values:
+            workout_updates.append({"id": workout.id, **values})
+
+        for set_ in workout.update_sets:
+            values = _changed(sets[set_.id], {"started_at": set_.started_at, "finished_at": set_.finished_at}, "Set")
+            if values:
+                set_updates.append({"id": set_.id, **values})
+            if set_.reps is not None:
+                reps_updates.append({"id": sets[set_.id].reps_id, **set_.reps.model_dump()})
+                exercises.add(workout.name or stored.name)
+        removed_sets.extend(workout.remove_sets)
+        new_rows.extend(_new_set(set_, workout.id) for set_ in workout.add_sets)
+        if workout.remove_sets or workout.add_sets:
+            exercises.add(workout.name or stored.name)
+
+    for workout_id in patch.remove_workouts:
+        removed_names.append(workouts[workout_id].name)
+        exercises.add(workouts[workout_id].name)
+
+    # Their sets and reps go with them (ON DELETE CASCADE)
+    if patch.remove_workouts:
+        db.execute(
+            delete(WorkoutDB).where(WorkoutDB.id.in_(patch.remove_workouts))
+            .execution_options(synchronize_session=False)
+        )
+    if removed_sets:
+        db.execute(delete(SetDB).where(SetDB.id.in_(removed_sets)).execution_options(synchronize_session=False))
+    # Bulk UPDATEs by primary key: one executemany per table and column set
+    if workout_updates:
+        db.execute(update(WorkoutDB), workout_updates)
+    if set_updates:
+        db.execute(update(SetDB), set_updates)
+    if reps_updates:
+        db.execute(update(RepsDB), reps_updates)
+    if new_rows:
+        db.add_all(new_rows)
+    db.flush()
+    return {"added_names": added_names, "removed_names": removed_names, "exercises": sorted(exercises)}
+
+
+def validate_session_tree(db: Session, session_id: int) -> dict:
+    """
+    Check the stored session still satisfies the limits create_session
+    enforces; returns its summary columns, from the same aggregate.
+    """
+    counts = db.execute(
+        select(WorkoutDB.name, func.count(SetDB.id), func.coalesce(func.sum(RepsDB.count * func.coalesce(RepsDB.weight, 0)), 0))
+        .outerjoin(SetDB, SetDB.workout_id == WorkoutDB.id)
+        .outerjoin(RepsDB, RepsDB.set_id == SetDB.id)
+        .where(WorkoutDB.session_id == session_id)
+        .group_by(WorkoutDB.id, WorkoutDB.name)
+    ).all()
+    if not counts:
+        raise ValueError("At least one workout is required in a session")
+    for name, sets, _ in counts:
+        validate_workout_limits(sets, name)
+    set_count = sum(sets for _, sets, _ in counts)
+    validate_session_limits(len(counts), set_count)
+    return {"workout_count": len(counts), "set_count": set_count, "total_volume": int(sum(volume for _, _, volume in counts))}
+
+
+def invalidate_edit(user_id: int, changes: dict) -> None:
+    """Drop derived data an edit made stale: the calendar only for the years it touched"""
+    generation = invalidate_user(user_id, keys={"calendar": changes["years"]})
+    record_workouts(user_id, generation, changes["added_names"], removed=changes["removed_names"])
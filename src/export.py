@@ -0,0 +1,231 @@
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import zlib
+from typing import IO, Iterable, Iterator, List, Optional, Sequence
+from sqlalchemy import select
+from .db_models import User, SessionDB, WorkoutDB, SetDB, RepsDB
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # optional: CSV only
+    pyarrow = None
+
+# Rows fetched from the server-side cursor, and written, per batch
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+
+# One row per set; every format has these columns in this order
+EXPORT_COLUMNS = (
+    ("user_id", SessionDB.user_id),
+    ("session_id", SessionDB.id),
+    ("session_started_at", SessionDB.started_at),
+    ("session_finished_at", SessionDB.finished_at),
+    ("workout_id", WorkoutDB.id),
+    ("exercise", WorkoutDB.name),
+    ("workout_started_at", WorkoutDB.started_at),
+    ("workout_finished_at", WorkoutDB.finished_at),
+    ("set_id", SetDB.id),
+    ("set_started_at", SetDB.started_at),
+    ("set_finished_at", SetDB.finished_at),
+    ("count", RepsDB.count),
+    ("intensity", RepsDB.intensity),
+    ("weight", RepsDB.weight),
+)
+COLUMN_NAMES = tuple(name for name, _ in EXPORT_COLUMNS)
+
+# format -> (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "csv.gz": ("application/gzip", "csv.gz"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+COLUMNAR_FORMATS = ("arrow", "parquet")
+
+
+def available_formats() -> List[str]:
+    return [fmt for fmt in FORMATS if pyarrow is not None or fmt not in COLUMNAR_FORMATS]
+
+
+def export_query(user_id: Optional[int] = None):
+    """
+    Every set of the finished sessions, flattened with its workout and
+    session, in session/workout/set order; a set without reps has empty rep columns
+    """
+    stmt = select(*(column for _, column in EXPORT_COLUMNS))\
+        .join(WorkoutDB, WorkoutDB.session_id == SessionDB.id)\
+        .join(SetDB, SetDB.workout_id == WorkoutDB.id)\
+        .outerjoin(RepsDB, RepsDB.set_id == SetDB.id)\
+        .where(SessionDB.in_progress.is_(False))
+    if user_id is not None:
+        stmt = stmt.where(SessionDB.user_id == user_id)
+    return stmt.order_by(SessionDB.id, WorkoutDB.id, SetDB.id)
+
+
+def iter_batches(conn, user_id: Optional[int] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Sequence[tuple]]:
+    """
+    The export rows in lists of at most batch_size, read through a
+    server-side cursor so only one batch is held in memory.
+    """
+    result = conn.execution_options(stream_results=True, max_row_buffer=batch_size)\
+        .execute(export_query(user_id))
+    try:
+        for partition in result.partitions(batch_size):
+            yield partition
+    finally:
+        result.close()
+
+
+def csv_chunks(batches: Iterable[Sequence[tuple]]) -> Iterator[bytes]:
+    """The header, then one encoded chunk of CSV per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    encoder = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = encoder.compress(chunk)
+        if data:
+            yield data
+    yield encoder.flush()
+
+
+def _arrow_schema():
+    return pyarrow.schema([
+        ("user_id", pyarrow.int64()),
+        ("session_id", pyarrow.int64()),
+        ("session_started_at", pyarrow.timestamp("us")),
+        ("session_finished_at", pyarrow.timestamp("us")),
+        ("workout_id", pyarrow.int64()),
+        ("exercise", pyarrow.string()),
+        ("workout_started_at", pyarrow.timestamp("us")),
+        ("workout_finished_at", pyarrow.timestamp("us")),
+        ("set_id", pyarrow.int64()),
+        ("set_started_at", pyarrow.timestamp("us")),
+        ("set_finished_at", pyarrow.timestamp("us")),
+        ("count", pyarrow.int32()),
+        ("intensity", pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+        ("weight", pyarrow.int32()),
+    ])
+
+
+def _record_batch(schema, batch: Sequence[tuple]):
+    columns = list(zip(*batch))
+    return pyarrow.RecordBatch.from_arrays(
+        [pyarrow.array(values, type=field.type) if not pyarrow.types.is_dictionary(field.type)
+         else pyarrow.array(values, type=pyarrow.string()).dictionary_encode()
+         for field, values in zip(schema, columns)],
+        schema=schema
+    )
+
+
+class _ChunkSink:
+    """A write-only file that collects what pyarrow writes so it can be handed on in chunks"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def columnar_chunks(batches: Iterable[Sequence[tuple]], fmt: str) -> Iterator[bytes]:
+    """An Arrow IPC stream or a Parquet file (one row group per batch), a chunk per batch"""
+    if pyarrow is None:
+        raise RuntimeError(f"{fmt} export needs pyarrow (pip install pyarrow)")
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    if fmt == "arrow":
+        writer = pyarrow.ipc.new_stream(sink, schema)
+    else:
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+    with writer:
+        for batch in batches:
+            writer.write_batch(_record_batch(schema, batch))
+            yield sink.take()
+    yield sink.take()
+
+
+def export_chunks(batches: Iterable[Sequence[tuple]], fmt: str) -> Iterator[bytes]:
+    """The export in `fmt`, as byte chunks produced one batch at a time"""
+    if fmt in COLUMNAR_FORMATS:
+        return columnar_chunks(batches, fmt)
+    chunks = csv_chunks(batches)
+    return gzip_chunks(chunks) if fmt == "csv.gz" else chunks
+
+
+def main():
+    from .database.database import get_engine, get_shard_engines, engine_for_user
+
+    parser = argparse.ArgumentParser(description="Export set-level history as one flat table")
+    owner = parser.add_mutually_exclusive_group(required=True)
+    owner.add_argument("--user", help="username to export")
+    owner.add_argument("--all", action="store_true", help="export every user's sets")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv.gz")
+    parser.add_argument("--output", "-o", help="file to write (default: stdout)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    if args.format not in available_formats():
+        parser.error(f"{args.format} export needs pyarrow (pip install pyarrow)")
+
+    directory = get_engine()
+    started = time.perf_counter()
+    user_id, engines = None, get_shard_engines() or [directory]
+    if args.user:
+        with directory.connect() as conn:
+            user = conn.execute(select(User.id, User.shard).where(User.username == args.user)).one_or_none()
+        if user is None:
+            parser.error(f"no user named {args.user!r}")
+        user_id, engines = user.id, [engine_for_user(user)]
+    rows = 0
+
+    def batches():
+        nonlocal rows
+        # One shard after another when exporting everyone
+        for engine in dict.fromkeys(engines):
+            with engine.connect() as conn:
+                for batch in iter_batches(conn, user_id, args.batch_size):
+                    rows += len(batch)
+                    yield batch
+
+    with open(args.output, "wb") if args.output else sys.stdout.buffer as sink:
+        for chunk in export_chunks(batches(), args.format):
+            sink.write(chunk)
+    print(f"Exported {rows:,} sets in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+import anyio
+import anyio.to_thread
+from sqlalchemy import text
+from .database.database import POOL_SIZE, MAX_OVERFLOW, get_engine, get_shard_engines
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background database probes
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "5"))
+# A probe that takes longer than this counts as failed
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+# Not ready (and not live, if the prober itself stalls) once the last probe
+# is older than this
+HEALTH_STALE_AFTER = float(os.getenv("HEALTH_STALE_AFTER", str(3 * HEALTH_PROBE_INTERVAL)))
+
+
+def app_databases() -> Dict[str, object]:
+    """The app's engines: the primary database and any other shards"""
+    primary = get_engine()
+    databases = {"primary": primary}
+    for shard, engine in enumerate(get_shard_engines()):
+        if engine is not primary:
+            databases[f"shard-{shard}"] = engine
+    return databases
+
+
+def pool_status(engine) -> dict:
+    """The engine's connection pool counters; in memory, no I/O"""
+    pool = engine.pool
+    capacity = POOL_SIZE + MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": max(0, pool.overflow()),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3),
+    }
+
+
+def probe_database(engine) -> dict:
+    """
+    Run SELECT 1 on a pooled connection and time it. With every connection
+    checked out the probe is skipped, since waiting for one would only queue
+    behind requests: a busy database still counts as reachable (saturation
+    is reported in the pool status and on /metrics), so a load spike doesn't
+    take every instance out of rotation at once.
+    """
+    if engine.pool.checkedout() >= POOL_SIZE + MAX_OVERFLOW:
+        return {"ok": True, "latency_ms": None, "skipped": "connection pool exhausted"}
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"ok": False, "latency_ms": None, "error": str(e)}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+class HealthProber:
+    """
+    Probes the databases in the background and keeps the last result, so
+    health checks are answered from memory.
+
+    `databases` returns the engines to probe by name; it is called on each
+    probe, so engines created after startup are picked up. Probes run on
+    their own thread (one at a time), never queueing behind requests for
+    the shared threadpool; one that exceeds the timeout is abandoned and
+    counts as failed.
+    """
+
+    def __init__(
+        self,
+        databases: Callable[[], Dict[str, object]] = app_databases,
+        interval: float = HEALTH_PROBE_INTERVAL,
+        timeout: float = HEALTH_PROBE_TIMEOUT,
+        stale_after: float = HEALTH_STALE_AFTER
+    ):
+        self.databases = databases
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.started_at = time.monotonic()
+        self.results: Dict[str, dict] = {}
+        self.probed_at: Optional[float] = None
+        self._limiter = anyio.CapacityLimiter(1)
+        self._task: Optional[asyncio.Task] = None
+
+    def _probe(self, engines: Dict[str, object]) -> Dict[str, dict]:
+        return {name: probe_database(engine) for name, engine in engines.items()}
+
+    async def probe(self) -> None:
+        engines = self.databases()
+        results = None
+        with anyio.move_on_after(self.timeout):
+            results = await anyio.to_thread.run_sync(self._probe, engines, limiter=self._limiter, abandon_on_cancel=True)
+        if results is None:
+            error = f"probe timed out after {self.timeout:g}s"
+            results = {name: {"ok": False, "latency_ms": None, "error": error} for name in engines}
+        for name, result in results.items():
+            if not result["ok"] and self.results.get(name, {}).get("ok", True):
+                logger.warning("Database %s failed its health probe: %s", name, result["error"])
+        self.results = results
+        self.probed_at = time.monotonic()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.probe()
+            except Exception:
+                logger.exception("Health probe failed")
+
+    def start(self) -> None:
+        """Probe every interval from now on; call probe() first to be ready at once"""
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _age(self) -> Optional[float]:
+        return None if self.probed_at is None else time.monotonic() - self.probed_at
+
+    def liveness(self) -> Tuple[bool, dict]:
+        """Live while the prober keeps probing; the database's health doesn't matter"""
+        age = self._age()
+        running = self._task is not None and not self._task.done()
+        live = running and age is not None and age <= self.stale_after
+        return live, {
+            "status": "alive" if live else "stalled",
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1),
+            "last_probe_seconds_ago": None if age is None else round(age, 2),
+        }
+
+    def readiness(self) -> Tuple[bool, dict]:
+        """Ready when the last probe is recent and every database is reachable; pool saturation doesn't count"""
+        age = self._age()
+        engines = self.databases()
+        databases = {
+            name: {**self.results.get(name, {"ok": False, "latency_ms": None, "error": "not probed yet"}), "pool": pool_status(engine)}
+            for name, engine in engines.items()
+        }
+        fresh = age is not None and age <= self.stale_after
+        ready = fresh and all(database["ok"] for database in databases.values())
+        return ready, {
+            "status": "ready" if ready else "not ready",
+            "last_probe_seconds_ago": None if age is None else round(age, 2),
+            "databases": databases,
+        }
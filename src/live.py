@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+from fastapi import WebSocket, status
+from pydantic import ValidationError
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
+from .models import Set, LiveSessionStart, LiveWorkoutStart, LiveEnd
+from .db_models import SessionDB, WorkoutDB, SetDB, RepsDB
+from .records import update_personal_records
+from .cache import invalidate_user
+from .suggest import record_workouts
+from .snapshots import session_snapshot
+from .validation.validation import (
+    to_utc_naive,
+    validate_time_order,
+    validate_session_limits,
+    validate_workout_limits
+)
+
+logger = logging.getLogger(__name__)
+
+# Buffered sets are written once there are this many...
+LIVE_FLUSH_SETS = int(os.getenv("LIVE_FLUSH_SETS", "10"))
+# ...or once the oldest has waited this many seconds
+LIVE_FLUSH_SECONDS = float(os.getenv("LIVE_FLUSH_SECONDS", "30"))
+# A connection that sends nothing for this long is closed and its session finalized
+LIVE_IDLE_TIMEOUT = float(os.getenv("LIVE_IDLE_TIMEOUT", "900"))
+
+
+class LiveSession:
+    """
+    The server side of one /sessions/live connection.
+
+    The session row is written, marked in_progress, when the client starts.
+    Sets are validated as they arrive and buffered; the buffer is written
+    with its workout in one transaction every LIVE_FLUSH_SETS sets, once the
+    oldest set has waited LIVE_FLUSH_SECONDS, and when the workout ends.
+    finish() writes what is left, sets the session's end time, clears
+    in_progress, folds the session into personal records and writes its
+    snapshot.
+    """
+
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self.session_id: Optional[int] = None
+        self.started_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.workout: Optional[dict] = None
+        self.pending: List[Set] = []
+        self.pending_since: Optional[float] = None
+        self.workouts = 0
+        self.sets = 0
+        self.persisted = 0
+        self.finished = False
+
+    def start(self, message: LiveSessionStart) -> int:
+        if self.session_id is not None:
+            raise ValueError("Session already started")
+        self.started_at = self.last_finished_at = to_utc_naive(message.started_at)
+        db_session = SessionDB(
+            user_id=self.user_id,
+            started_at=self.started_at,
+            # Kept at the last written set's end until the session finishes
+            finished_at=self.started_at,
+            notes=message.notes,
+            in_progress=True
+        )
+        self.db.add(db_session)
+        self.db.flush()
+        # Read before commit expires it, so no new transaction holds a connection while the client is idle
+        self.session_id = db_session.id
+        self.db.commit()
+        return self.session_id
+
+    def start_workout(self, message: LiveWorkoutStart) -> None:
+        if self.session_id is None:
+            raise ValueError("Start the session before a workout")
+        started_at = to_utc_naive(message.started_at)
+        if started_at < self.started_at:
+            raise ValueError("Workout cannot start before its session")
+        validate_session_limits(self.workouts + 1, self.sets)
+        if self.workout is not None:
+            self.end_workout(LiveEnd())
+        self.workout = {"id": None, "name": message.name, "started_at": started_at, "sets": 0}
+        self.workouts += 1
+
+    def add_set(self, set_: Set) -> None:
+        if self.workout is None:
+            raise ValueError("Start a workout before sending sets")
+        started_at = to_utc_naive(set_.started_at)
+        if started_at < self.workout["started_at"]:
+            raise ValueError("Set cannot start before its workout")
+        validate_workout_limits(self.workout["sets"] + 1, self.workout["name"])
+        validate_session_limits(self.workouts, self.sets + 1)
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending.append(set_)
+        self.workout["sets"] += 1
+        self.sets += 1
+
+    def flush_due(self, now: float) -> bool:
+        return len(self.pending) >= LIVE_FLUSH_SETS or self.seconds_until_flush(now) == 0
+
+    def seconds_until_flush(self, now: float) -> Optional[float]:
+        """How long the buffer may still wait, or None when it is empty"""
+        if not self.pending:
+            return None
+        return max(0.0, self.pending_since + LIVE_FLUSH_SECONDS - now)
+
+    def flush(self) -> None:
+        """Write the buffered sets, and their workout if it is new, in one transaction"""
+        if not self.pending:
+            return
+        workout = self.workout
+        finished_at = max(to_utc_naive(set_.finished_at) for set_ in self.pending)
+        new_workout = workout["id"] is None
+        if new_workout:
+            db_workout = WorkoutDB(
+                session_id=self.session_id,
+                name=workout["name"],
+                started_at=workout["started_at"],
+                finished_at=finished_at
+            )
+            self.db.add(db_workout)
+            self.db.flush()
+            workout["id"] = db_workout.id
+        else:
+            self.db.execute(update(WorkoutDB).where(WorkoutDB.id == workout["id"]).values(finished_at=finished_at))
+        for set_ in self.pending:
+            db_set = SetDB(
+                workout_id=workout["id"],
+                started_at=to_utc_naive(set_.started_at),
+                finished_at=to_utc_naive(set_.finished_at)
+            )
+            db_set.reps = RepsDB(count=set_.reps.count, intensity=set_.reps.intensity, weight=set_.reps.weight)
+            self.db.add(db_set)
+        self.last_finished_at = max(self.last_finished_at, finished_at)
+        self.db.execute(
+            update(SessionDB).where(SessionDB.id == self.session_id).values(
+                finished_at=self.last_finished_at,
+                workout_count=SessionDB.workout_count + int(new_workout),
+                set_count=SessionDB.set_count + len(self.pending),
+                total_volume=SessionDB.total_volume + sum(set_.reps.count * (set_.reps.weight or 0) for set_ in self.pending)
+            )
+        )
+        self.db.commit()
+        self.persisted += len(self.pending)
+        self.pending.clear()
+        self.pending_since = None
+        # Names are counted once the session finishes
+        record_workouts(self.user_id, invalidate_user(self.user_id))
+
+    def end_workout(self, message: LiveEnd) -> None:
+        if self.workout is None:
+            raise ValueError("No workout in progress")
+        self.flush()
+        workout, self.workout = self.workout, None
+        if workout["id"] is None:
+            # Nothing was recorded for it, so it is dropped
+            self.workouts -= 1
+            return
+        if message.finished_at is not None:
+            finished_at = to_utc_naive(message.finished_at)
+            validate_time_order(workout["started_at"], finished_at, "Workout")
+            if finished_at > self.last_finished_at:
+                self.last_finished_at = finished_at
+            self.db.execute(update(WorkoutDB).where(WorkoutDB.id == workout["id"]).values(finished_at=finished_at))
+            self.db.commit()
+
+    def finish(self, message: Optional[LiveEnd] = None) -> List[str]:
+        """
+        Close the session; returns the exercises where a personal record was
+        broken. A session without a single set is deleted instead.
+        """
+        message = message or LiveEnd()
+        if self.workout is not None:
+            self.end_workout(LiveEnd())
+        if self.sets == 0:
+            self.db.execute(delete(SessionDB).where(SessionDB.id == self.session_id))
+            self.db.commit()
+            self.finished = True
+            return []
+
+        finished_at = self.last_finished_at
+        if message.finished_at is not None:
+            finished_at = max(finished_at, to_utc_naive(message.finished_at))
+        values = {"finished_at": finished_at, "in_progress": False}
+        if message.notes is not None:
+            values["notes"] = message.notes
+        self.db.execute(update(SessionDB).where(SessionDB.id == self.session_id).values(**values))
+        db_session = self.db.query(SessionDB)\
+            .options(
+                joinedload(SessionDB.workouts)
+                .joinedload(WorkoutDB.sets)
+                .joinedload(SetDB.reps)
+            )\
+            .filter(SessionDB.id == self.session_id)\
+            .populate_existing()\
+            .one()
+        new_records = update_personal_records(self.db, self.user_id, db_session)
+        db_session.snapshot = session_snapshot(db_session)
+        # Read before commit expires them
+        workout_names = [workout.name for workout in db_session.workouts]
+        self.db.commit()
+        self.finished = True
+        record_workouts(self.user_id, invalidate_user(self.user_id), workout_names)
+        return new_records
+
+    def abandon(self) -> None:
+        """The connection went away without an end message: keep what was sent"""
+        if self.session_id is None or self.finished:
+            return
+        self.db.rollback()
+        self.finish()
+
+
+async def _receive(websocket: WebSocket, timeout: float) -> Optional[dict]:
+    """The next message, or None if none arrived within timeout"""
+    try:
+        text = await asyncio.wait_for(websocket.receive_text(), timeout)
+    except asyncio.TimeoutError:
+        return None
+    message = json.loads(text)
+    if not isinstance(message, dict):
+        raise ValueError("Messages must be JSON objects")
+    return message
+
+
+async def run_live_session(websocket: WebSocket, live: LiveSession) -> None:
+    """
+    Handle messages until the client ends the session or goes idle.
+
+    Messages are JSON objects with a "type": start, workout_start, set,
+    workout_end or end (see LiveSessionStart, LiveWorkoutStart, Set and
+    LiveEnd for their fields). Invalid messages are answered with an error
+    and otherwise ignored. Database work runs in the threadpool.
+    """
+    while True:
+        wait = live.seconds_until_flush(time.monotonic())
+        try:
+            message = await _receive(websocket, LIVE_IDLE_TIMEOUT if wait is None else wait)
+            if message is None:
+                if not live.pending:
+                    await websocket.close(code=status.WS_1001_GOING_AWAY, reason="idle")
+                    return
+                await run_in_threadpool(live.flush)
+                await websocket.send_json({"type": "flushed", "persisted": live.persisted})
+                continue
+
+            kind = message.get("type")
+            if kind == "start":
+                session_id = await run_in_threadpool(live.start, LiveSessionStart.model_validate(message))
+                await websocket.send_json({"type": "started", "session_id": session_id})
+            elif kind == "workout_start":
+                await run_in_threadpool(live.start_workout, LiveWorkoutStart.model_validate(message))
+                await websocket.send_json({"type": "workout_started", "workouts": live.workouts})
+            elif kind == "set":
+                live.add_set(Set.model_validate(message))
+                if live.flush_due(time.monotonic()):
+                    await run_in_threadpool(live.flush)
+                await websocket.send_json({"type": "ack", "sets": live.sets, "persisted": live.persisted})
+            elif kind == "workout_end":
+                await run_in_threadpool(live.end_workout, LiveEnd.model_validate(message))
+                await websocket.send_json({"type": "workout_ended", "persisted": live.persisted})
+            elif kind == "end":
+                if live.session_id is None:
+                    raise ValueError("Session was never started")
+                new_records = await run_in_threadpool(live.finish, LiveEnd.model_validate(message))
+                await websocket.send_json({
+                    "type": "finished",
+                    "session_id": live.session_id if live.sets else None,
+                    "personal_records": new_records
+                })
+                await websocket.close()
+                return
+            else:
+                raise ValueError(f"Unknown message type {kind!r}")
+        except ValidationError as ve:
+            await websocket.send_json({"type": "error", "detail": ve.errors(include_url=False, include_context=False, include_input=False)})
+        except ValueError as ve:
+            await websocket.send_json({"type": "error", "detail": str(ve)})
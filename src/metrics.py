@@ -0,0 +1,207 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Dict, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RequestDbStats:
+    """Database work done on behalf of one request"""
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Set by the middleware for the duration of a request. Sync endpoints and
+# dependencies run in the threadpool with a copy of this context, so they
+# share the same stats object.
+_request_db: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_db.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_db.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += time.perf_counter() - getattr(context, "_metrics_started", time.perf_counter())
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+class Registry:
+    """
+    Per-process request metrics.
+
+    Observations and rendering both happen on the event loop thread (the
+    middleware and the async /metrics endpoint), so no locking is needed.
+    Each worker process keeps its own registry and is scraped separately.
+    """
+    LABELS = ("method", "route")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.response_size: Dict[Tuple[str, str], Histogram] = {}
+        self.db_queries: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], Histogram] = {}
+        # All four histograms of a route, so recording costs one lookup
+        self._routes: Dict[Tuple[str, str], Tuple[Histogram, Histogram, Histogram, Histogram]] = {}
+        self.in_flight = 0
+
+    def _route_histograms(self, key):
+        histograms = self._routes.get(key)
+        if histograms is None:
+            histograms = self._routes[key] = (
+                self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)),
+                self.response_size.setdefault(key, Histogram(SIZE_BUCKETS)),
+                self.db_queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)),
+                self.db_seconds.setdefault(key, Histogram(LATENCY_BUCKETS)),
+            )
+        return histograms
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int, db: RequestDbStats) -> None:
+        status_key = (method, route, status)
+        self.requests[status_key] = self.requests.get(status_key, 0) + 1
+        latency, response_size, db_queries, db_seconds = self._route_histograms((method, route))
+        latency.observe(seconds)
+        response_size.observe(size)
+        db_queries.observe(db.queries)
+        db_seconds.observe(db.seconds)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = [
+            "# HELP http_requests_total HTTP requests by method, route and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f"http_requests_total{_labels(('method', 'route', 'status'), (method, route, status))} {count}")
+
+        lines += [
+            "# HELP http_requests_in_flight HTTP requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+
+        for name, help_text, family in (
+            ("http_request_duration_seconds", "HTTP request latency.", self.latency),
+            ("http_response_size_bytes", "HTTP response body size.", self.response_size),
+            ("http_request_db_queries", "SQL statements executed per request.", self.db_queries),
+            ("http_request_db_duration_seconds", "Time spent in SQL statements per request.", self.db_seconds),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for key, histogram in sorted(family.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{name}_bucket{_labels(self.LABELS, key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{name}_bucket{_labels(self.LABELS, key, le)} {histogram.count}")
+                lines.append(f"{name}_sum{_labels(self.LABELS, key)} {histogram.total}")
+                lines.append(f"{name}_count{_labels(self.LABELS, key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def render_pools(pools: Dict[str, dict]) -> str:
+    """Connection pool gauges per database, from health.pool_status(), in the same format"""
+    lines = []
+    for name, key, help_text in (
+        ("db_pool_checked_out", "checked_out", "Pooled connections in use."),
+        ("db_pool_capacity", "capacity", "Connections the pool can hand out, overflow included."),
+        ("db_pool_saturation", "saturation", "Share of the pool's capacity in use."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for database, status in sorted(pools.items()):
+            lines.append(f"{name}{_labels(('database',), (database,))} {status[key]}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware that records request, response and database metrics.
+
+    Routes are labelled by their path template (e.g. /sessions/{user_id}), so
+    label cardinality stays bounded; requests that match no route are
+    labelled "unmatched".
+    """
+
+    def __init__(self, app, registry: Registry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        db_stats = RequestDbStats()
+        token = _request_db.set(db_stats)
+        response = {"status": 500, "size": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        registry = self.registry
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.in_flight -= 1
+            _request_db.reset(token)
+            route = scope.get("route")
+            registry.observe(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                response["status"],
+                elapsed,
+                response["size"],
+                db_stats
+            )
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, field_validator, model_validator, ValidationError, Field
-from typing import List, Union, Optional
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, EmailStr, computed_field, field_validator, model_validator, ValidationError, ValidationInfo, Field
+from typing import Dict, List, Union, Optional
+from datetime import date, datetime
 import json
 from .validation.validation import (
     validate_workout_name, 
@@ -12,6 +12,10 @@ from .validation.validation import (
     validate_time_order
 )
 
+def _historical(info: ValidationInfo) -> bool:
+    # Bulk imports validate with context={"historical": True} to accept old sessions
+    return bool(info.context and info.context.get("historical"))
+
 class User(BaseModel):
     username: str
     email: EmailStr
@@ -48,13 +52,13 @@ class Set(BaseModel):
 
     @field_validator("started_at")
     @classmethod
-    def validate_started_at(cls, v):
-        return validate_datetime(v, "Set start time")
+    def validate_started_at(cls, v, info: ValidationInfo):
+        return validate_datetime(v, "Set start time", allow_past=_historical(info))
     
     @field_validator("finished_at")
     @classmethod
-    def validate_finished_at(cls, v):
-        return validate_datetime(v, "Set end time")
+    def validate_finished_at(cls, v, info: ValidationInfo):
+        return validate_datetime(v, "Set end time", allow_past=_historical(info))
 
     @model_validator(mode='after')
     def check_finished_after_started(self):
@@ -74,13 +78,13 @@ class Workout(BaseModel):
     
     @field_validator("started_at")
     @classmethod
-    def validate_workout_started_at(cls, v):
-        return validate_datetime(v, "Workout start time")
+    def validate_workout_started_at(cls, v, info: ValidationInfo):
+        return validate_datetime(v, "Workout start time", allow_past=_historical(info))
     
     @field_validator("finished_at")
     @classmethod
-    def validate_workout_finished_at(cls, v):
-        return validate_datetime(v, "Workout end time")
+    def validate_workout_finished_at(cls, v, info: ValidationInfo):
+        return validate_datetime(v, "Workout end time", allow_past=_historical(info))
 
     @field_validator("sets")
     @classmethod
@@ -105,13 +109,13 @@ class Session(BaseModel):
 
     @field_validator("started_at")
     @classmethod
-    def validate_session_started_at(cls, v):
-        return validate_datetime(v, "Session start time")
+    def validate_session_started_at(cls, v, info: ValidationInfo):
+        return validate_datetime(v, "Session start time", allow_past=_historical(info))
     
     @field_validator("finished_at")
     @classmethod
-    def validate_session_finished_at(cls, v):
-        return validate_datetime(v, "Session end time")
+    def validate_session_finished_at(cls, v, info: ValidationInfo):
+        return validate_datetime(v, "Session end time", allow_past=_historical(info))
 
     @field_validator("workouts")
     @classmethod
@@ -138,6 +142,217 @@ class Session(BaseModel):
         validate_time_order(self.started_at, self.finished_at, "Session")
         return self
 
+class StoredSet(Set):
+    id: int
+
+class StoredWorkout(Workout):
+    id: int
+    sets: List[StoredSet]
+
+class StoredSession(Session):
+    """A session as read back, with the ids and version PATCH refers to"""
+    id: int
+    version: int
+    workouts: List[StoredWorkout]
+
+class SessionSummary(BaseModel):
+    """A session without its workouts, from the sessions row alone (?depth=summary)"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    version: int
+    started_at: datetime
+    finished_at: datetime
+    notes: Optional[str] = None
+    workout_count: int
+    set_count: int
+    total_volume: int
+
+    @computed_field
+    @property
+    def duration_seconds(self) -> int:
+        return int((self.finished_at - self.started_at).total_seconds())
+
+class SessionClone(BaseModel):
+    """
+    When a repeated session happens: at started_at, or offset_seconds after
+    the original (neither: starting now). Notes default to the original's.
+    """
+    started_at: Optional[datetime] = None
+    offset_seconds: Optional[int] = None
+    notes: Optional[str] = None
+
+    @field_validator("started_at")
+    @classmethod
+    def validate_clone_started_at(cls, v):
+        return None if v is None else validate_datetime(v, "Session start time")
+
+    @field_validator("notes")
+    @classmethod
+    def validate_clone_notes(cls, v):
+        return validate_notes(v)
+
+    @model_validator(mode='after')
+    def check_one_timing(self):
+        if self.started_at is not None and self.offset_seconds is not None:
+            raise ValueError("Give started_at or offset_seconds, not both")
+        return self
+
+class SetPatch(BaseModel):
+    """Changes to one stored set; omitted fields are left as they are"""
+    id: int
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    reps: Optional[Reps] = None
+
+    @field_validator("started_at")
+    @classmethod
+    def validate_patch_started_at(cls, v):
+        return v if v is None else validate_datetime(v, "Set start time")
+
+    @field_validator("finished_at")
+    @classmethod
+    def validate_patch_finished_at(cls, v):
+        return v if v is None else validate_datetime(v, "Set end time")
+
+class WorkoutPatch(BaseModel):
+    """Changes to one stored workout and its sets"""
+    id: int
+    name: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    add_sets: List[Set] = []
+    update_sets: List[SetPatch] = []
+    remove_sets: List[int] = []
+
+    @field_validator("name")
+    @classmethod
+    def validate_patch_name(cls, v):
+        return v if v is None else validate_workout_name(v)
+
+    @field_validator("started_at")
+    @classmethod
+    def validate_patch_started_at(cls, v):
+        return v if v is None else validate_datetime(v, "Workout start time")
+
+    @field_validator("finished_at")
+    @classmethod
+    def validate_patch_finished_at(cls, v):
+        return v if v is None else validate_datetime(v, "Workout end time")
+
+class SessionPatch(BaseModel):
+    """
+    A diff against a stored session. version is the version the client
+    read; notes is only changed when present (null clears it).
+    """
+    version: int
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    notes: Optional[str] = None
+    add_workouts: List[Workout] = []
+    update_workouts: List[WorkoutPatch] = []
+    remove_workouts: List[int] = []
+
+    @field_validator("started_at")
+    @classmethod
+    def validate_patch_started_at(cls, v):
+        return v if v is None else validate_datetime(v, "Session start time")
+
+    @field_validator("finished_at")
+    @classmethod
+    def validate_patch_finished_at(cls, v):
+        return v if v is None else validate_datetime(v, "Session end time")
+
+    @field_validator("notes")
+    @classmethod
+    def validate_patch_notes(cls, v):
+        return validate_notes(v)
+
+class LiveSessionStart(BaseModel):
+    """First message on /sessions/live"""
+    started_at: datetime
+    notes: Optional[str] = None
+
+    @field_validator("started_at")
+    @classmethod
+    def validate_live_started_at(cls, v):
+        return validate_datetime(v, "Session start time")
+
+    @field_validator("notes")
+    @classmethod
+    def validate_live_notes(cls, v):
+        return validate_notes(v)
+
+class LiveWorkoutStart(BaseModel):
+    name: str
+    started_at: datetime
+
+    @field_validator("name")
+    @classmethod
+    def validate_live_workout_name(cls, v):
+        return validate_workout_name(v)
+
+    @field_validator("started_at")
+    @classmethod
+    def validate_live_workout_started_at(cls, v):
+        return validate_datetime(v, "Workout start time")
+
+class LiveEnd(BaseModel):
+    """workout_end and end messages; finished_at defaults to the last set's end"""
+    finished_at: Optional[datetime] = None
+    notes: Optional[str] = None
+
+    @field_validator("finished_at")
+    @classmethod
+    def validate_live_finished_at(cls, v):
+        return v if v is None else validate_datetime(v, "End time")
+
+    @field_validator("notes")
+    @classmethod
+    def validate_live_end_notes(cls, v):
+        return validate_notes(v)
+
+class SessionSearchResults(BaseModel):
+    total: int
+    page: int
+    page_size: int
+    sessions: List[StoredSession]
+
+class PersonalRecord(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    exercise: str
+    heaviest_weight: Optional[int] = None
+    heaviest_weight_reps: Optional[int] = None
+    heaviest_weight_at: Optional[datetime] = None
+    most_reps: Optional[int] = None
+    most_reps_weight: Optional[int] = None
+    most_reps_at: Optional[datetime] = None
+    best_estimated_1rm: Optional[float] = None
+    best_estimated_1rm_at: Optional[datetime] = None
+    best_session_volume: Optional[int] = None
+    best_session_volume_at: Optional[datetime] = None
+
+class TrainingLoad(BaseModel):
+    days: List[date]
+    daily_volume: List[float]
+    acwr: List[Optional[float]]  # None until there is chronic load to compare against
+    fitness: List[float]
+    fatigue: List[float]
+    form: List[float]
+    week_starts: List[date]
+    weekly_volume: Dict[str, List[float]]  # keyed by intensity
+
+class CalendarHeatmap(BaseModel):
+    year: int
+    # One slot per day of the year (index 0 is January 1st); slot 365 stays 0 outside leap years
+    counts: List[int]
+    volume: List[int]
+
+class ExerciseSuggestion(BaseModel):
+    name: str
+    count: int
+
 def create_session(json_input: Union[str, bytes, bytearray, dict]) -> Session:
     from pydantic import ValidationError
     try:
@@ -151,7 +366,6 @@ def create_session(json_input: Union[str, bytes, bytearray, dict]) -> Session:
             data = json.loads(json_data)
         # Handle JSON string
         else:
-            print(f"\n\n\n\nWE ARE HERE\n\n\n\n")
             data = json.loads(json_input)
 
         # Validate and create Session object
@@ -166,4 +380,14 @@ def create_session(json_input: Union[str, bytes, bytearray, dict]) -> Session:
     except FileNotFoundError:
         raise ValueError(f"File not found: {json_input}")
     except Exception as e:
-        raise ValueError(f"An unexpected error occurred: {e}")
\ No newline at end of file
+        raise ValueError(f"An unexpected error occurred: {e}")
+
+class ProfileInfo(BaseModel):
+    id: str
+    created_at: datetime
+    method: str
+    path: str
+    route: Optional[str] = None
+    status: int
+    duration_ms: float
+    trigger: str
@@ -1,13 +1,51 @@
+import argparse
+import codecs
+import csv
+import io
 import json
-from src.models import create_session
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session as DBSession
+from src.models import Session, create_session
+from src.db_models import User, SessionDB, WorkoutDB, SetDB, RepsDB, ImportCheckpointDB
+from src.records import session_bests, apply_session_bests
+from src.cache import invalidate_user
+from src.suggest import forget_user
+from src.snapshots import build_snapshot
+from src.validation.validation import to_utc_naive
 
+logger = logging.getLogger(__name__)
+
+# Sessions validated and written per transaction (and per checkpoint)
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+_READ_SIZE = 1 << 20
+# Larger records in a JSON array are treated as malformed rather than buffered
+_MAX_RECORD_SIZE = 64 << 20
+_WHITESPACE = " \t\r\n"
+
+# Column order of the rows built by write_sessions, and of COPY. Nothing
+# references reps, so they take their ids from the column default
+_COLUMNS = {
+    SessionDB: ("id", "user_id", "started_at", "finished_at", "notes", "workout_count", "set_count", "total_volume", "snapshot"),
+    WorkoutDB: ("id", "session_id", "name", "started_at", "finished_at"),
+    SetDB: ("id", "workout_id", "started_at", "finished_at"),
+    RepsDB: ("set_id", "count", "intensity", "weight"),
+}
 
 
 def import_json(file_path):
     try:
         with open(file_path, 'r') as file:
             data = json.load(file)
-            print(data)
             return create_session(data)
     except FileNotFoundError:
         return f'Error: file not found at path {file_path}'
@@ -19,6 +57,427 @@ def import_json(file_path):
 def add_workout():
     response = import_json("test/sample_workout.json")
     for workout in response.workouts:
-        print(workout)
-        print("\n---------\n")
+        logger.debug("Imported workout %s", workout)
     return response
+
+
+class InvalidRecord:
+    """A line of a JSON Lines file that isn't valid JSON; rejected like any other bad record"""
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def _byte_length(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def iter_records(path: str, start: int = 0) -> Iterator[Tuple[object, int]]:
+    """
+    Yield (record, end_offset) for each record of an export, reading it in
+    fixed-size blocks so memory does not grow with the file.
+
+    A file whose first character is "[" is one JSON array of records;
+    anything else is JSON Lines. end_offset is the byte offset just past the
+    record, so iter_records(path, end_offset) resumes after it.
+    """
+    with open(path, "rb") as file:
+        first = b""
+        while not first:
+            block = file.read(4096)
+            if not block:
+                break
+            first = block.lstrip()[:1]
+        file.seek(start)
+        if first == b"[":
+            yield from _iter_array(file, start)
+        else:
+            yield from _iter_lines(file, start)
+
+
+def _iter_lines(file, offset: int) -> Iterator[Tuple[object, int]]:
+    for line in file:
+        offset += len(line)
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line), offset
+        except ValueError as e:
+            yield InvalidRecord(f"invalid JSON: {e}"), offset
+
+
+def _iter_array(file, offset: int) -> Iterator[Tuple[object, int]]:
+    """Records of a top-level JSON array, parsed incrementally with raw_decode"""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    # offset is always the byte offset of buffer[pos]
+    buffer, pos, eof = "", 0, False
+    # Resuming lands just past a record, before its "," or the closing "]"
+    expect = "separator" if offset else "open"
+
+    def refill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        if len(buffer) - pos > _MAX_RECORD_SIZE:
+            raise ValueError(f"record at byte {offset} is larger than {_MAX_RECORD_SIZE} bytes or malformed")
+        block = file.read(_READ_SIZE)
+        eof = not block
+        buffer = buffer[pos:] + utf8.decode(block, final=eof)
+        pos = 0
+        return True
+
+    while True:
+        skipped = pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        offset += pos - skipped
+        if pos == len(buffer):
+            if refill():
+                continue
+            if expect == "done":
+                return
+            raise ValueError("unexpected end of file inside the JSON array")
+
+        char = buffer[pos]
+        if expect == "open":
+            if char != "[":
+                raise ValueError("expected a JSON array")
+            pos += 1
+            offset += 1
+            expect = "first"
+        elif expect == "separator" or (expect == "first" and char == "]"):
+            if char not in ",]":
+                raise ValueError(f"expected ',' or ']' at byte {offset}")
+            pos += 1
+            offset += 1
+            expect = "done" if char == "]" else "value"
+        elif expect == "done":
+            raise ValueError(f"unexpected data after the JSON array at byte {offset}")
+        else:
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Most likely the record runs past the end of the buffer
+                if refill():
+                    continue
+                raise ValueError(f"invalid JSON in array at byte {offset}: {e.msg}") from e
+            offset += _byte_length(buffer[pos:end])
+            pos = end
+            expect = "separator"
+            yield record, offset
+
+
+def _session_rows(session: Session) -> tuple:
+    return (
+        to_utc_naive(session.started_at),
+        to_utc_naive(session.finished_at),
+        session.notes,
+        [
+            (
+                workout.name,
+                to_utc_naive(workout.started_at),
+                to_utc_naive(workout.finished_at),
+                [
+                    (to_utc_naive(set_.started_at), to_utc_naive(set_.finished_at), set_.reps.count, set_.reps.intensity, set_.reps.weight)
+                    for set_ in workout.sets
+                ],
+            )
+            for workout in session.workouts
+        ],
+    )
+
+
+def validate_records(records: List[object], user_id: Optional[int] = None) -> list:
+    """
+    Validate raw export records the way POST /sessions does, except that
+    sessions older than a year are allowed.
+
+    Returns, per record, either (user_id, rows, personal record bests) or
+    the error message. Runs in the import's worker processes.
+    """
+    results = []
+    for record in records:
+        try:
+            if isinstance(record, InvalidRecord):
+                raise ValueError(record.error)
+            if not isinstance(record, dict):
+                raise ValueError("record is not a JSON object")
+            data = record.get("session", record)
+            owner = user_id or data.get("user_id") or record.get("user_id")
+            if owner is None:
+                raise ValueError("record has no user_id")
+            session = Session.model_validate(data, context={"historical": True})
+            results.append((int(owner), _session_rows(session), session_bests(session)))
+        except (ValueError, TypeError, AttributeError) as e:
+            results.append(str(e))
+    return results
+
+
+def _allocate_ids(db: DBSession, model, count: int) -> Iterator[int]:
+    """Reserve `count` primary keys up front so child rows can reference their parents"""
+    table = model.__tablename__
+    if db.bind.dialect.name == "postgresql":
+        return iter(db.execute(
+            text(f"SELECT nextval(pg_get_serial_sequence('{table}', 'id')) FROM generate_series(1, :count)"),
+            {"count": count}
+        ).scalars().all())
+    first = db.execute(select(func.coalesce(func.max(model.id), 0))).scalar_one() + 1
+    return iter(range(first, first + count))
+
+
+def _copy_rows(db: DBSession, model, rows: List[tuple]) -> None:
+    buffer = io.StringIO()
+    # Unquoted empty fields are NULL to COPY; validated text fields are never empty
+    csv.writer(buffer).writerows(
+        [json.dumps(value) if isinstance(value, dict) else value for value in row] for row in rows
+    )
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {model.__tablename__} ({', '.join(_COLUMNS[model])}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def write_sessions(db: DBSession, sessions: List[tuple], method: str = "copy") -> Dict[type, int]:
+    """
+    Insert validated sessions, as returned by validate_records, with one
+    COPY (or one multi-row INSERT) per table. Returns the rows written per table.
+    """
+    counts = {
+        SessionDB: len(sessions),
+        WorkoutDB: sum(len(rows[3]) for _, rows, _ in sessions),
+        SetDB: sum(len(workout[3]) for _, rows, _ in sessions for workout in rows[3]),
+    }
+    ids = {model: _allocate_ids(db, model, count) for model, count in counts.items() if count}
+    counts[RepsDB] = counts[SetDB]
+    tables = {model: [] for model in _COLUMNS}
+
+    for user_id, (started_at, finished_at, notes, workouts), _ in sessions:
+        session_id = next(ids[SessionDB])
+        set_rows = [set_row for workout in workouts for set_row in workout[3]]
+        volume = sum(count * (weight or 0) for _, _, count, _, weight in set_rows)
+        # What the snapshot is built from, with the allocated ids
+        snapshot_workouts = []
+        for name, workout_started, workout_finished, sets in workouts:
+            workout_id = next(ids[WorkoutDB])
+            tables[WorkoutDB].append((workout_id, session_id, name, workout_started, workout_finished))
+            snapshot_sets = []
+            for set_started, set_finished, count, intensity, weight in sets:
+                set_id = next(ids[SetDB])
+                tables[SetDB].append((set_id, workout_id, set_started, set_finished))
+                tables[RepsDB].append((set_id, count, intensity, weight))
+                snapshot_sets.append((set_id, set_started, set_finished, count, intensity, weight))
+            snapshot_workouts.append((workout_id, name, workout_started, workout_finished, snapshot_sets))
+        snapshot = build_snapshot(session_id, 1, started_at, finished_at, notes, snapshot_workouts)
+        tables[SessionDB].append((session_id, user_id, started_at, finished_at, notes, len(workouts), len(set_rows), volume, snapshot))
+
+    for model, rows in tables.items():
+        if not rows:
+            continue
+        if method == "copy" and db.bind.dialect.name == "postgresql":
+            _copy_rows(db, model, rows)
+        else:
+            db.execute(insert(model), [dict(zip(_COLUMNS[model], row)) for row in rows])
+    return counts
+
+
+def _validated_chunks(chunks: Iterable[Tuple[List[object], int]], user_id: Optional[int], workers: int) -> Iterator[Tuple[list, int]]:
+    """Validate chunks in a process pool, keeping a bounded number in flight and the input order"""
+    if workers <= 0:
+        for records, end in chunks:
+            yield validate_records(records, user_id), end
+        return
+    # spawn: workers never inherit the parent's open database connections
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        for records, end in chunks:
+            pending.append((pool.submit(validate_records, records, user_id), end))
+            if len(pending) > 2 * workers:
+                future, chunk_end = pending.popleft()
+                yield future.result(), chunk_end
+        while pending:
+            future, chunk_end = pending.popleft()
+            yield future.result(), chunk_end
+
+
+def _chunked(records: Iterator[Tuple[object, int]], size: int) -> Iterator[Tuple[List[object], int]]:
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield [record for record, _ in chunk], chunk[-1][1]
+
+
+def import_file(
+    engine,
+    path: str,
+    user_id: Optional[int] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    workers: int = 0,
+    method: str = "copy",
+    restart: bool = False,
+    rejects=None,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Stream a JSON or JSON Lines export of sessions into the database.
+
+    Records look like test/sample_workout.json ({"session": {...}}), each
+    carrying its owner's user_id unless user_id is given. Every chunk is
+    written, folded into personal records and checkpointed in one
+    transaction; invalid records are skipped and, with `rejects`, written
+    there as JSON lines. Running it again on the same file resumes after
+    the last committed chunk unless restart is set.
+    """
+    source = os.path.abspath(path)
+    size = os.path.getsize(path)
+    ImportCheckpointDB.__table__.create(engine, checkfirst=True)
+
+    with DBSession(engine) as db, db.begin():
+        checkpoint = db.get(ImportCheckpointDB, source)
+        if checkpoint is not None and (restart or checkpoint.source_size != size):
+            if not restart:
+                raise ValueError(f"{path} changed size since the last import; pass restart to import it from the start")
+            db.delete(checkpoint)
+            checkpoint = None
+        stats = {
+            "source": source,
+            "size": size,
+            "offset": checkpoint.offset if checkpoint else 0,
+            "records": checkpoint.records if checkpoint else 0,
+            "imported": checkpoint.imported if checkpoint else 0,
+            "rejected": checkpoint.rejected if checkpoint else 0,
+            "sets": 0,
+            "resumed": checkpoint is not None,
+            "complete": checkpoint is not None and checkpoint.finished_at is not None,
+            "seconds": None,
+        }
+    if stats["complete"]:
+        # Already imported in full
+        return stats
+
+    started = time.perf_counter()
+    chunks = _chunked(iter_records(path, stats["offset"]), chunk_size)
+    for results, end in _validated_chunks(chunks, user_id, workers):
+        valid = [result for result in results if not isinstance(result, str)]
+        errors = [(stats["records"] + i + 1, result) for i, result in enumerate(results) if isinstance(result, str)]
+
+        with DBSession(engine) as db, db.begin():
+            owners = {owner for owner, _, _ in valid}
+            known = set(db.execute(select(User.id).where(User.id.in_(owners))).scalars()) if owners else set()
+            for i, result in enumerate(results):
+                if not isinstance(result, str) and result[0] not in known:
+                    errors.append((stats["records"] + i + 1, f"unknown user_id {result[0]}"))
+            valid = [result for result in valid if result[0] in known]
+
+            counts = write_sessions(db, valid, method)
+            by_user: Dict[int, list] = {}
+            for owner, rows, bests in valid:
+                by_user.setdefault(owner, []).append((rows[0], bests))
+            for owner, sessions in by_user.items():
+                apply_session_bests(db, owner, sessions)
+
+            stats["offset"] = end
+            stats["records"] += len(results)
+            stats["imported"] += len(valid)
+            stats["rejected"] += len(errors)
+            stats["sets"] += counts[SetDB]
+            db.merge(ImportCheckpointDB(
+                source=source,
+                source_size=size,
+                offset=end,
+                records=stats["records"],
+                imported=stats["imported"],
+                rejected=stats["rejected"],
+                updated_at=datetime.now(timezone.utc),
+            ))
+
+        # Bumps the users' shared cache generation when this process has the
+        # servers' CACHE_GENERATION_URI, so they drop their entries on the next
+        # read; without it running servers serve theirs for up to CACHE_TTL
+        for owner in by_user:
+            invalidate_user(owner)
+            forget_user(owner)
+        if rejects is not None:
+            for number, error in sorted(errors):
+                rejects.write(json.dumps({"record": number, "error": error}) + "\n")
+        if progress is not None:
+            progress({**stats, "seconds": time.perf_counter() - started})
+
+    with DBSession(engine) as db, db.begin():
+        db.merge(ImportCheckpointDB(
+            source=source,
+            source_size=size,
+            offset=stats["offset"],
+            records=stats["records"],
+            imported=stats["imported"],
+            rejected=stats["rejected"],
+            finished_at=datetime.now(timezone.utc),
+            updated_at=datetime.now(timezone.utc),
+        ))
+    stats["complete"] = True
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def _print_progress(stats: dict) -> None:
+    done = stats["offset"] / stats["size"] if stats["size"] else 1.0
+    rate = stats["records"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(
+        f"\r{done:6.1%}  {stats['records']:,} records  {stats['imported']:,} imported  "
+        f"{stats['rejected']:,} rejected  {rate:,.0f}/s",
+        end="", file=sys.stderr, flush=True
+    )
+
+
+def main():
+    from src.database.database import get_engine, get_shard_engines, engine_for_user
+
+    parser = argparse.ArgumentParser(description="Import a JSON or JSON Lines export of sessions")
+    parser.add_argument("path")
+    parser.add_argument("--user", help="username that owns every imported session (default: each record's user_id)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="sessions per transaction")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) - 1), help="validation processes (0: validate inline)")
+    parser.add_argument("--method", choices=("copy", "insert"), default="copy")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and import from the start")
+    parser.add_argument("--rejects", help="write rejected records' numbers and errors to this file")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    user_id = None
+    if args.user:
+        with engine.connect() as conn:
+            user = conn.execute(select(User.id, User.shard).where(User.username == args.user)).one_or_none()
+        if user is None:
+            parser.error(f"no user named {args.user!r}")
+        # Straight into the user's shard
+        user_id, engine = user.id, engine_for_user(user)
+    elif get_shard_engines():
+        parser.error("--user is required when SHARD_URLS is set (records' owners may live on different shards)")
+
+    rejects = open(args.rejects, "a") if args.rejects else None
+    try:
+        stats = import_file(
+            engine, args.path, user_id=user_id, chunk_size=args.chunk_size, workers=args.workers,
+            method=args.method, restart=args.restart, rejects=rejects, progress=_print_progress
+        )
+    except ValueError as e:
+        raise SystemExit(f"\n{e}")
+    finally:
+        if rejects is not None:
+            rejects.close()
+    print(file=sys.stderr)
+    if stats["seconds"] is None:
+        print(f"{args.path} was already imported ({stats['imported']:,} sessions); pass --restart to import it again")
+        return
+    print(
+        f"{stats['imported']:,} sessions ({stats['sets']:,} sets) imported, {stats['rejected']:,} rejected "
+        f"out of {stats['records']:,} records in {stats['seconds']:.1f}s"
+        + (" (resumed)" if stats["resumed"] else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import secrets
+import tempfile
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Requests whose X-Profile header matches this token are profiled (unset: header trigger off)
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+# Fraction of all requests to profile, e.g. 0.001
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "fitness-tracker-profiles"))
+# Oldest profiles beyond this many are deleted
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID = re.compile(r"^\d{13}-[0-9a-f]{8}$")
+SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls")
+
+
+class RequestProfile:
+    """cProfile data for one request, collected from the event loop and worker threads"""
+
+    def __init__(self, trigger: str):
+        self.id = f"{int(time.time() * 1000):013d}-{secrets.token_hex(4)}"
+        self.trigger = trigger
+        self.loop_profile = cProfile.Profile()
+        self.thread_profiles: List[cProfile.Profile] = []
+
+    def run_in_thread(self, func, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            self.thread_profiles.append(profile)
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self.loop_profile)
+        for profile in self.thread_profiles:
+            stats.add(profile)
+        return stats
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+# cProfile hooks the whole event loop thread, so only one request per process is profiled at a time
+_loop_busy = False
+
+
+def _profiled_in_thread(func):
+    """Run a sync callable under its own profiler when the calling request is being profiled"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        return profile.run_in_thread(func, *args, **kwargs)
+    return wrapper
+
+
+class _ProfiledResponseField:
+    """Response field whose validation (run in the threadpool for sync endpoints) is profiled"""
+
+    def __init__(self, field):
+        self._field = field
+        self.validate = _profiled_in_thread(field.validate)
+
+    def __getattr__(self, name):
+        return getattr(self._field, name)
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose threadpool work can be profiled.
+
+    Sync endpoints and their response validation run in worker threads,
+    which the event loop's profiler cannot see, so both are wrapped to be
+    profiled in the thread they run on.
+    """
+
+    def get_route_handler(self):
+        if not inspect.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = _profiled_in_thread(self.dependant.call)
+            if self.secure_cloned_response_field is not None:
+                self.secure_cloned_response_field = _ProfiledResponseField(self.secure_cloned_response_field)
+        return super().get_route_handler()
+
+
+def _should_profile(scope) -> Optional[str]:
+    if PROFILE_TOKEN is not None:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                if hmac.compare_digest(value, PROFILE_TOKEN.encode()):
+                    return "header"
+                break
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+def _metadata_path(profile_id: str) -> str:
+    return os.path.join(PROFILE_DIR, profile_id + ".json")
+
+
+def profile_path(profile_id: str) -> str:
+    return os.path.join(PROFILE_DIR, profile_id + ".prof")
+
+
+def _save(profile: RequestProfile, metadata: dict) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile.stats().dump_stats(profile_path(profile.id))
+    with open(_metadata_path(profile.id), "w") as file:
+        json.dump(metadata, file)
+    _rotate()
+
+
+def _rotate() -> None:
+    profile_ids = sorted(name[:-len(".prof")] for name in os.listdir(PROFILE_DIR) if name.endswith(".prof"))
+    for profile_id in profile_ids[:max(0, len(profile_ids) - PROFILE_KEEP)]:
+        for path in (profile_path(profile_id), _metadata_path(profile_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(limit: int = 50) -> List[dict]:
+    """Metadata of the most recent profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as file:
+                profiles.append(json.load(file))
+        except (OSError, ValueError):
+            # Rotated away or half-written by another worker
+            continue
+    return profiles
+
+
+def render_profile(profile_id: str, sort: str = "cumulative", limit: int = 40) -> str:
+    """pstats text report of a saved profile"""
+    stream = io.StringIO()
+    stats = pstats.Stats(profile_path(profile_id), stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    Profile selected requests with cProfile.
+
+    A request is profiled when its X-Profile header matches PROFILE_TOKEN
+    (handed only to admins) or when it falls in the PROFILE_SAMPLE_RATE
+    sample. The event loop thread is profiled for the whole request, and
+    endpoint and response-validation work in the threadpool through
+    ProfiledRoute, then the merged stats are written to PROFILE_DIR and the
+    id returned in an X-Profile-Id header. Loop-thread samples can include
+    other requests served concurrently.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _loop_busy
+        if scope["type"] != "http" or _loop_busy:
+            await self.app(scope, receive, send)
+            return
+        trigger = _should_profile(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(trigger)
+        response = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        _loop_busy = True
+        token = _current.set(profile)
+        started = time.perf_counter()
+        profile.loop_profile.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.loop_profile.disable()
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            _loop_busy = False
+            route = scope.get("route")
+            metadata = {
+                "id": profile.id,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route.path if route is not None else None,
+                "status": response["status"],
+                "duration_ms": round(elapsed * 1000, 3),
+                "trigger": profile.trigger,
+            }
+            try:
+                # Stats dump, file writes and rotation: keep them off the event loop
+                await run_in_threadpool(_save, profile, metadata)
+            except OSError:
+                logger.exception("Could not write profile %s to %s", profile.id, PROFILE_DIR)
@@ -0,0 +1,180 @@
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A statement shape seen this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_AUDIT_REPEAT_THRESHOLD", "3"))
+
+_enabled = os.getenv("QUERY_AUDIT") == "1"
+
+_WHITESPACE = re.compile(r"\s+")
+# IN lists are expanded per value at execution, e.g. IN (%(id_1_1)s, %(id_1_2)s)
+_IN_LIST = re.compile(r"\bIN \((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL statement so executions that differ only in values compare equal"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _IN_LIST.sub("IN (...)", shape)
+
+
+def query_budget(max_queries: int):
+    """Declare the most SQL statements a route may issue per request"""
+    def decorator(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+    return decorator
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryReport:
+    """Statements issued while serving one request"""
+
+    def __init__(self):
+        self.method = None
+        self.route = None
+        self.budget: Optional[int] = None
+        self.shapes: Counter = Counter()
+
+    @property
+    def count(self) -> int:
+        return sum(self.shapes.values())
+
+    @property
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Statement shapes executed often enough to look like an N+1 pattern"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= N_PLUS_ONE_THRESHOLD]
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def problems(self) -> List[str]:
+        problems = []
+        if self.over_budget:
+            problems.append(f"{self.method} {self.route} issued {self.count} queries (budget {self.budget})")
+        for shape, n in self.repeated:
+            problems.append(f"{self.method} {self.route} repeated a statement {n} times (possible N+1): {shape[:200]}")
+        return problems
+
+
+_current: ContextVar[Optional[QueryReport]] = ContextVar("query_audit_report", default=None)
+
+# Reports from finished requests are handed to any active capture_queries() blocks
+_captures: List[list] = []
+_captures_lock = threading.Lock()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    report = _current.get()
+    if report is not None:
+        report.shapes[statement_shape(statement)] += 1
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class QueryCapture(list):
+    """The QueryReports of every request finished inside a capture_queries() block"""
+
+    def assert_clean(self) -> None:
+        problems = [problem for report in self for problem in report.problems()]
+        if problems:
+            raise QueryBudgetExceeded("\n".join(problems))
+
+
+@contextmanager
+def capture_queries():
+    """Enable auditing and collect a report for every request served inside the block"""
+    reports = QueryCapture()
+    was_enabled = _enabled
+    enable()
+    with _captures_lock:
+        _captures.append(reports)
+    try:
+        yield reports
+    finally:
+        with _captures_lock:
+            _captures.remove(reports)
+        if not was_enabled:
+            disable()
+
+
+class QueryAuditMiddleware:
+    """
+    Opt-in per-request SQL auditing (QUERY_AUDIT=1, or enable() at runtime).
+
+    Counts the statements each request executes, compares the count with the
+    route's query_budget and flags repeated statement shapes. Results go in
+    the X-Query-Count / X-Query-Repeats / X-Query-Budget response headers and,
+    when something looks wrong, a warning log line. When disabled the only
+    cost is a flag check.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not _enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        report = QueryReport()
+        report.method = scope["method"]
+        token = _current.set(report)
+
+        def resolve_route():
+            route = scope.get("route")
+            report.route = route.path if route is not None else scope["path"]
+            report.budget = getattr(getattr(route, "endpoint", None), "query_budget", None)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                resolve_route()
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(report.count).encode()))
+                headers.append((b"x-query-repeats", str(len(report.repeated)).encode()))
+                if report.budget is not None:
+                    headers.append((b"x-query-budget", str(report.budget).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            resolve_route()
+            problems = report.problems()
+            if problems:
+                logger.warning("Query audit: %s", "; ".join(problems))
+            with _captures_lock:
+                for reports in _captures:
+                    reports.append(report)
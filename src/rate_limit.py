@@ -0,0 +1,58 @@
+import os
+import time
+from functools import lru_cache
+from typing import Optional, Tuple
+from fastapi import Request
+from jose import JWTError, jwt
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from .auth import SECRET_KEY, ALGORITHM
+
+# One limiter for the whole app. Counters live in RATE_LIMIT_STORAGE_URI, so all
+# workers and instances share them when it points at Redis (redis://host:6379/0);
+# the default memory:// keeps them per process.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "fixed-window")
+
+
+@lru_cache(maxsize=4096)
+def _token_subject(token: str) -> Optional[Tuple[str, float]]:
+    """(username, expiry) of a valid access token; signatures are checked once per token"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type", "access") != "access" or not payload.get("sub"):
+        return None
+    return payload["sub"], float(payload.get("exp", "inf"))
+
+
+def rate_limit_key(request: Request) -> str:
+    """The access token's user when it verifies, otherwise the client address"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            subject = _token_subject(token)
+            # Bad or expired tokens are rejected by the route; count them against the address
+            if subject is not None and subject[1] > time.time():
+                return f"user:{subject[0]}"
+    return f"ip:{get_remote_address(request)}"
+
+
+def create_limiter(storage_uri: str = RATE_LIMIT_STORAGE_URI, storage_options: Optional[dict] = None, enabled: bool = RATE_LIMIT_ENABLED) -> Limiter:
+    shared = not storage_uri.startswith("memory://")
+    return Limiter(
+        key_func=rate_limit_key,
+        storage_uri=storage_uri,
+        storage_options=storage_options or {},
+        strategy=RATE_LIMIT_STRATEGY,
+        enabled=enabled,
+        # If the shared store goes away, keep limiting per process rather than failing requests
+        in_memory_fallback_enabled=shared,
+        key_prefix="fitness-tracker",
+    )
+
+
+limiter = create_limiter()
@@ -0,0 +1,189 @@
+from itertools import groupby
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from .db_models import SessionDB, WorkoutDB, SetDB, RepsDB, PersonalRecordDB
+
+
+def estimate_one_rep_max(weight: Optional[int], count: int) -> Optional[float]:
+    """Epley estimated one-rep max for a set (None for bodyweight sets)"""
+    if not weight:
+        return None
+    if count == 1:
+        return float(weight)
+    return round(weight * (1 + count / 30), 1)
+
+
+def _new_best() -> dict:
+    return {
+        "heaviest_weight": None,
+        "heaviest_weight_reps": None,
+        "most_reps": None,
+        "most_reps_weight": None,
+        "best_estimated_1rm": None,
+        "session_volume": 0,
+    }
+
+
+def _fold_set(best: dict, count: int, weight: Optional[int]) -> None:
+    if weight is not None and (
+        best["heaviest_weight"] is None
+        or (weight, count) > (best["heaviest_weight"], best["heaviest_weight_reps"])
+    ):
+        best["heaviest_weight"] = weight
+        best["heaviest_weight_reps"] = count
+
+    # Ties on reps go to the heavier set
+    if best["most_reps"] is None or (count, weight or 0) > (best["most_reps"], best["most_reps_weight"] or 0):
+        best["most_reps"] = count
+        best["most_reps_weight"] = weight
+
+    e1rm = estimate_one_rep_max(weight, count)
+    if e1rm is not None and (best["best_estimated_1rm"] is None or e1rm > best["best_estimated_1rm"]):
+        best["best_estimated_1rm"] = e1rm
+
+    best["session_volume"] += count * (weight or 0)
+
+
+def session_bests(db_session) -> Dict[str, dict]:
+    """
+    Collect the best values per exercise from an in-memory session tree
+    (a SessionDB or a validated models.Session)
+    """
+    bests: Dict[str, dict] = {}
+    for workout in db_session.workouts:
+        best = bests.setdefault(workout.name, _new_best())
+        for set_ in workout.sets:
+            _fold_set(best, set_.reps.count, set_.reps.weight)
+    return bests
+
+
+def update_personal_records(db: Session, user_id: int, db_session: SessionDB) -> List[str]:
+    """
+    Fold a newly written session into the user's personal records.
+
+    Runs inside the caller's transaction so records commit atomically with the
+    session. Returns the exercise names where at least one record was broken.
+    """
+    return apply_session_bests(db, user_id, [(db_session.started_at, session_bests(db_session))])
+
+
+def apply_session_bests(db: Session, user_id: int, sessions: List[Tuple[datetime, Dict[str, dict]]]) -> List[str]:
+    """
+    Fold several sessions' bests (as (started_at, session_bests) pairs, in
+    order) into the user's personal records.
+
+    Missing records are created empty with INSERT ... ON CONFLICT DO
+    NOTHING, and all of them are then read FOR UPDATE, so two concurrent
+    writes for the same exercise neither collide on the unique constraint
+    nor overwrite each other's bests: the second waits for the first to
+    commit and folds into its result.
+    """
+    exercises = sorted({exercise for _, bests in sessions for exercise in bests})
+    if not exercises:
+        return []
+
+    dialect = db.get_bind(PersonalRecordDB.__mapper__).dialect.name
+    insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+    db.execute(
+        insert(PersonalRecordDB)
+        .values([{"user_id": user_id, "exercise": exercise} for exercise in exercises])
+        .on_conflict_do_nothing(index_elements=["user_id", "exercise"])
+    )
+    existing = {
+        record.exercise: record
+        for record in db.query(PersonalRecordDB).filter(
+            PersonalRecordDB.user_id == user_id,
+            PersonalRecordDB.exercise.in_(exercises)
+        )
+        .order_by(PersonalRecordDB.exercise)
+        .with_for_update()
+        .populate_existing()
+    }
+
+    now = datetime.now(timezone.utc)
+    broken = []
+    for achieved_at, bests in sessions:
+        for exercise, best in bests.items():
+            record = existing[exercise]
+            if _fold_best(record, best, achieved_at, now) and exercise not in broken:
+                broken.append(exercise)
+    return broken
+
+
+def recompute_personal_records(db: Session, user_id: int, exercises: Iterable[str]) -> None:
+    """
+    Rebuild the user's records for these exercises from their whole history.
+
+    Needed after an edit or delete, which can lower a best that
+    apply_session_bests only ever raises. Reads just the sets of these
+    exercises, one row per set; runs inside the caller's transaction.
+    """
+    exercises = sorted(set(exercises))
+    if not exercises:
+        return
+    rows = db.execute(
+        select(SessionDB.id, SessionDB.started_at, WorkoutDB.name, RepsDB.count, RepsDB.weight)
+        .join(WorkoutDB, WorkoutDB.session_id == SessionDB.id)
+        .join(SetDB, SetDB.workout_id == WorkoutDB.id)
+        .join(RepsDB, RepsDB.set_id == SetDB.id)
+        .where(
+            SessionDB.user_id == user_id,
+            SessionDB.in_progress.is_(False),
+            WorkoutDB.name.in_(exercises)
+        )
+        .order_by(SessionDB.started_at, SessionDB.id)
+    )
+    sessions = []
+    for (_, started_at), session_rows in groupby(rows, key=lambda row: (row[0], row[1])):
+        bests: Dict[str, dict] = {}
+        for _, _, name, count, weight in session_rows:
+            _fold_set(bests.setdefault(name, _new_best()), count, weight)
+        sessions.append((started_at, bests))
+
+    db.execute(
+        delete(PersonalRecordDB)
+        .where(PersonalRecordDB.user_id == user_id, PersonalRecordDB.exercise.in_(exercises))
+        .execution_options(synchronize_session=False)
+    )
+    apply_session_bests(db, user_id, sessions)
+
+
+def _fold_best(record: PersonalRecordDB, best: dict, achieved_at: datetime, now: datetime) -> bool:
+    """Apply one session's bests for an exercise; True if any record was broken"""
+    improved = False
+
+    if best["heaviest_weight"] is not None and (
+        record.heaviest_weight is None
+        or (best["heaviest_weight"], best["heaviest_weight_reps"]) > (record.heaviest_weight, record.heaviest_weight_reps or 0)
+    ):
+        record.heaviest_weight = best["heaviest_weight"]
+        record.heaviest_weight_reps = best["heaviest_weight_reps"]
+        record.heaviest_weight_at = achieved_at
+        improved = True
+
+    if record.most_reps is None or (best["most_reps"], best["most_reps_weight"] or 0) > (record.most_reps, record.most_reps_weight or 0):
+        record.most_reps = best["most_reps"]
+        record.most_reps_weight = best["most_reps_weight"]
+        record.most_reps_at = achieved_at
+        improved = True
+
+    if best["best_estimated_1rm"] is not None and (
+        record.best_estimated_1rm is None or best["best_estimated_1rm"] > record.best_estimated_1rm
+    ):
+        record.best_estimated_1rm = best["best_estimated_1rm"]
+        record.best_estimated_1rm_at = achieved_at
+        improved = True
+
+    if best["session_volume"] > 0 and (
+        record.best_session_volume is None or best["session_volume"] > record.best_session_volume
+    ):
+        record.best_session_volume = best["session_volume"]
+        record.best_session_volume_at = achieved_at
+        improved = True
+
+    if improved:
+        record.updated_at = now
+    return improved
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from ..models import ProfileInfo
+from ..db_models import User
+from ..auth import require_admin
+from .. import profiling
+from typing import List
+import os
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+def _existing_profile_path(profile_id: str) -> str:
+    path = profiling.profile_path(profile_id)
+    if not profiling.PROFILE_ID.match(profile_id) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return path
+
+@router.get("/profiles", response_model=List[ProfileInfo])
+def list_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    admin: User = Depends(require_admin)
+):
+    """Most recent request profiles, newest first"""
+    return profiling.list_profiles(limit)
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("text", pattern="^(text|pstats)$"),
+    sort: str = Query("cumulative", pattern="^(" + "|".join(profiling.SORT_KEYS) + ")$"),
+    limit: int = Query(40, ge=1, le=1000),
+    admin: User = Depends(require_admin)
+):
+    """A profile as a pstats text report, or the raw file for snakeviz / pstats (format=pstats)"""
+    path = _existing_profile_path(profile_id)
+    if format == "pstats":
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    return PlainTextResponse(profiling.render_profile(profile_id, sort, limit))
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from ..models import ExerciseSuggestion
+from ..db_models import User
+from ..database.database import get_db
+from ..auth import get_current_user
+from ..suggest import suggest_workout_names
+from ..profiling import ProfiledRoute
+from typing import List
+
+router = APIRouter(prefix="/exercises", tags=["exercises"], route_class=ProfiledRoute)
+
+@router.get("/suggest", response_model=List[ExerciseSuggestion])
+def suggest_exercises(
+    q: str = Query("", max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The authenticated user's most used workout names starting with `q`"""
+    return [
+        ExerciseSuggestion(name=name, count=count)
+        for name, count in suggest_workout_names(db, current_user.id, q.strip(), limit)
+    ]
@@ -1,11 +1,24 @@
-from fastapi import Request, APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from ..models import Session as SessionModel
+from fastapi import Request, Response, APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from pydantic import TypeAdapter
+from ..models import Session as SessionModel, StoredSession, SessionSummary, SessionPatch, SessionClone, SessionSearchResults
 from ..db_models import SessionDB, WorkoutDB, SetDB, RepsDB, User
-from ..database.database import get_db
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from ..auth import get_current_user  # This now returns User object, not user_id
+from ..database.database import get_db, engine_for_user, ShardMoving
+from ..auth import get_current_user, user_from_token  # This now returns User object, not user_id
+from ..records import update_personal_records
+from ..cache import invalidate_user
+from ..suggest import record_workouts
+from ..search import search_sessions
+from ..export import FORMATS, available_formats, export_chunks, iter_batches
+from ..live import LiveSession, run_live_session
+from ..editing import EditConflict, apply_session_patch, invalidate_edit
+from ..deletion import delete_session
+from ..cloning import clone_session
+from ..snapshots import session_snapshot, read_snapshots
+from ..query_audit import query_budget
 from ..validation.validation import (
     validate_workout_name,
     validate_notes,
@@ -15,19 +28,27 @@ from ..validation.validation import (
     validate_session_limits,
     validate_workout_limits
 )
-from typing import List
+from ..profiling import ProfiledRoute
+from ..rate_limit import limiter
+from typing import List, Literal, Optional, Set
+import anyio
 from datetime import datetime
 import logging
 
-# Create limiter for this module
-limiter = Limiter(key_func=get_remote_address)
+logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/sessions", tags=["sessions"])
+router = APIRouter(prefix="/sessions", tags=["sessions"], route_class=ProfiledRoute)
+
+# What ?fields= can pick from; ?depth=summary returns all of them
+SUMMARY_FIELDS = tuple(SessionSummary.model_fields) + tuple(SessionSummary.model_computed_fields)
+_summaries = TypeAdapter(List[SessionSummary])
 
 @router.post("/", response_model=SessionModel)
+@query_budget(12)
 @limiter.limit("10/minute") 
 def create_session(
     request: Request, 
+    response: Response,
     session: SessionModel, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)  # This is now a User object
@@ -42,7 +63,10 @@ def create_session(
             user_id=current_user.id,  # Get ID from authenticated User object
             started_at=session.started_at,
             finished_at=session.finished_at,
-            notes=validate_notes(session.notes)  # Sanitize notes
+            notes=validate_notes(session.notes),  # Sanitize notes
+            workout_count=len(session.workouts),
+            set_count=total_sets,
+            total_volume=0
         )
         
         for workout in session.workouts:
@@ -76,67 +100,306 @@ def create_session(
                 
                 # Set up the relationship properly
                 db_set.reps = db_rep
+                db_session.total_volume += validated_count * (validated_weight or 0)
                 
                 # Add both to the session
                 db.add(db_rep)
                 db_workout.sets.append(db_set)
         
         db.add(db_session)
+        # Personal records are folded in within the same transaction as the session
+        new_records = update_personal_records(db, current_user.id, db_session)
+        # The snapshot needs the ids; written with the session at commit
+        db.flush()
+        db_session.snapshot = session_snapshot(db_session)
+        # Read before commit expires them, which would lazy-load the workouts again
+        workout_names = [workout.name for workout in db_session.workouts]
         db.commit()
         db.refresh(db_session)
+        record_workouts(current_user.id, invalidate_user(current_user.id), workout_names)
+        
+        if new_records:
+            response.headers["X-Personal-Records"] = ",".join(new_records)
         
-        logging.info(f"Session created successfully for user {current_user.username} (ID: {current_user.id}) with {len(session.workouts)} workouts")
+        logger.info(
+            "Session created for user %s with %d workouts",
+            current_user.username, len(session.workouts),
+            extra={"user_id": current_user.id, "session_id": db_session.id, "sets": total_sets}
+        )
         return session
         
     except ValueError as ve:
-        logging.warning(f"Validation error in session creation for user {current_user.username}: {ve}")
+        logger.warning("Validation error in session creation for user %s: %s", current_user.username, ve)
         raise HTTPException(status_code=400, detail=str(ve))
+    except ShardMoving:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
-        logging.error(f"Error creating session for user {current_user.username}: {e}")
+        logger.exception("Error creating session for user %s", current_user.username)
         raise HTTPException(status_code=500, detail="Failed to create session")
 
-@router.get("/", response_model=List[SessionModel])
+@router.get("/", response_model=List[StoredSession])
+@query_budget(2)
 def get_my_sessions(
+    fields: Optional[str] = Query(None, description="comma-separated summary fields"),
+    depth: Literal["full", "summary"] = Query("full"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)  # User object
 ):
-    """Get all sessions for the authenticated user"""
-    sessions = db.query(SessionDB)\
-        .options(
-            joinedload(SessionDB.workouts)
-            .joinedload(WorkoutDB.sets)
-            .joinedload(SetDB.reps)
-        )\
-        .filter(SessionDB.user_id == current_user.id)\
-        .all()
-    
-    if not sessions:
-        raise HTTPException(status_code=404, detail="No sessions found")
-    return sessions
+    """
+    Get all sessions for the authenticated user, from their stored
+    snapshots (see src/snapshots.py). ?depth=summary (or ?fields= with
+    some of SUMMARY_FIELDS) returns the sessions' summaries instead, read
+    from the sessions table alone.
+    """
+    return _list_sessions(db, current_user.id, _summary_fields(fields, depth))
+
+@router.get("/search", response_model=SessionSearchResults)
+@query_budget(3)
+def search_my_sessions(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Search the authenticated user's session notes and workout names; the
+    page is built from the stored snapshots, like the session lists
+    """
+    total, sessions = search_sessions(db, current_user.id, q, page, page_size)
+    # The snapshots are already the sessions' JSON
+    body = f'{{"total":{total},"page":{page},"page_size":{page_size},"sessions":{sessions}}}'
+    return Response(body, media_type="application/json")
+
+@router.get("/export", response_class=StreamingResponse)
+@limiter.limit("5/minute")
+def export_my_sets(
+    request: Request,
+    format: str = Query("csv", description=f"one of {', '.join(FORMATS)}"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    The authenticated user's sets as one flat table, streamed in batches
+    from a server-side cursor (see src/export.py)
+    """
+    if format not in available_formats():
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(available_formats())}")
+    media_type, extension = FORMATS[format]
+    user_id, engine = current_user.id, engine_for_user(current_user)
+
+    def body():
+        # Its own connection: the request's session is closed before the body streams
+        with engine.connect() as conn:
+            yield from export_chunks(iter_batches(conn, user_id), format)
 
-@router.get("/{user_id}", response_model=List[SessionModel])
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="sets.{extension}"'}
+    )
+
+@router.websocket("/live")
+async def live_session(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Record a session as it happens: sets are buffered per connection and
+    written in small batches, and the session stays out of listings until
+    it ends (see src/live.py). Browsers can't set headers on a WebSocket,
+    so the access token may also be passed as ?token=.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if token is None and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        current_user = await run_in_threadpool(user_from_token, token, db) if token else None
+    except ShardMoving:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Your data is being moved")
+        return
+    # End the lookup's transaction so its pooled connection isn't held while
+    # the socket is open; the user's loaded attributes stay readable
+    await run_in_threadpool(db.close)
+    if current_user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+        return
+
+    await websocket.accept()
+    live = LiveSession(db, current_user.id)
+    try:
+        await run_live_session(websocket, live)
+    except WebSocketDisconnect:
+        pass
+    except ShardMoving:
+        # Sets not yet acknowledged as persisted are resent after reconnecting
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Your data is being moved")
+    finally:
+        # Whatever was sent before a disconnect is kept, even if the
+        # handler is being cancelled (server shutdown)
+        with anyio.CancelScope(shield=True):
+            try:
+                await run_in_threadpool(live.abandon)
+            except ShardMoving:
+                logger.warning("Live session %s for user %s left in progress: the user is being moved",
+                               live.session_id, current_user.username)
+            except Exception:
+                logger.exception("Error finalizing live session %s for user %s", live.session_id, current_user.username)
+    if live.session_id is not None and live.sets:
+        logger.info(
+            "Live session finished for user %s with %d workouts",
+            current_user.username, live.workouts,
+            extra={"user_id": current_user.id, "session_id": live.session_id, "sets": live.sets}
+        )
+
+@router.get("/{user_id}", response_model=List[StoredSession])
+@query_budget(2)
 def get_sessions(
     user_id: int, 
+    fields: Optional[str] = Query(None, description="comma-separated summary fields"),
+    depth: Literal["full", "summary"] = Query("full"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)  # User object
 ):
-    """Get sessions for a specific user (only if it's the authenticated user)"""
+    """Get sessions for a specific user (only if it's the authenticated user); see get_my_sessions"""
     if user_id != current_user.id:
         raise HTTPException(
             status_code=403, 
             detail="Cannot access another user's sessions"
         )
     
-    sessions = db.query(SessionDB)\
-        .options(
-            joinedload(SessionDB.workouts)
-            .joinedload(WorkoutDB.sets)
-            .joinedload(SetDB.reps)
-        )\
-        .filter(SessionDB.user_id == user_id)\
-        .all()
-    
+    return _list_sessions(db, user_id, _summary_fields(fields, depth))
+
+@router.get("/{user_id}/{session_id}", response_model=StoredSession)
+@query_budget(2)
+def get_session(
+    user_id: int,
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """One of the authenticated user's sessions, from its snapshot"""
+    if user_id != current_user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="Cannot access another user's sessions"
+        )
+
+    body = read_snapshots(db, SessionDB.user_id == user_id, SessionDB.id == session_id)
+    if body == "[]":
+        raise HTTPException(status_code=404, detail="Session not found")
+    # A one-element array
+    return Response(body[1:-1], media_type="application/json")
+
+def _summary_fields(fields: Optional[str], depth: str) -> Optional[Set[str]]:
+    """The summary fields a listing asked for, or None for full session trees"""
+    if fields is None:
+        return set(SUMMARY_FIELDS) if depth == "summary" else None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    if not requested or not requested <= set(SUMMARY_FIELDS):
+        raise HTTPException(status_code=400, detail=f"fields must be some of {', '.join(SUMMARY_FIELDS)}")
+    return requested
+
+def _list_sessions(db: Session, user_id: int, fields: Optional[Set[str]]):
+    if fields is None:
+        # The snapshots are already the response body
+        body = read_snapshots(db, SessionDB.user_id == user_id)
+        if body == "[]":
+            raise HTTPException(status_code=404, detail="No sessions found")
+        return Response(body, media_type="application/json")
+
+    # The summary columns are on the session row: no workout, set or reps joins
+    columns = [getattr(SessionDB, name) for name in SessionSummary.model_fields]
+    sessions = db.execute(select(*columns).where(SessionDB.user_id == user_id, SessionDB.in_progress.is_(False))).all()
     if not sessions:
         raise HTTPException(status_code=404, detail="No sessions found")
-    return sessions
\ No newline at end of file
+    body = _summaries.dump_json(_summaries.validate_python(sessions, from_attributes=True), include={"__all__": fields})
+    return Response(body, media_type="application/json")
+
+@router.patch("/{session_id}", response_model=StoredSession)
+@query_budget(24)
+@limiter.limit("30/minute")
+def edit_session(
+    request: Request,
+    session_id: int,
+    patch: SessionPatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Add, update or remove individual workouts and sets of a session by id
+    (see src/editing.py). `version` must be the session's current version,
+    otherwise nothing is written and the response is 409.
+    """
+    # Read before the commit expires them
+    user_id, username = current_user.id, current_user.username
+    try:
+        changes = apply_session_patch(db, user_id, session_id, patch)
+    except LookupError as le:
+        raise HTTPException(status_code=404, detail=str(le))
+    except EditConflict as ec:
+        raise HTTPException(status_code=409, detail=str(ec))
+    except ValueError as ve:
+        logger.warning("Validation error editing session %s for user %s: %s", session_id, username, ve)
+        raise HTTPException(status_code=400, detail=str(ve))
+    invalidate_edit(user_id, changes)
+
+    logger.info(
+        "Session %s edited by user %s", session_id, username,
+        extra={"user_id": user_id, "session_id": session_id, "version": changes["version"]}
+    )
+    return JSONResponse(changes["snapshot"])
+
+@router.post("/{session_id}/clone", response_model=StoredSession, status_code=201)
+@query_budget(5)
+@limiter.limit("10/minute")
+def repeat_session(
+    request: Request,
+    session_id: int,
+    clone: SessionClone,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Repeat a session: copy it with all its workouts and sets, shifted to a
+    new start time (see src/cloning.py). The copy is made by the database,
+    so nothing is sent back and re-validated.
+    """
+    user_id, username = current_user.id, current_user.username
+    try:
+        snapshot = clone_session(db, user_id, session_id, clone)
+    except EditConflict as ec:
+        raise HTTPException(status_code=409, detail=str(ec))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    logger.info(
+        "Session %s repeated by user %s", session_id, username,
+        extra={"user_id": user_id, "session_id": snapshot["id"], "source_session_id": session_id}
+    )
+    return JSONResponse(snapshot, status_code=201)
+
+@router.delete("/{session_id}", status_code=204)
+@query_budget(10)
+@limiter.limit("30/minute")
+def remove_session(
+    request: Request,
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete a session and everything in it; the database cascades the delete"""
+    user_id, username = current_user.id, current_user.username
+    try:
+        changes = delete_session(db, user_id, session_id)
+    except EditConflict as ec:
+        raise HTTPException(status_code=409, detail=str(ec))
+    if changes is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    invalidate_edit(user_id, changes)
+    logger.info("Session %s deleted by user %s", session_id, username, extra={"user_id": user_id, "session_id": session_id})
+    return Response(status_code=204)
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from ..models import PersonalRecord, TrainingLoad, CalendarHeatmap
+from ..db_models import PersonalRecordDB, SessionDB, User
+from ..database.database import get_db
+from ..auth import get_current_user
+from ..cache import UserCache
+from ..compression import EncodedBody
+from ..analytics.history import load_history, INTENSITY_CODES
+from ..analytics.training_load import compute_training_load
+from ..profiling import ProfiledRoute
+from typing import List, Optional
+from datetime import datetime, timezone
+import numpy as np
+
+router = APIRouter(prefix="/stats", tags=["stats"], route_class=ProfiledRoute)
+
+# Per user, dropped whenever the user writes a session: the full training-load
+# series keyed by day, and encoded responses keyed by (day, days)
+training_load_cache = UserCache("training_load")
+# Encoded calendar heatmap responses per user, keyed by year
+calendar_cache = UserCache("calendar")
+
+CALENDAR_SLOTS = 366
+
+@router.get("/prs", response_model=List[PersonalRecord])
+def get_personal_records(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the authenticated user's personal records, one entry per exercise"""
+    return db.query(PersonalRecordDB)\
+        .filter(PersonalRecordDB.user_id == current_user.id)\
+        .order_by(PersonalRecordDB.exercise)\
+        .all()
+
+@router.get("/training-load", response_model=TrainingLoad)
+def get_training_load(
+    request: Request,
+    days: int = Query(90, ge=7, le=3660),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Acute:chronic ratio, fitness/fatigue curves and weekly volume for the last `days` days"""
+    today = datetime.now(timezone.utc).date()
+    
+    def build() -> EncodedBody:
+        load = training_load_cache.get_or_compute(
+            current_user.id,
+            lambda: compute_training_load(load_history(db, current_user.id), end=today),
+            key=today
+        )
+        window = slice(-days, None)
+        cutoff = np.datetime64(today, "D") - days
+        weeks = load["week_starts"] > cutoff - 7
+        return EncodedBody.from_model(TrainingLoad(
+            days=load["days"][window].tolist(),
+            daily_volume=load["daily_volume"][window].tolist(),
+            acwr=[None if np.isnan(r) else r for r in load["acwr"][window].tolist()],
+            fitness=load["fitness"][window].tolist(),
+            fatigue=load["fatigue"][window].tolist(),
+            form=load["form"][window].tolist(),
+            week_starts=load["week_starts"][weeks].tolist(),
+            weekly_volume={
+                intensity: load["weekly_volume"][weeks, code].tolist()
+                for intensity, code in INTENSITY_CODES.items()
+            }
+        ))
+    
+    return training_load_cache.get_or_compute(current_user.id, build, key=(today, days)).response(request)
+
+def _calendar_heatmap(db: Session, user_id: int, year: int) -> CalendarHeatmap:
+    """Per-day session counts and volume for one year, from the sessions' summary columns alone"""
+    day = func.date_trunc("day", SessionDB.started_at).label("day")
+    stmt = select(day, func.count(), func.coalesce(func.sum(SessionDB.total_volume), 0))\
+        .where(
+            SessionDB.user_id == user_id,
+            SessionDB.started_at >= datetime(year, 1, 1),
+            SessionDB.started_at < datetime(year + 1, 1, 1),
+            # Live sessions count once they end, like in the session lists
+            SessionDB.in_progress.is_(False)
+        )\
+        .group_by(day)
+    
+    counts = [0] * CALENDAR_SLOTS
+    volume = [0] * CALENDAR_SLOTS
+    for started, session_count, session_volume in db.execute(stmt):
+        slot = started.timetuple().tm_yday - 1
+        counts[slot] = session_count
+        volume[slot] = int(session_volume)
+    return CalendarHeatmap(year=year, counts=counts, volume=volume)
+
+@router.get("/calendar", response_model=CalendarHeatmap)
+def get_calendar(
+    request: Request,
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Sessions and volume per day of a year (defaults to the current year)"""
+    if year is None:
+        year = datetime.now(timezone.utc).year
+    return calendar_cache.get_or_compute(
+        current_user.id,
+        lambda: EncodedBody.from_model(_calendar_heatmap(db, current_user.id, year)),
+        key=year
+    ).response(request)
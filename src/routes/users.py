@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from ..models import User as UserModel
 from ..db_models import User as UserDB
-from ..database.database import get_db
+from ..database.database import get_db, get_engine, engine_for_user
+from ..database.sharding import place_user
 from bcrypt import hashpw, gensalt
 from ..auth import (
     verify_password, 
@@ -16,15 +16,17 @@ from ..auth import (
     generate_user_session_id
 )
 from ..models import UserLogin
+from .. import deletion
+from ..profiling import ProfiledRoute
+from ..rate_limit import limiter
 from pydantic import BaseModel
 import logging
 import re
 import os
 
-# Create limiter for this module
-limiter = Limiter(key_func=get_remote_address)
+logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=ProfiledRoute)
 
 class RefreshTokenRequest(BaseModel):
     refresh_token: str
@@ -48,8 +50,6 @@ def validate_username(username: str) -> bool:
 @router.post("/", response_model=UserModel)
 @limiter.limit("5/minute")
 def create_user(request: Request, user: UserModel, db: Session = Depends(get_db)):
-    logging.debug(f"Creating user: {user.model_dump()}")
-    
     # Normalize username to lowercase for storage and comparison
     normalized_username = user.username.lower().strip()
     
@@ -96,20 +96,20 @@ def create_user(request: Request, user: UserModel, db: Session = Depends(get_db)
     )
     db.add(db_user)
     try:
+        place_user(db, db_user)
         db.commit()
         db.refresh(db_user)
     except Exception as e:
         db.rollback()
-        logging.error(f"Error creating user: {e}")
+        logger.exception("Error creating user %s", normalized_username)
         raise HTTPException(status_code=500, detail="Failed to create user")
     
+    logger.info("Created user %s", normalized_username, extra={"user_id": db_user.id})
     return user
 
 @router.post("/login", response_model=TokenResponse)
 @limiter.limit("10/minute")
 def login(request: Request, user_credentials: UserLogin, db: Session = Depends(get_db)):
-    print(f"DEBUG: Login attempt for username: {user_credentials.username}")
-    
     # Normalize username for lookup (case-insensitive)
     normalized_username = user_credentials.username.lower().strip()
     
@@ -118,20 +118,13 @@ def login(request: Request, user_credentials: UserLogin, db: Session = Depends(g
         func.lower(UserDB.username) == normalized_username
     ).first()
     
-    if user:
-        print(f"DEBUG: User found in DB: {user.username}")
-        password_check = verify_password(user_credentials.password, user.password_hash)
-        print(f"DEBUG: Password verification: {password_check}")
-    
     if not user or not verify_password(user_credentials.password, user.password_hash):
-        print("DEBUG: Login failed - invalid credentials")
+        logger.info("Failed login for %s", normalized_username, extra={"user_found": user is not None})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
         )
     
-    print("DEBUG: Creating tokens")
-    
     # Generate a session ID for this login session
     session_id = generate_user_session_id()
     
@@ -152,7 +145,7 @@ def login(request: Request, user_credentials: UserLogin, db: Session = Depends(g
         "created_at": user.created_at.isoformat()
     }
     
-    print("DEBUG: Login successful")
+    logger.debug("Login for %s", user.username, extra={"user_id": user.id})
     return TokenResponse(
         access_token=access_token,
         refresh_token=refresh_token,
@@ -204,7 +197,7 @@ def refresh_token(request: Request, refresh_request: RefreshTokenRequest, db: Se
     except HTTPException:
         raise
     except Exception as e:
-        logging.error(f"Error refreshing token: {e}")
+        logger.warning("Error refreshing token: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token"
@@ -225,4 +218,30 @@ def get_current_user_info(current_user: UserDB = Depends(get_current_user)):
         "username": current_user.username,
         "email": current_user.email,
         "created_at": current_user.created_at
-    }
\ No newline at end of file
+    }
+
+@router.delete("/me", status_code=204)
+@limiter.limit("3/minute")
+def delete_my_account(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    """
+    Delete the authenticated user and all their data. Usually a single
+    cascading DELETE (204); accounts with a long history are retired at
+    once and deleted in chunks after the response (202).
+    """
+    user_id, username = current_user.id, current_user.username
+    engine = engine_for_user(current_user)
+    sessions = deletion.count_sessions(db, user_id)
+    if sessions <= deletion.BACKGROUND_DELETE_SESSIONS:
+        deletion.delete_account(db, user_id)
+        logger.info("Deleted account %s", username, extra={"user_id": user_id, "sessions": sessions})
+        return Response(status_code=204)
+
+    deletion.retire_account(db, user_id)
+    background_tasks.add_task(deletion.delete_account_in_chunks, engine, user_id, directory=get_engine())
+    logger.info("Deleting account %s in the background", username, extra={"user_id": user_id, "sessions": sessions})
+    return JSONResponse(status_code=202, content={"detail": "Account deletion started", "sessions": sessions})
@@ -0,0 +1,66 @@
+import re
+from sqlalchemy import func, select, union
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from .db_models import (
+    SessionDB,
+    WorkoutDB,
+    SEARCH_CONFIG,
+    session_notes_document,
+    workout_name_document
+)
+from .snapshots import read_snapshots
+
+# Runs of letters and digits in any script (\w without the underscore)
+_TERM = re.compile(r"[^\W_]+")
+
+
+def build_tsquery(text: str) -> Optional[str]:
+    """
+    Turn free text into a to_tsquery expression that matches every word.
+
+    Only runs of letters and digits are kept, so user input can never
+    produce tsquery syntax. The last word is matched as a prefix to support search-as-you-type.
+    """
+    terms = _TERM.findall(text)[:10]
+    if not terms:
+        return None
+    return " & ".join(terms[:-1] + [terms[-1] + ":*"])
+
+
+def search_sessions(db: Session, user_id: int, text: str, page: int, page_size: int) -> Tuple[int, str]:
+    """
+    Sessions whose notes or workout names match, newest first: the total
+    and the page as a JSON array of their stored snapshots (see src/snapshots.py)
+    """
+    tsquery = build_tsquery(text)
+    if tsquery is None:
+        return 0, "[]"
+    query = func.to_tsquery(SEARCH_CONFIG, tsquery)
+
+    # Each branch is answered from its own GIN index
+    matching_ids = union(
+        select(SessionDB.id).where(
+            SessionDB.user_id == user_id,
+            SessionDB.in_progress.is_(False),
+            session_notes_document.op("@@")(query)
+        ),
+        select(WorkoutDB.session_id)
+            .join(SessionDB, SessionDB.id == WorkoutDB.session_id)
+            .where(
+                SessionDB.user_id == user_id,
+                SessionDB.in_progress.is_(False),
+                workout_name_document.op("@@")(query)
+            )
+    ).subquery()
+
+    total = db.execute(select(func.count()).select_from(matching_ids)).scalar_one()
+    if total == 0:
+        return 0, "[]"
+
+    page_ids = select(SessionDB.id)\
+        .where(SessionDB.id.in_(select(matching_ids.c[0])))\
+        .order_by(SessionDB.started_at.desc(), SessionDB.id.desc())\
+        .limit(page_size)\
+        .offset((page - 1) * page_size)
+    return total, read_snapshots(db, SessionDB.id.in_(page_ids.scalar_subquery()), newest_first=True)
@@ -0,0 +1,214 @@
+"""
+Session snapshots: each finished session row carries its whole tree as one
+JSON document (sessions.snapshot, JSONB on Postgres), in the shape GET
+/sessions returns, so reads are one indexed lookup without joins or ORM
+objects. The workouts, sets and reps tables stay the source of truth; every
+write path rewrites the snapshot in the same transaction.
+
+    python -m src.snapshots [--user-id N] [--repair]
+
+compares the snapshots with the rows they were built from, and with
+--repair rebuilds the ones that are missing or differ (also how sessions
+written before the column existed get theirs).
+"""
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import Text, cast, select, update
+from sqlalchemy.orm import Session, joinedload
+from .db_models import SessionDB, WorkoutDB, SetDB
+from .validation.validation import to_utc_naive
+
+logger = logging.getLogger(__name__)
+
+# Sessions compared (and rebuilt) per batch by check_snapshots
+CHECK_BATCH_SIZE = 500
+
+# (id, started_at, finished_at, count, intensity, weight)
+SetRow = Tuple[int, datetime, datetime, int, str, Optional[int]]
+# (id, name, started_at, finished_at, sets)
+WorkoutRow = Tuple[int, str, datetime, datetime, Sequence[SetRow]]
+
+
+def build_snapshot(
+    session_id: int,
+    version: int,
+    started_at: datetime,
+    finished_at: datetime,
+    notes: Optional[str],
+    workouts: Iterable[WorkoutRow]
+) -> dict:
+    """
+    A session as StoredSession serializes it, from plain values; workouts
+    and sets in id order. Datetimes as the database returns them: naive UTC.
+    """
+    def iso(value: datetime) -> str:
+        return to_utc_naive(value).isoformat()
+
+    return {
+        "workouts": [
+            {
+                "sets": [
+                    {
+                        "reps": {"intensity": intensity, "count": count, "weight": weight},
+                        "started_at": iso(set_started),
+                        "finished_at": iso(set_finished),
+                        "id": set_id,
+                    }
+                    for set_id, set_started, set_finished, count, intensity, weight in sorted(sets)
+                ],
+                "name": name,
+                "started_at": iso(workout_started),
+                "finished_at": iso(workout_finished),
+                "id": workout_id,
+            }
+            for workout_id, name, workout_started, workout_finished, sets in sorted(workouts, key=lambda workout: workout[0])
+        ],
+        "started_at": iso(started_at),
+        "finished_at": iso(finished_at),
+        "notes": notes,
+        "id": session_id,
+        "version": version,
+    }
+
+
+def session_snapshot(db_session: SessionDB) -> dict:
+    """build_snapshot() for a session whose workouts, sets and reps are loaded"""
+    return build_snapshot(
+        db_session.id, db_session.version, db_session.started_at, db_session.finished_at, db_session.notes,
+        [
+            (
+                workout.id, workout.name, workout.started_at, workout.finished_at,
+                [
+                    (set_.id, set_.started_at, set_.finished_at, set_.reps.count, set_.reps.intensity, set_.reps.weight)
+                    for set_ in workout.sets
+                ],
+            )
+            for workout in db_session.workouts
+        ]
+    )
+
+
+def load_trees(db: Session, *criteria) -> List[SessionDB]:
+    """Sessions matching criteria with their trees, in one joined query; read fresh from the database"""
+    return db.query(SessionDB)\
+        .options(
+            joinedload(SessionDB.workouts)
+            .joinedload(WorkoutDB.sets)
+            .joinedload(SetDB.reps)
+        )\
+        .filter(*criteria)\
+        .populate_existing()\
+        .all()
+
+
+def write_snapshot(db: Session, session_id: int) -> dict:
+    """Rebuild one session's snapshot from its rows within the caller's transaction; returns it"""
+    [db_session] = load_trees(db, SessionDB.id == session_id)
+    snapshot = session_snapshot(db_session)
+    db.execute(
+        update(SessionDB).where(SessionDB.id == session_id).values(snapshot=snapshot)
+        .execution_options(synchronize_session=False)
+    )
+    return snapshot
+
+
+def read_snapshots(db: Session, *criteria, newest_first: bool = False) -> str:
+    """
+    The finished sessions matching criteria as a JSON array, in start
+    order (or the reverse). Stored snapshots are passed through as text,
+    never parsed; sessions without one yet are built from their rows.
+    """
+    order = (SessionDB.started_at.desc(), SessionDB.id.desc()) if newest_first else (SessionDB.started_at, SessionDB.id)
+    rows = db.execute(
+        select(SessionDB.id, cast(SessionDB.snapshot, Text))
+        .where(SessionDB.in_progress.is_(False), *criteria)
+        .order_by(*order)
+    ).all()
+    missing = [session_id for session_id, snapshot in rows if snapshot is None]
+    if missing:
+        built = {
+            db_session.id: json.dumps(session_snapshot(db_session))
+            for db_session in load_trees(db, SessionDB.id.in_(missing))
+        }
+        rows = [(session_id, snapshot if snapshot is not None else built[session_id]) for session_id, snapshot in rows]
+    return "[" + ",".join(snapshot for _, snapshot in rows) + "]"
+
+
+def check_snapshots(
+    db: Session,
+    user_id: Optional[int] = None,
+    repair: bool = False,
+    batch_size: int = CHECK_BATCH_SIZE
+) -> dict:
+    """
+    Compare every finished session's snapshot with a fresh build from its
+    rows, a batch of sessions at a time; with repair, overwrite the ones
+    that are missing or differ, committing per batch. Returns counts and
+    the ids that were off.
+    """
+    stats = {"checked": 0, "missing": [], "stale": [], "repaired": 0}
+    criteria = [SessionDB.in_progress.is_(False)]
+    if user_id is not None:
+        criteria.append(SessionDB.user_id == user_id)
+    last_id = 0
+    while True:
+        ids = db.execute(
+            select(SessionDB.id).where(SessionDB.id > last_id, *criteria).order_by(SessionDB.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return stats
+        last_id = ids[-1]
+        # Separately: in the joined tree query each document would come back once per set
+        stored = dict(db.execute(select(SessionDB.id, SessionDB.snapshot).where(SessionDB.id.in_(ids))).all())
+        repairs = []
+        for db_session in load_trees(db, SessionDB.id.in_(ids)):
+            expected = session_snapshot(db_session)
+            if stored[db_session.id] is None:
+                stats["missing"].append(db_session.id)
+            elif stored[db_session.id] != expected:
+                stats["stale"].append(db_session.id)
+            else:
+                continue
+            repairs.append({"id": db_session.id, "snapshot": expected})
+        stats["checked"] += len(ids)
+        if repair and repairs:
+            db.execute(update(SessionDB), repairs)
+            stats["repaired"] += len(repairs)
+            logger.info("Rebuilt %d session snapshots", len(repairs))
+        db.commit()
+        # The batch's trees aren't needed again
+        db.expunge_all()
+
+
+def main():
+    from .database.database import get_engine, get_shard_engines
+
+    parser = argparse.ArgumentParser(description="Check session snapshots against the workout and set rows")
+    parser.add_argument("--user-id", type=int, help="only this user's sessions")
+    parser.add_argument("--repair", action="store_true", help="rebuild missing and stale snapshots")
+    parser.add_argument("--batch-size", type=int, default=CHECK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    primary = get_engine()
+    engines = [primary] + [engine for engine in get_shard_engines() if engine is not primary]
+    problems = 0
+    for engine in engines:
+        with Session(engine) as db:
+            stats = check_snapshots(db, args.user_id, args.repair, args.batch_size)
+        problems += len(stats["missing"]) + len(stats["stale"]) - stats["repaired"]
+        print(
+            f"{engine.url.render_as_string(hide_password=True)}: {stats['checked']:,} sessions checked, "
+            f"{len(stats['missing']):,} missing, {len(stats['stale']):,} stale, {stats['repaired']:,} repaired"
+        )
+        for session_id in stats["stale"][:20]:
+            print(f"  stale: session {session_id}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
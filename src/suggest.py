@@ -0,0 +1,102 @@
+import threading
+from bisect import bisect_left, insort
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+from .cache import UserCache
+from .db_models import SessionDB, WorkoutDB
+
+
+class PrefixIndex:
+    """
+    Workout names with usage counts, kept sorted by lowercase name.
+
+    A prefix lookup is a binary search to the first matching key followed by a
+    scan over the contiguous run of matches, which are then ranked by count.
+    """
+
+    def __init__(self, counts: Dict[str, int]):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, list] = {}  # lowercase name -> [display name, count]
+        for name, count in counts.items():
+            entry = self._entries.setdefault(name.lower(), [name, 0])
+            entry[1] += count
+        self._keys = sorted(self._entries)
+
+    def add(self, names: Iterable[str]) -> None:
+        with self._lock:
+            for name in names:
+                key = name.lower()
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._entries[key] = [name, 1]
+                    insort(self._keys, key)
+                else:
+                    entry[1] += 1
+
+    def remove(self, names: Iterable[str]) -> None:
+        with self._lock:
+            for name in names:
+                key = name.lower()
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._entries[key]
+                    self._keys.pop(bisect_left(self._keys, key))
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        prefix = prefix.lower()
+        with self._lock:
+            matches = []
+            for i in range(bisect_left(self._keys, prefix), len(self._keys)):
+                key = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                name, count = self._entries[key]
+                matches.append((name, count))
+        matches.sort(key=lambda match: (-match[1], match[0].lower()))
+        return matches[:limit]
+
+
+# Brought up to date in place by record_workouts in the process that wrote,
+# rather than rebuilt; other processes rebuild once the user's cache
+# generation moves on (see src/cache.py), or after CACHE_TTL
+_indexes = UserCache("workout_names", invalidate_on_write=False)
+
+
+def _build_index(db: Session, user_id: int) -> PrefixIndex:
+    stmt = select(WorkoutDB.name, func.count())\
+        .join(SessionDB, SessionDB.id == WorkoutDB.session_id)\
+        .where(SessionDB.user_id == user_id, SessionDB.in_progress.is_(False))\
+        .group_by(WorkoutDB.name)
+    return PrefixIndex(dict(db.execute(stmt).all()))
+
+
+def suggest_workout_names(db: Session, user_id: int, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+    """The user's most used workout names starting with `prefix` (case-insensitive)"""
+    index = _indexes.get_or_compute(user_id, lambda: _build_index(db, user_id))
+    return index.search(prefix, limit)
+
+
+def record_workouts(user_id: int, generation: Optional[int], names: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+    """
+    Count newly committed (and uncount deleted) workouts of finished
+    sessions in the user's index, if one is loaded. `generation` is what
+    invalidate_user() returned for the write; call this after it, for every
+    write, or the index is rebuilt on next use.
+    """
+    if generation is None:
+        _indexes.invalidate(user_id)
+        return
+
+    def update(index: PrefixIndex) -> None:
+        index.remove(removed)
+        index.add(names)
+    _indexes.advance(user_id, generation, update)
+
+
+def forget_user(user_id: int) -> None:
+    """Drop the user's index so it is rebuilt from the database on next use"""
+    _indexes.invalidate(user_id)
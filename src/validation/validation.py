@@ -109,8 +109,11 @@ def validate_weight(weight: Optional[int]) -> Optional[int]:
     
     return weight
 
-def validate_datetime(dt: datetime, field_name: str) -> datetime:
-    """Validate datetime field"""
+def validate_datetime(dt: datetime, field_name: str, allow_past: bool = False) -> datetime:
+    """
+    Validate datetime field (allow_past lifts the one-year limit for historical
+    imports); returns it as naive UTC, as every write path stores timestamps
+    """
     if not isinstance(dt, datetime):
         raise ValueError(f"{field_name} must be a valid datetime")
     
@@ -128,13 +131,20 @@ def validate_datetime(dt: datetime, field_name: str) -> datetime:
         year_ago = now.replace(year=now.year - 1)
         year_ahead = now.replace(year=now.year + 1)
     
-    if dt < year_ago:
+    if dt < year_ago and not allow_past:
         raise ValueError(f"{field_name} cannot be more than a year in the past")
     
     if dt > year_ahead:
         raise ValueError(f"{field_name} cannot be more than a year in the future")
     
-    return dt
+    return to_utc_naive(dt)
+
+def to_utc_naive(dt: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; convert aware ones, keep naive ones as they are"""
+    if dt.tzinfo is None:
+        return dt
+    from datetime import timezone
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
 
 def validate_time_order(start_time: datetime, end_time: datetime, context: str) -> None:
     """Validate that end time is after start time"""
@@ -1,5 +1,21 @@
 import pytest
 from datetime import datetime, timedelta
+from src.rate_limit import limiter
+from src import cache
+from src.query_audit import capture_queries
+
+@pytest.fixture(autouse=True)
+def reset_in_memory_state():
+    """Rate limit buckets and derived-data caches are in-memory, so clear them between tests"""
+    limiter.reset()
+    cache.clear_all()
+    yield
+
+@pytest.fixture
+def query_audit():
+    """Collect SQL query reports for requests made in the test; call .assert_clean() to enforce budgets"""
+    with capture_queries() as reports:
+        yield reports
 
 @pytest.fixture
 def sample_user_data():
@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta
+
 # Common test data
 MALICIOUS_STRINGS = [
     "'; DROP TABLE users; --",
@@ -35,4 +37,26 @@ INVALID_REP_COUNTS = [
     "ten",
     None,
     3.14,
-]
\ No newline at end of file
+]
+
+def export_record(day: int, weight: int = 100, **session):
+    """One session as it appears in an export file (see src/processor.py)"""
+    started = datetime(2020, 1, 1, 9) + timedelta(days=day)
+    data = {
+        "user_id": 7,
+        "started_at": started.isoformat() + "Z",
+        "finished_at": (started + timedelta(hours=1)).isoformat() + "Z",
+        "notes": "Ünïcode notes",
+        "workouts": [{
+            "name": "Squats",
+            "started_at": started.isoformat(),
+            "finished_at": (started + timedelta(minutes=20)).isoformat(),
+            "sets": [{
+                "started_at": started.isoformat(),
+                "finished_at": (started + timedelta(minutes=2)).isoformat(),
+                "reps": {"count": 5, "intensity": "high", "weight": weight}
+            }]
+        }]
+    }
+    data.update(session)
+    return {"session": data}
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def run_python(code: str, **env):
+    environment = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    environment.update(env)
+    return subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)],
+        cwd=ROOT, env=environment, capture_output=True, text=True, timeout=60
+    )
+
+class TestAppFactory:
+    def test_import_needs_no_database(self):
+        result = run_python("""
+            import main
+            from src.database import database
+            assert database._engine is None, "engine created at import"
+            print(len(main.app.routes))
+        """, SECRET_KEY="test")
+        assert result.returncode == 0, result.stderr
+        assert int(result.stdout) > 0
+    
+    def test_missing_database_url_fails_at_startup(self):
+        result = run_python("""
+            from fastapi.testclient import TestClient
+            from main import create_app
+            try:
+                with TestClient(create_app()):
+                    pass
+            except ValueError as e:
+                print(e)
+        """, SECRET_KEY="test")
+        assert "DATABASE_URL" in result.stdout, result.stderr
+    
+    def test_factory_builds_independent_apps(self):
+        from main import create_app
+        first, second = create_app(), create_app()
+        assert first is not second
+        assert {route.path for route in first.routes} == {route.path for route in second.routes}
+    
+    def test_lifespan_warms_pool(self):
+        from fastapi.testclient import TestClient
+        from main import create_app
+        from src.database import database
+        
+        with TestClient(create_app()) as client:
+            assert client.get("/").status_code == 200
+            assert database.get_engine().pool.checkedin() >= min(database.POOL_WARMUP, database.POOL_SIZE)
@@ -0,0 +1,61 @@
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session, joinedload
+from benchmarks import generator
+from src.db_models import User, SessionDB, WorkoutDB, SetDB, RepsDB
+from src.models import Session as SessionModel
+from src.snapshots import check_snapshots
+
+class TestBenchmarkGenerator:
+    def test_generates_requested_volume(self, test_engine, test_db):
+        summary = generator.generate(test_engine, total_sets=500, users=3, seed=1)
+        assert summary["users"] == 3
+        # Whole sessions are generated, so the last one may overshoot a little
+        assert 500 <= summary["sets"] < 530
+        assert test_db.scalar(select(func.count()).select_from(SetDB)) == summary["sets"]
+        assert test_db.scalar(select(func.count()).select_from(SessionDB)) == summary["sessions"]
+    
+    def test_same_seed_same_data(self, test_engine, test_db):
+        def snapshot():
+            return test_db.execute(
+                select(SessionDB.started_at, WorkoutDB.name, RepsDB.count, RepsDB.weight)
+                .join(WorkoutDB).join(SetDB).join(RepsDB)
+                .order_by(SessionDB.id, WorkoutDB.id, SetDB.id)
+            ).all()
+        
+        now = generator.datetime(2026, 1, 1)
+        generator.generate(test_engine, total_sets=300, users=2, seed=7, now=now)
+        first = snapshot()
+        for model in (RepsDB, SetDB, WorkoutDB, SessionDB, User):
+            test_db.query(model).delete()
+        test_db.commit()
+        
+        generator.generate(test_engine, total_sets=300, users=2, seed=7, now=now)
+        assert snapshot() == first
+    
+    def test_generated_sessions_pass_validation(self, test_engine, test_db):
+        generator.generate(test_engine, total_sets=200, users=1, seed=3)
+        sessions = test_db.query(SessionDB).options(
+            joinedload(SessionDB.workouts).joinedload(WorkoutDB.sets).joinedload(SetDB.reps)
+        ).all()
+        for session in sessions:
+            SessionModel.model_validate(session, from_attributes=True)
+    
+    def test_summary_columns_match_the_rows(self, test_engine, test_db):
+        generator.generate(test_engine, total_sets=200, users=2, seed=5)
+        mismatched = test_db.execute(text(
+            "SELECT s.id FROM sessions s JOIN ("
+            "SELECT w.session_id, count(DISTINCT w.id) AS workouts, count(st.id) AS sets, "
+            "coalesce(sum(r.count * coalesce(r.weight, 0)), 0) AS volume "
+            "FROM workouts w JOIN sets st ON st.workout_id = w.id JOIN reps r ON r.set_id = st.id "
+            "GROUP BY w.session_id) t ON t.session_id = s.id "
+            "WHERE (s.workout_count, s.set_count, s.total_volume) <> (t.workouts, t.sets, t.volume)"
+        )).all()
+        assert mismatched == []
+        assert test_db.scalar(select(func.sum(SessionDB.set_count))) == test_db.scalar(select(func.count()).select_from(SetDB))
+    
+    def test_snapshots_match_the_rows(self, test_engine, test_db):
+        summary = generator.generate(test_engine, total_sets=200, users=2, seed=5)
+        with Session(test_engine) as db:
+            stats = check_snapshots(db)
+        assert stats["checked"] == summary["sessions"]
+        assert (stats["missing"], stats["stale"]) == ([], [])
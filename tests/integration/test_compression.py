@@ -0,0 +1,67 @@
+import pytest
+from datetime import datetime, timezone
+from src import compression
+from src.routes.stats import training_load_cache
+
+def add_sessions(client, auth_headers, valid_session_data, n):
+    for _ in range(n):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+
+class TestResponseCompression:
+    def test_session_list_gzip(self, client, auth_headers, valid_session_data):
+        add_sessions(client, auth_headers, valid_session_data, 3)
+        plain = client.get("/sessions/", headers={**auth_headers, "Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["vary"] == "Accept-Encoding"
+        
+        response = client.get("/sessions/", headers={**auth_headers, "Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(plain.content)
+        assert response.json() == plain.json()
+    
+    def test_brotli(self, client, auth_headers, valid_session_data):
+        pytest.importorskip("brotli")
+        add_sessions(client, auth_headers, valid_session_data, 3)
+        response = client.get("/sessions/", headers={**auth_headers, "Accept-Encoding": "gzip, br"})
+        assert response.headers["content-encoding"] == "br"
+        assert len(response.json()) == 3
+    
+    def test_small_responses_left_alone(self, client, auth_headers):
+        response = client.get("/stats/prs", headers={**auth_headers, "Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+    
+    def test_other_paths_not_compressed(self, client):
+        response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+class TestPrecompressedCache:
+    def test_calendar_compressed_once_per_coding(self, client, auth_headers, valid_session_data, monkeypatch):
+        add_sessions(client, auth_headers, valid_session_data, 1)
+        calls = []
+        real_compress = compression.compress
+        monkeypatch.setattr(compression, "compress", lambda body, encoding: calls.append(encoding) or real_compress(body, encoding))
+        
+        headers = {**auth_headers, "Accept-Encoding": "gzip"}
+        first = client.get("/stats/calendar", headers=headers)
+        second = client.get("/stats/calendar", headers=headers)
+        assert first.headers["content-encoding"] == "gzip"
+        assert first.headers["vary"] == "Accept-Encoding"
+        assert first.content == second.content
+        assert calls == ["gzip"]
+        assert sum(first.json()["counts"]) == 1
+    
+    def test_training_load_cached_per_window(self, client, auth_headers, valid_session_data):
+        add_sessions(client, auth_headers, valid_session_data, 1)
+        user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+        today = datetime.now(timezone.utc).date()
+        
+        for days in (7, 30):
+            assert client.get(f"/stats/training-load?days={days}", headers=auth_headers).status_code == 200
+            assert training_load_cache.get(user_id, key=(today, days)) is not None
+        
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        assert training_load_cache.get(user_id, key=(today, 7)) is None
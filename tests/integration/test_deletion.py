@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import func, inspect, select, text
+from src import deletion
+from src.db_models import User, SessionDB, WorkoutDB, SetDB, RepsDB, PersonalRecordDB
+from scripts.migrate_schema import migration_statements, run_statement
+
+def _count(test_engine, model):
+    with test_engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+def _create(client, auth_headers, valid_session_data, count=1):
+    for _ in range(count):
+        assert client.post("/sessions/", json=valid_session_data, headers=auth_headers).status_code == 200
+    return client.get("/sessions/", headers=auth_headers).json()
+
+class TestDeleteSession:
+    def test_deletes_the_tree(self, client, auth_headers, valid_session_data, test_engine):
+        first, second = _create(client, auth_headers, valid_session_data, 2)
+        response = client.delete(f"/sessions/{first['id']}", headers=auth_headers)
+        assert response.status_code == 204
+        assert [s["id"] for s in client.get("/sessions/", headers=auth_headers).json()] == [second["id"]]
+        for model in (WorkoutDB, SetDB, RepsDB):
+            assert _count(test_engine, model) == 1
+        assert client.delete(f"/sessions/{first['id']}", headers=auth_headers).status_code == 404
+
+    def test_personal_records_rebuilt(self, client, auth_headers, valid_session_data):
+        [session] = _create(client, auth_headers, valid_session_data)
+        assert client.delete(f"/sessions/{session['id']}", headers=auth_headers).status_code == 204
+        assert client.get("/stats/prs", headers=auth_headers).json() == []
+
+    def test_other_users_session_not_found(self, client, auth_headers, valid_session_data):
+        [session] = _create(client, auth_headers, valid_session_data)
+        client.post("/users/", json={"username": "other", "email": "other@example.com", "password": "password123"})
+        token = client.post("/users/login", json={"username": "other", "password": "password123"}).json()["access_token"]
+        response = client.delete(f"/sessions/{session['id']}", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 404
+
+class TestDeleteAccount:
+    def test_single_statement_delete(self, client, auth_headers, valid_session_data, test_engine):
+        _create(client, auth_headers, valid_session_data, 2)
+        response = client.delete("/users/me", headers=auth_headers)
+        assert response.status_code == 204
+        for model in (User, SessionDB, WorkoutDB, SetDB, RepsDB, PersonalRecordDB):
+            assert _count(test_engine, model) == 0
+        assert client.get("/users/me", headers=auth_headers).status_code == 401
+
+    def test_large_account_deleted_in_background_chunks(self, monkeypatch, client, auth_headers, valid_session_data, test_engine):
+        monkeypatch.setattr(deletion, "BACKGROUND_DELETE_SESSIONS", 2)
+        monkeypatch.setattr(deletion, "DELETE_CHUNK_SESSIONS", 2)
+        _create(client, auth_headers, valid_session_data, 5)
+        # The test client runs background tasks before returning
+        response = client.delete("/users/me", headers=auth_headers)
+        assert response.status_code == 202
+        assert response.json()["sessions"] == 5
+        for model in (User, SessionDB, SetDB, PersonalRecordDB):
+            assert _count(test_engine, model) == 0
+
+    def test_chunked_delete(self, client, auth_headers, valid_session_data, test_engine):
+        _create(client, auth_headers, valid_session_data, 5)
+        user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+        assert deletion.delete_account_in_chunks(test_engine, user_id, chunk_size=2) == 5
+        assert _count(test_engine, User) == 0 and _count(test_engine, RepsDB) == 0
+
+def test_schema_needs_no_migration(test_engine):
+    assert migration_statements(inspect(test_engine)) == []
+
+def test_missing_indexes_are_built_concurrently(test_engine):
+    with test_engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_sets_workout_id"))
+        conn.execute(text("DROP INDEX ix_workouts_name_search"))
+    statements = migration_statements(inspect(test_engine))
+    assert statements == [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sets_workout_id ON sets (workout_id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workouts_name_search ON workouts USING gin (to_tsvector('english', name))",
+    ]
+    for statement in statements:
+        run_statement(test_engine, statement)
+    assert migration_statements(inspect(test_engine)) == []
@@ -0,0 +1,55 @@
+import pytest
+import copy
+from sqlalchemy import text
+from src import cache
+
+class TestExerciseSuggestAPI:
+    def test_suggest_ranks_by_frequency(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        
+        # Load the index before the next write so it is updated in place
+        assert client.get("/exercises/suggest?q=b", headers=auth_headers).json() == [
+            {"name": "Bench Press", "count": 1}
+        ]
+        
+        other = copy.deepcopy(valid_session_data)
+        other["workouts"][0]["name"] = "Bent-over Row"
+        client.post("/sessions/", json=other, headers=auth_headers)
+        client.post("/sessions/", json=other, headers=auth_headers)
+        
+        response = client.get("/exercises/suggest?q=BEN", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == [
+            {"name": "Bent-over Row", "count": 2},
+            {"name": "Bench Press", "count": 1}
+        ]
+    
+    def test_suggest_no_match(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        response = client.get("/exercises/suggest?q=squat", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_index_updated_in_place(self, client, auth_headers, valid_session_data, query_audit):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        client.get("/exercises/suggest?q=b", headers=auth_headers)
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        query_audit.clear()
+        assert client.get("/exercises/suggest?q=b", headers=auth_headers).json() == [{"name": "Bench Press", "count": 2}]
+        # Only the user lookup: the index wasn't rebuilt
+        assert query_audit[0].count == 1
+
+    def test_write_in_another_process_rebuilds_the_index(self, client, auth_headers, valid_session_data, test_engine):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        client.get("/exercises/suggest?q=b", headers=auth_headers)
+        # Another worker adds a session and bumps the user's generation
+        with test_engine.begin() as conn:
+            conn.execute(text("UPDATE workouts SET name = 'Bent-over Row'"))
+        cache.invalidate_user(client.get("/users/me", headers=auth_headers).json()["id"])
+        assert client.get("/exercises/suggest?q=b", headers=auth_headers).json() == [{"name": "Bent-over Row", "count": 1}]
+
+    def test_sessions_in_progress_are_left_out(self, client, auth_headers, valid_session_data, test_engine):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        with test_engine.begin() as conn:
+            conn.execute(text("UPDATE sessions SET in_progress = true"))
+        assert client.get("/exercises/suggest?q=b", headers=auth_headers).json() == []
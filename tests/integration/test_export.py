@@ -0,0 +1,59 @@
+import csv
+import io
+import pytest
+from sqlalchemy import text
+from src.export import COLUMN_NAMES, iter_batches
+
+def _create_sessions(client, auth_headers, valid_session_data, count):
+    for i in range(count):
+        valid_session_data["notes"] = f"session {i}"
+        response = client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        assert response.status_code == 200
+
+class TestExportAPI:
+    def test_csv(self, client, auth_headers, valid_session_data):
+        _create_sessions(client, auth_headers, valid_session_data, 2)
+        response = client.get("/sessions/export", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="sets.csv"' in response.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 2
+        assert tuple(rows[0]) == COLUMN_NAMES
+        assert rows[0]["exercise"] == "Bench Press" and rows[0]["weight"] == "135"
+    
+    def test_parquet(self, client, auth_headers, valid_session_data):
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.parquet
+        _create_sessions(client, auth_headers, valid_session_data, 3)
+        response = client.get("/sessions/export", params={"format": "parquet"}, headers=auth_headers)
+        assert response.status_code == 200
+        table = pyarrow.parquet.read_table(io.BytesIO(response.content))
+        assert table.num_rows == 3
+        assert set(table.column("count").to_pylist()) == {10}
+    
+    def test_unknown_format(self, client, auth_headers):
+        response = client.get("/sessions/export", params={"format": "xlsx"}, headers=auth_headers)
+        assert response.status_code == 400
+    
+    def test_requires_auth(self, client):
+        assert client.get("/sessions/export").status_code in (401, 403)
+
+def test_batches_from_server_side_cursor(test_engine, client, auth_headers, valid_session_data):
+    _create_sessions(client, auth_headers, valid_session_data, 5)
+    with test_engine.connect() as conn:
+        batches = list(iter_batches(conn, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    # Ordered by session, workout and set
+    assert [row[1] for batch in batches for row in batch] == sorted(row[1] for batch in batches for row in batch)
+
+def test_sets_without_reps_and_unfinished_sessions(test_engine, client, auth_headers, valid_session_data):
+    _create_sessions(client, auth_headers, valid_session_data, 3)
+    with test_engine.begin() as conn:
+        conn.execute(text("DELETE FROM reps WHERE set_id = 1"))
+        conn.execute(text("UPDATE sessions SET in_progress = true WHERE id = 3"))
+    with test_engine.connect() as conn:
+        rows = [row for batch in iter_batches(conn) for row in batch]
+    assert [row[1] for row in rows] == [1, 2]
+    assert rows[0][-3:] == (None, None, None)
+    assert rows[1][-3:] == (10, "medium", 135)
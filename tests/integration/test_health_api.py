@@ -0,0 +1,30 @@
+from src.metrics import registry
+
+class TestHealthEndpoints:
+    def test_livez(self, client):
+        response = client.get("/livez")
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+
+    def test_readyz_reports_pool_and_latency(self, client):
+        response = client.get("/readyz")
+        assert response.status_code == 200
+        primary = response.json()["databases"]["primary"]
+        assert primary["ok"] and primary["latency_ms"] is not None
+        assert set(primary["pool"]) == {"size", "checked_out", "overflow", "capacity", "saturation"}
+
+    def test_health_keeps_its_shape(self, client):
+        assert client.get("/health").json() == {"status": "healthy", "database": "connected"}
+
+    def test_probes_do_not_query_the_database(self, client):
+        for path in ("/livez", "/readyz", "/health"):
+            client.get(path)
+            assert registry.db_queries[("GET", path)].total == 0
+
+    def test_not_ready_when_the_probe_fails(self, client):
+        prober = client.app.state.health
+        prober.results = {"primary": {"ok": False, "latency_ms": None, "error": "connection refused"}}
+        assert client.get("/readyz").status_code == 503
+        assert client.get("/health").json()["error"] == "connection refused"
+        # Liveness doesn't depend on the database
+        assert client.get("/livez").status_code == 200
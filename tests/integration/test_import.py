@@ -0,0 +1,105 @@
+import io
+import json
+import pytest
+import fakeredis
+from sqlalchemy import func, select
+from src import cache
+from src.cache import LocalGenerations, SharedGenerations
+from src.db_models import User, SessionDB, SetDB, RepsDB, PersonalRecordDB, ImportCheckpointDB
+from src.processor import import_file
+from tests.fixtures.test_data import export_record
+
+@pytest.fixture
+def owner(test_db):
+    user = User(username="importer", email="importer@example.com", password_hash="x")
+    test_db.add(user)
+    test_db.commit()
+    return user.id
+
+def _write(path, records):
+    path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n", encoding="utf-8")
+    return str(path)
+
+def _count(db, model):
+    return db.scalar(select(func.count()).select_from(model))
+
+class TestImportFile:
+    def test_imports_sessions_and_records(self, test_engine, test_db, tmp_path, owner):
+        records = [export_record(day, weight=100 + day, user_id=owner) for day in range(12)]
+        path = _write(tmp_path / "export.jsonl", records)
+        stats = import_file(test_engine, path, chunk_size=5)
+        
+        assert stats["imported"] == 12 and stats["rejected"] == 0 and stats["complete"]
+        assert _count(test_db, SessionDB) == 12
+        assert _count(test_db, RepsDB) == _count(test_db, SetDB) == 12
+        assert test_db.scalar(select(SessionDB.notes).limit(1)) == "Ünïcode notes"
+        record = test_db.query(PersonalRecordDB).filter_by(user_id=owner, exercise="Squats").one()
+        assert record.heaviest_weight == 111
+    
+    def test_rejects_are_reported_and_skipped(self, test_engine, test_db, tmp_path, owner):
+        bad = export_record(1, user_id=owner, workouts=[])
+        records = [export_record(0, user_id=owner), bad, export_record(2, user_id=owner + 1000)]
+        rejects = io.StringIO()
+        stats = import_file(test_engine, _write(tmp_path / "export.jsonl", records), rejects=rejects)
+        
+        assert (stats["imported"], stats["rejected"]) == (1, 2)
+        errors = [json.loads(line) for line in rejects.getvalue().splitlines()]
+        assert [error["record"] for error in errors] == [2, 3]
+        assert "unknown user_id" in errors[1]["error"]
+    
+    def test_validation_in_worker_processes(self, test_engine, test_db, tmp_path, owner):
+        records = [export_record(day, user_id=owner) for day in range(7)]
+        stats = import_file(test_engine, _write(tmp_path / "export.jsonl", records), chunk_size=2, workers=2)
+        assert stats["imported"] == 7
+        assert _count(test_db, SessionDB) == 7
+    
+    def test_insert_method(self, test_engine, test_db, tmp_path, owner):
+        records = [export_record(day, user_id=owner) for day in range(3)]
+        import_file(test_engine, _write(tmp_path / "export.jsonl", records), method="insert")
+        assert _count(test_db, SetDB) == 3
+    
+    def test_resumes_after_last_committed_chunk(self, test_engine, test_db, tmp_path, owner):
+        records = [export_record(day, user_id=owner) for day in range(10)]
+        path = _write(tmp_path / "export.jsonl", records)
+        
+        progress = []
+        def fail_after_two_chunks(stats):
+            progress.append(stats)
+            if len(progress) == 2:
+                raise KeyboardInterrupt
+        with pytest.raises(KeyboardInterrupt):
+            import_file(test_engine, path, chunk_size=3, progress=fail_after_two_chunks)
+        assert _count(test_db, SessionDB) == 6
+        
+        stats = import_file(test_engine, path, chunk_size=3)
+        assert stats["resumed"] and stats["imported"] == 10
+        assert _count(test_db, SessionDB) == 10
+        
+        # Done: running it again imports nothing
+        again = import_file(test_engine, path, chunk_size=3)
+        assert again["seconds"] is None
+        assert _count(test_db, SessionDB) == 10
+        
+        import_file(test_engine, path, restart=True)
+        assert _count(test_db, SessionDB) == 20
+    
+    def test_changed_file_needs_restart(self, test_engine, test_db, tmp_path, owner):
+        path = tmp_path / "export.jsonl"
+        _write(path, [export_record(0, user_id=owner)])
+        import_file(test_engine, str(path))
+        _write(path, [export_record(0, user_id=owner), export_record(1, user_id=owner)])
+        with pytest.raises(ValueError):
+            import_file(test_engine, str(path))
+        assert test_db.get(ImportCheckpointDB, str(path)).imported == 1
+    
+    def test_invalidates_servers_sharing_the_generation_store(self, test_engine, test_db, tmp_path, owner):
+        server = fakeredis.FakeServer()
+        cache.use_generations(SharedGenerations(client=fakeredis.FakeRedis(server=server)))
+        try:
+            # What a running server reads
+            shared = SharedGenerations(client=fakeredis.FakeRedis(server=server))
+            before = shared.get(owner)
+            import_file(test_engine, _write(tmp_path / "export.jsonl", [export_record(0, user_id=owner)]))
+            assert shared.get(owner) > before
+        finally:
+            cache.use_generations(LocalGenerations())
@@ -0,0 +1,119 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from starlette.websockets import WebSocketDisconnect
+from src import live
+from src.db_models import SessionDB, SetDB, RepsDB
+
+def _set(started: datetime, weight: int = 135) -> dict:
+    return {
+        "type": "set",
+        "started_at": started.isoformat(),
+        "finished_at": (started + timedelta(seconds=45)).isoformat(),
+        "reps": {"count": 8, "intensity": "medium", "weight": weight}
+    }
+
+def _connect(client, auth_headers):
+    token = auth_headers["Authorization"].split()[1]
+    return client.websocket_connect(f"/sessions/live?token={token}")
+
+def _count(test_engine, model):
+    with test_engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+class TestLiveSession:
+    def test_sets_are_written_in_batches(self, monkeypatch, client, auth_headers, test_engine):
+        monkeypatch.setattr(live, "LIVE_FLUSH_SETS", 3)
+        now = datetime.now()
+        with _connect(client, auth_headers) as ws:
+            ws.send_json({"type": "start", "started_at": now.isoformat(), "notes": "live"})
+            started = ws.receive_json()
+            assert started["type"] == "started"
+            ws.send_json({"type": "workout_start", "name": "Bench Press", "started_at": now.isoformat()})
+            assert ws.receive_json()["type"] == "workout_started"
+
+            acks = []
+            for i in range(4):
+                ws.send_json(_set(now + timedelta(minutes=2 * i), 135 + 10 * i))
+                acks.append(ws.receive_json())
+            assert [ack["persisted"] for ack in acks] == [0, 0, 3, 3]
+            assert _count(test_engine, SetDB) == 3
+
+            # Not listed while in progress
+            assert client.get("/sessions/", headers=auth_headers).status_code == 404
+
+            ws.send_json({"type": "end"})
+            finished = ws.receive_json()
+        assert finished["type"] == "finished"
+        assert finished["session_id"] == started["session_id"]
+        assert finished["personal_records"] == ["Bench Press"]
+
+        # Checked directly: the test client shares one ORM session between
+        # requests, and the socket's teardown closes it
+        with test_engine.connect() as conn:
+            [(in_progress, finished_at)] = conn.execute(select(SessionDB.in_progress, SessionDB.finished_at)).all()
+        assert not in_progress
+        assert _count(test_engine, SetDB) == 4
+        # Finishes with the last set
+        assert finished_at == now + timedelta(minutes=6, seconds=45)
+
+    def test_ending_a_workout_flushes_it(self, client, auth_headers, test_engine):
+        now = datetime.now()
+        with _connect(client, auth_headers) as ws:
+            ws.send_json({"type": "start", "started_at": now.isoformat()})
+            ws.receive_json()
+            ws.send_json({"type": "workout_start", "name": "Squat", "started_at": now.isoformat()})
+            ws.receive_json()
+            ws.send_json(_set(now))
+            assert ws.receive_json()["persisted"] == 0
+            ws.send_json({"type": "workout_end"})
+            assert ws.receive_json() == {"type": "workout_ended", "persisted": 1}
+            assert _count(test_engine, SetDB) == 1
+            ws.send_json({"type": "end"})
+            ws.receive_json()
+
+    def test_invalid_messages_keep_the_connection(self, client, auth_headers):
+        now = datetime.now()
+        with _connect(client, auth_headers) as ws:
+            ws.send_json({"type": "set", **_set(now)})
+            assert ws.receive_json() == {"type": "error", "detail": "Start a workout before sending sets"}
+            ws.send_text("not json")
+            assert ws.receive_json()["type"] == "error"
+            ws.send_json({"type": "start", "started_at": "yesterday"})
+            assert ws.receive_json()["type"] == "error"
+            ws.send_json({"type": "start", "started_at": now.isoformat()})
+            assert ws.receive_json()["type"] == "started"
+
+    def test_disconnect_keeps_what_was_sent(self, client, auth_headers, test_engine):
+        now = datetime.now()
+        with _connect(client, auth_headers) as ws:
+            ws.send_json({"type": "start", "started_at": now.isoformat()})
+            ws.receive_json()
+            ws.send_json({"type": "workout_start", "name": "Deadlift", "started_at": now.isoformat()})
+            ws.receive_json()
+            ws.send_json(_set(now, 225))
+            ws.receive_json()
+        with test_engine.connect() as conn:
+            assert conn.execute(select(SessionDB.in_progress)).scalar_one() is False
+            assert conn.execute(select(RepsDB.weight)).scalar_one() == 225
+
+    def test_session_without_sets_is_dropped(self, client, auth_headers, test_engine):
+        with _connect(client, auth_headers) as ws:
+            ws.send_json({"type": "start", "started_at": datetime.now().isoformat()})
+            ws.receive_json()
+            ws.send_json({"type": "end"})
+            assert ws.receive_json()["session_id"] is None
+        assert _count(test_engine, SessionDB) == 0
+
+    def test_idle_connection_holds_no_transaction(self, client, auth_headers, test_db):
+        with _connect(client, auth_headers) as ws:
+            assert not test_db.in_transaction()
+            ws.send_json({"type": "start", "started_at": datetime.now().isoformat()})
+            assert ws.receive_json()["type"] == "started"
+            assert not test_db.in_transaction()
+
+    def test_rejects_bad_token(self, client):
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect("/sessions/live?token=nope") as ws:
+                ws.receive_json()
+        assert exc.value.code == 1008
@@ -0,0 +1,48 @@
+import pytest
+from src import auth
+from src.metrics import registry
+
+TOKEN = {"Authorization": "Bearer scrape-token"}
+
+@pytest.fixture(autouse=True)
+def reset_metrics(monkeypatch):
+    registry.reset()
+    monkeypatch.setattr(auth, "METRICS_TOKEN", "scrape-token")
+    yield
+
+class TestMetricsAPI:
+    def test_metrics_records_routes(self, client):
+        client.get("/")
+        client.get("/")
+        client.get("/does-not-exist")
+        
+        response = client.get("/metrics", headers=TOKEN)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'http_requests_total{method="GET",route="/",status="200"} 2' in body
+        assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in body
+        assert 'http_request_duration_seconds_count{method="GET",route="/"} 2' in body
+        assert "http_requests_in_flight 1" in body  # the /metrics request itself
+        assert 'db_pool_capacity{database="primary"}' in body
+        assert 'db_pool_saturation{database="primary"}' in body
+    
+    def test_metrics_count_db_queries(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        body = client.get("/metrics", headers=TOKEN).text
+        
+        count_line = next(
+            line for line in body.splitlines()
+            if line.startswith('http_request_db_queries_sum{method="POST",route="/sessions/"}')
+        )
+        assert float(count_line.split()[-1]) > 0
+        assert 'http_request_db_queries_bucket{method="POST",route="/sessions/",le="+Inf"} 1' in body
+    
+    def test_metrics_require_the_token(self, client, auth_headers, monkeypatch):
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        # A user's token isn't a scrape token
+        assert client.get("/metrics", headers=auth_headers).status_code == 401
+        
+        monkeypatch.setattr(auth, "METRICS_TOKEN", "")
+        assert client.get("/metrics", headers=TOKEN).status_code == 404
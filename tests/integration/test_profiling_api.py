@@ -0,0 +1,96 @@
+import asyncio
+import pstats
+import pytest
+from src import auth, profiling
+
+PROFILE_TOKEN = "profile-secret"
+
+@pytest.fixture(autouse=True)
+def profiling_config(monkeypatch, tmp_path, sample_user_data):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", PROFILE_TOKEN)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(auth, "ADMIN_USERNAMES", frozenset({sample_user_data["username"]}))
+
+def profiled(headers):
+    return {**headers, "X-Profile": PROFILE_TOKEN}
+
+class TestRequestProfiling:
+    def test_requests_are_not_profiled_by_default(self, client, auth_headers):
+        response = client.get("/sessions/", headers=auth_headers)
+        assert "x-profile-id" not in response.headers
+        assert profiling.list_profiles() == []
+    
+    def test_wrong_token_is_ignored(self, client, auth_headers):
+        response = client.get("/sessions/", headers={**auth_headers, "X-Profile": "guess"})
+        assert "x-profile-id" not in response.headers
+    
+    def test_profile_covers_endpoint_and_response_validation(self, client, auth_headers, valid_session_data):
+        response = client.post("/sessions/", json=valid_session_data, headers=profiled(auth_headers))
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+        
+        functions = {name for _, _, name in pstats.Stats(profiling.profile_path(profile_id)).stats}
+        # Endpoint body and response validation both run in the threadpool
+        assert "create_session" in functions
+        assert "validate" in functions
+        
+        [info] = profiling.list_profiles()
+        assert info["id"] == profile_id
+        assert info["route"] == "/sessions/"
+        assert info["method"] == "POST"
+        assert info["status"] == 200
+        assert info["trigger"] == "header"
+    
+    def test_sampling(self, client, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+        response = client.get("/")
+        assert "x-profile-id" in response.headers
+        assert profiling.list_profiles()[0]["trigger"] == "sample"
+    
+    def test_rotation_keeps_newest(self, client, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE_KEEP", 2)
+        ids = [client.get("/", headers={"X-Profile": PROFILE_TOKEN}).headers["x-profile-id"] for _ in range(4)]
+        assert [info["id"] for info in profiling.list_profiles()] == ids[:1:-1]
+    
+    def test_profile_written_off_the_event_loop(self, client, monkeypatch):
+        save = profiling._save
+        loops = []
+        
+        def recording_save(profile, metadata):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            save(profile, metadata)
+        monkeypatch.setattr(profiling, "_save", recording_save)
+        client.get("/", headers={"X-Profile": PROFILE_TOKEN})
+        assert loops == [None]
+
+class TestProfilesAPI:
+    def test_requires_admin(self, client, auth_headers, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_USERNAMES", frozenset())
+        assert client.get("/admin/profiles", headers=auth_headers).status_code == 403
+    
+    def test_requires_authentication(self, client):
+        assert client.get("/admin/profiles").status_code in (401, 403)
+    
+    def test_list_and_fetch(self, client, auth_headers):
+        profile_id = client.get("/sessions/", headers=profiled(auth_headers)).headers["x-profile-id"]
+        
+        response = client.get("/admin/profiles", headers=auth_headers)
+        assert response.status_code == 200
+        assert [info["id"] for info in response.json()] == [profile_id]
+        
+        report = client.get(f"/admin/profiles/{profile_id}", params={"sort": "tottime", "limit": 1000}, headers=auth_headers)
+        assert report.status_code == 200
+        assert "function calls" in report.text
+        assert "get_my_sessions" in report.text
+        
+        raw = client.get(f"/admin/profiles/{profile_id}", params={"format": "pstats"}, headers=auth_headers)
+        assert raw.status_code == 200
+        assert raw.content == open(profiling.profile_path(profile_id), "rb").read()
+    
+    def test_unknown_or_malformed_id(self, client, auth_headers):
+        assert client.get("/admin/profiles/1700000000000-deadbeef", headers=auth_headers).status_code == 404
+        assert client.get("/admin/profiles/..%2F..%2Fetc", headers=auth_headers).status_code == 404
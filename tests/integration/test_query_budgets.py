@@ -0,0 +1,89 @@
+import pytest
+import copy
+from fastapi.testclient import TestClient
+from main import create_app
+from src.query_audit import QueryBudgetExceeded
+
+def _big_session(session_data, workouts=5, sets=8):
+    data = copy.deepcopy(session_data)
+    workout = data["workouts"][0]
+    workout["sets"] = [copy.deepcopy(workout["sets"][0]) for _ in range(sets)]
+    data["workouts"] = []
+    for i in range(workouts):
+        named = copy.deepcopy(workout)
+        named["name"] = f"Exercise {i}"
+        data["workouts"].append(named)
+    return data
+
+class TestQueryBudgets:
+    def test_create_session_within_budget_regardless_of_size(self, client, auth_headers, valid_session_data, query_audit):
+        response = client.post("/sessions/", json=_big_session(valid_session_data), headers=auth_headers)
+        assert response.status_code == 200
+        assert int(response.headers["X-Query-Count"]) <= int(response.headers["X-Query-Budget"])
+        query_audit.assert_clean()
+    
+    def test_session_lists_within_budget(self, client, auth_headers, valid_session_data, query_audit):
+        for _ in range(3):
+            client.post("/sessions/", json=_big_session(valid_session_data, workouts=2, sets=3), headers=auth_headers)
+        query_audit.clear()
+        
+        client.get("/sessions/", headers=auth_headers)
+        client.get("/sessions/1", headers=auth_headers)
+        client.get("/sessions/search?q=exercise", headers=auth_headers)
+        assert len(query_audit) == 3
+        query_audit.assert_clean()
+    
+    def test_edit_session_within_budget_regardless_of_size(self, client, auth_headers, valid_session_data, query_audit):
+        client.post("/sessions/", json=_big_session(valid_session_data), headers=auth_headers)
+        [session] = client.get("/sessions/", headers=auth_headers).json()
+        first, second = session["workouts"][:2]
+        query_audit.clear()
+        
+        response = client.patch(f"/sessions/{session['id']}", headers=auth_headers, json={
+            "version": session["version"],
+            "started_at": session["started_at"],
+            "update_workouts": [
+                {"id": first["id"], "name": "Renamed", "update_sets": [
+                    {"id": set_["id"], "reps": {**set_["reps"], "count": 3}} for set_ in first["sets"]
+                ]},
+                {"id": second["id"], "remove_sets": [set_["id"] for set_ in second["sets"][:4]],
+                 "add_sets": [{k: v for k, v in set_.items() if k != "id"} for set_ in second["sets"][:4]]}
+            ],
+            "remove_workouts": [session["workouts"][2]["id"]],
+            "add_workouts": [{**session["workouts"][3], "sets": [{k: v for k, v in set_.items() if k != "id"} for set_ in session["workouts"][3]["sets"]]}]
+        })
+        assert response.status_code == 200
+        query_audit.assert_clean()
+
+    def test_clone_and_single_session_within_budget(self, client, auth_headers, valid_session_data, query_audit):
+        client.post("/sessions/", json=_big_session(valid_session_data), headers=auth_headers)
+        [session] = client.get("/sessions/", headers=auth_headers).json()
+        user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+        query_audit.clear()
+
+        assert client.post(f"/sessions/{session['id']}/clone", json={}, headers=auth_headers).status_code == 201
+        assert client.get(f"/sessions/{user_id}/{session['id']}", headers=auth_headers).status_code == 200
+        assert len(query_audit) == 2
+        query_audit.assert_clean()
+
+    def test_lazy_loading_is_reported(self, client, auth_headers, valid_session_data, query_audit, test_db):
+        from src.db_models import SessionDB
+        for _ in range(3):
+            client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        query_audit.clear()
+        
+        # A handler that walks the relationships without eager loading, on an app of its own
+        app = create_app()
+        
+        @app.get("/_test/lazy")
+        def lazy_route():
+            return {"workouts": sum(len(s.workouts) for s in test_db.query(SessionDB).all())}
+        response = TestClient(app).get("/_test/lazy")
+        
+        assert response.headers["X-Query-Repeats"] == "1"
+        with pytest.raises(QueryBudgetExceeded, match="possible N\\+1"):
+            query_audit.assert_clean()
+    
+    def test_headers_absent_when_disabled(self, client):
+        response = client.get("/")
+        assert "X-Query-Count" not in response.headers
@@ -0,0 +1,13 @@
+from src.rate_limit import limiter
+
+class TestPerUserRateLimits:
+    def test_users_behind_one_address_have_separate_buckets(self, client, auth_headers, valid_session_data, monkeypatch):
+        monkeypatch.setattr(limiter, "enabled", True)
+        client.post("/users/", json={"username": "otheruser", "email": "other@example.com", "password": "password123"})
+        other_token = client.post("/users/login", json={"username": "otheruser", "password": "password123"}).json()["access_token"]
+        other_headers = {"Authorization": f"Bearer {other_token}"}
+        
+        statuses = [client.post("/sessions/", json=valid_session_data, headers=auth_headers).status_code for _ in range(11)]
+        assert statuses == [200] * 10 + [429]
+        
+        assert client.post("/sessions/", json=valid_session_data, headers=other_headers).status_code == 200
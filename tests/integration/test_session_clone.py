@@ -0,0 +1,108 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select
+from src.db_models import SessionDB, WorkoutDB, SetDB, RepsDB
+
+def _create(client, auth_headers, valid_session_data):
+    assert client.post("/sessions/", json=valid_session_data, headers=auth_headers).status_code == 200
+    [session] = client.get("/sessions/", headers=auth_headers).json()
+    return session
+
+def _count(test_engine, model):
+    with test_engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+def _shape(session):
+    """The session's tree without ids and times"""
+    return [
+        (workout["name"], [(s["reps"]["count"], s["reps"]["intensity"], s["reps"]["weight"]) for s in workout["sets"]])
+        for workout in session["workouts"]
+    ]
+
+class TestCloneSession:
+    def test_copies_the_tree_with_an_offset(self, client, auth_headers, valid_session_data, test_engine):
+        source = _create(client, auth_headers, valid_session_data)
+        response = client.post(f"/sessions/{source['id']}/clone", json={"offset_seconds": 3600}, headers=auth_headers)
+        assert response.status_code == 201
+        clone = response.json()
+        assert clone["id"] != source["id"] and clone["version"] == 1
+        assert clone["notes"] == source["notes"]
+        assert _shape(clone) == _shape(source)
+
+        def shifted(value):
+            return (datetime.fromisoformat(value) + timedelta(hours=1)).isoformat()
+        assert clone["started_at"] == shifted(source["started_at"])
+        assert clone["workouts"][0]["sets"][0]["finished_at"] == shifted(source["workouts"][0]["sets"][0]["finished_at"])
+        assert clone["workouts"][0]["id"] != source["workouts"][0]["id"]
+        for model in (SessionDB, WorkoutDB, SetDB, RepsDB):
+            assert _count(test_engine, model) == 2
+
+        [first, second] = client.get("/sessions/?depth=summary", headers=auth_headers).json()
+        assert {k: v for k, v in first.items() if k in ("set_count", "total_volume")} == \
+            {k: v for k, v in second.items() if k in ("set_count", "total_volume")}
+
+    def test_new_start_time_and_notes(self, client, auth_headers, valid_session_data):
+        source = _create(client, auth_headers, valid_session_data)
+        started_at = (datetime.fromisoformat(source["started_at"]) + timedelta(days=7)).replace(microsecond=0)
+        response = client.post(f"/sessions/{source['id']}/clone", headers=auth_headers, json={
+            "started_at": started_at.isoformat(),
+            "notes": "Week 2"
+        })
+        assert response.status_code == 201
+        clone = response.json()
+        assert clone["started_at"] == started_at.isoformat()
+        assert clone["notes"] == "Week 2"
+
+    def test_defaults_to_now(self, client, auth_headers, valid_session_data):
+        source = _create(client, auth_headers, valid_session_data)
+        before = datetime.utcnow()
+        clone = client.post(f"/sessions/{source['id']}/clone", json={}, headers=auth_headers).json()
+        assert abs(datetime.fromisoformat(clone["started_at"]) - before) < timedelta(seconds=5)
+
+    def test_constant_statements(self, client, auth_headers, valid_session_data, test_engine):
+        big = dict(valid_session_data)
+        started = datetime.fromisoformat(valid_session_data["started_at"].rstrip("Z"))
+        big["workouts"] = [
+            {
+                "name": f"Exercise {w}",
+                "started_at": started.isoformat(),
+                "finished_at": (started + timedelta(minutes=30)).isoformat(),
+                "sets": [{
+                    "started_at": started.isoformat(),
+                    "finished_at": (started + timedelta(minutes=1)).isoformat(),
+                    "reps": {"count": 5, "intensity": "high", "weight": 100 + s}
+                } for s in range(10)]
+            } for w in range(10)
+        ]
+        small = _create(client, auth_headers, valid_session_data)
+        assert client.post("/sessions/", json=big, headers=auth_headers).status_code == 200
+        big_id = max(s["id"] for s in client.get("/sessions/?fields=id", headers=auth_headers).json())
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(test_engine, "before_cursor_execute", listener)
+        try:
+            for session_id in (small["id"], big_id):
+                statements.clear()
+                assert client.post(f"/sessions/{session_id}/clone", json={}, headers=auth_headers).status_code == 201
+                if session_id == small["id"]:
+                    small_statements = len(statements)
+        finally:
+            event.remove(test_engine, "before_cursor_execute", listener)
+        assert len(statements) == small_statements
+        assert _count(test_engine, SetDB) == 2 * (1 + 100)
+
+    def test_not_found_and_other_users(self, client, auth_headers, valid_session_data):
+        source = _create(client, auth_headers, valid_session_data)
+        assert client.post("/sessions/999999/clone", json={}, headers=auth_headers).status_code == 404
+        client.post("/users/", json={"username": "other", "email": "other@example.com", "password": "password123"})
+        token = client.post("/users/login", json={"username": "other", "password": "password123"}).json()["access_token"]
+        response = client.post(f"/sessions/{source['id']}/clone", json={}, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 404
+
+    def test_invalid_timing(self, client, auth_headers, valid_session_data):
+        source = _create(client, auth_headers, valid_session_data)
+        both = {"started_at": source["started_at"], "offset_seconds": 60}
+        assert client.post(f"/sessions/{source['id']}/clone", json=both, headers=auth_headers).status_code == 422
+        too_late = {"offset_seconds": 2 * 366 * 86400}
+        assert client.post(f"/sessions/{source['id']}/clone", json=too_late, headers=auth_headers).status_code == 400
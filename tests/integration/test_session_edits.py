@@ -0,0 +1,127 @@
+import pytest
+from datetime import datetime, timedelta
+from src.routes.stats import calendar_cache
+
+def _create(client, auth_headers, valid_session_data):
+    assert client.post("/sessions/", json=valid_session_data, headers=auth_headers).status_code == 200
+    [session] = client.get("/sessions/", headers=auth_headers).json()
+    return session
+
+def _set(started: datetime, count: int = 5, weight: int = 185) -> dict:
+    return {
+        "started_at": started.isoformat(),
+        "finished_at": (started + timedelta(minutes=2)).isoformat(),
+        "reps": {"count": count, "intensity": "high", "weight": weight}
+    }
+
+class TestSessionEdits:
+    def test_listed_sessions_carry_ids_and_version(self, client, auth_headers, valid_session_data):
+        session = _create(client, auth_headers, valid_session_data)
+        assert session["version"] == 1
+        assert isinstance(session["workouts"][0]["id"], int)
+        assert isinstance(session["workouts"][0]["sets"][0]["id"], int)
+
+    def test_update_add_and_remove(self, client, auth_headers, valid_session_data):
+        session = _create(client, auth_headers, valid_session_data)
+        workout = session["workouts"][0]
+        started = datetime.fromisoformat(workout["started_at"])
+        response = client.patch(f"/sessions/{session['id']}", headers=auth_headers, json={
+            "version": 1,
+            "notes": "edited",
+            "update_workouts": [{
+                "id": workout["id"],
+                "update_sets": [{"id": workout["sets"][0]["id"], "reps": {"count": 12, "intensity": "high", "weight": 135}}],
+                "add_sets": [_set(started + timedelta(minutes=10))]
+            }],
+            "add_workouts": [{
+                "name": "Squat",
+                "started_at": (started + timedelta(minutes=30)).isoformat(),
+                "finished_at": (started + timedelta(minutes=40)).isoformat(),
+                "sets": [_set(started + timedelta(minutes=31), weight=225)]
+            }]
+        })
+        assert response.status_code == 200
+        edited = response.json()
+        assert edited["version"] == 2 and edited["notes"] == "edited"
+        bench = next(w for w in edited["workouts"] if w["id"] == workout["id"])
+        # The untouched set keeps its id
+        assert workout["sets"][0]["id"] in [s["id"] for s in bench["sets"]]
+        assert sorted(s["reps"]["count"] for s in bench["sets"]) == [5, 12]
+        assert {w["name"] for w in edited["workouts"]} == {"Bench Press", "Squat"}
+
+        squat = next(w for w in edited["workouts"] if w["name"] == "Squat")
+        response = client.patch(f"/sessions/{session['id']}", headers=auth_headers, json={
+            "version": 2,
+            "remove_workouts": [squat["id"]],
+            "update_workouts": [{"id": workout["id"], "remove_sets": [workout["sets"][0]["id"]]}]
+        })
+        assert response.status_code == 200
+        [bench] = response.json()["workouts"]
+        assert [s["reps"]["weight"] for s in bench["sets"]] == [185]
+
+    def test_stale_version_conflicts(self, client, auth_headers, valid_session_data):
+        session = _create(client, auth_headers, valid_session_data)
+        url = f"/sessions/{session['id']}"
+        assert client.patch(url, headers=auth_headers, json={"version": 1, "notes": "first"}).status_code == 200
+        response = client.patch(url, headers=auth_headers, json={"version": 1, "notes": "second"})
+        assert response.status_code == 409
+        assert client.get("/sessions/", headers=auth_headers).json()[0]["notes"] == "first"
+
+    def test_invalid_edit_writes_nothing(self, client, auth_headers, valid_session_data):
+        session = _create(client, auth_headers, valid_session_data)
+        workout = session["workouts"][0]
+        # Removing the only set would leave an empty workout
+        response = client.patch(f"/sessions/{session['id']}", headers=auth_headers, json={
+            "version": 1,
+            "notes": "not saved",
+            "update_workouts": [{"id": workout["id"], "remove_sets": [workout["sets"][0]["id"]]}]
+        })
+        assert response.status_code == 400
+        [stored] = client.get("/sessions/", headers=auth_headers).json()
+        assert stored["version"] == 1 and stored["notes"] == "Test session"
+
+    @pytest.mark.parametrize("body", [
+        {"update_workouts": [{"id": 999999}]},
+        {"remove_workouts": [999999]},
+    ])
+    def test_unknown_ids(self, client, auth_headers, valid_session_data, body):
+        session = _create(client, auth_headers, valid_session_data)
+        assert client.patch(f"/sessions/{session['id']}", headers=auth_headers, json={"version": 1, **body}).status_code == 404
+
+    def test_cannot_edit_another_users_session(self, client, auth_headers, valid_session_data):
+        session = _create(client, auth_headers, valid_session_data)
+        client.post("/users/", json={"username": "other", "email": "other@example.com", "password": "password123"})
+        token = client.post("/users/login", json={"username": "other", "password": "password123"}).json()["access_token"]
+        response = client.patch(f"/sessions/{session['id']}", headers={"Authorization": f"Bearer {token}"}, json={"version": 1, "notes": "x"})
+        assert response.status_code == 404
+
+    def test_personal_records_recomputed(self, client, auth_headers, valid_session_data):
+        session = _create(client, auth_headers, valid_session_data)
+        workout = session["workouts"][0]
+        response = client.patch(f"/sessions/{session['id']}", headers=auth_headers, json={
+            "version": 1,
+            "update_workouts": [{"id": workout["id"], "update_sets": [{"id": workout["sets"][0]["id"], "reps": {"count": 10, "intensity": "medium", "weight": 95}}]}]
+        })
+        assert response.status_code == 200
+        [record] = client.get("/stats/prs", headers=auth_headers).json()
+        # Lowered, which folding alone would never do
+        assert record["heaviest_weight"] == 95
+
+    def test_only_touched_calendar_years_invalidated(self, client, auth_headers, valid_session_data):
+        session = _create(client, auth_headers, valid_session_data)
+        year = datetime.fromisoformat(session["started_at"]).year
+        client.get(f"/stats/calendar?year={year}", headers=auth_headers)
+        client.get("/stats/calendar?year=2001", headers=auth_headers)
+
+        client.patch(f"/sessions/{session['id']}", headers=auth_headers, json={"version": 1, "notes": "edited"})
+        cached = [key for entries in calendar_cache._entries.values() for key in entries]
+        assert cached == [2001]
+
+    def test_browser_preflight_allows_patch(self, client):
+        response = client.options("/sessions/1", headers={
+            "Origin": "http://localhost:3000",
+            "Access-Control-Request-Method": "PATCH",
+            "Access-Control-Request-Headers": "authorization,content-type",
+        })
+        assert response.status_code == 200
+        assert "PATCH" in response.headers["access-control-allow-methods"]
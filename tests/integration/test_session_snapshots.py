@@ -0,0 +1,142 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from src.db_models import User
+from src.processor import import_file
+from src.snapshots import check_snapshots
+from tests.fixtures.test_data import export_record
+
+def _check(test_engine, **kwargs):
+    with Session(test_engine) as db:
+        return check_snapshots(db, **kwargs)
+
+def _assert_consistent(test_engine):
+    stats = _check(test_engine)
+    assert stats["checked"] > 0
+    assert (stats["missing"], stats["stale"]) == ([], [])
+
+def _create(client, auth_headers, valid_session_data):
+    assert client.post("/sessions/", json=valid_session_data, headers=auth_headers).status_code == 200
+    [session] = client.get("/sessions/", headers=auth_headers).json()
+    return session
+
+class TestReads:
+    def test_create_writes_the_snapshot(self, client, auth_headers, valid_session_data, test_engine):
+        session = _create(client, auth_headers, valid_session_data)
+        with test_engine.connect() as conn:
+            stored = conn.execute(text("SELECT snapshot FROM sessions")).scalar()
+        assert stored == session
+        assert session["version"] == 1 and session["notes"] == "Test session"
+        assert session["workouts"][0]["sets"][0]["reps"]["weight"] == 135
+        _assert_consistent(test_engine)
+
+    def test_single_session(self, client, auth_headers, valid_session_data):
+        session = _create(client, auth_headers, valid_session_data)
+        user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+        response = client.get(f"/sessions/{user_id}/{session['id']}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == session
+        assert client.get(f"/sessions/{user_id}/999999", headers=auth_headers).status_code == 404
+        assert client.get(f"/sessions/{user_id + 1}/{session['id']}", headers=auth_headers).status_code == 403
+
+    def test_lists_are_read_from_snapshots(self, client, auth_headers, valid_session_data, test_engine):
+        _create(client, auth_headers, valid_session_data)
+        with test_engine.begin() as conn:
+            conn.execute(text("UPDATE sessions SET snapshot = jsonb_set(snapshot, '{notes}', '\"from the snapshot\"')"))
+        [session] = client.get("/sessions/", headers=auth_headers).json()
+        assert session["notes"] == "from the snapshot"
+
+    def test_sessions_without_a_snapshot_are_built_from_rows(self, client, auth_headers, valid_session_data, test_engine):
+        session = _create(client, auth_headers, valid_session_data)
+        with test_engine.begin() as conn:
+            conn.execute(text("UPDATE sessions SET snapshot = NULL"))
+        assert client.get("/sessions/", headers=auth_headers).json() == [session]
+
+class TestChecker:
+    def test_reports_and_repairs(self, client, auth_headers, valid_session_data, test_engine):
+        first = _create(client, auth_headers, valid_session_data)
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        with test_engine.begin() as conn:
+            conn.execute(text("UPDATE sessions SET snapshot = NULL WHERE id = :id"), {"id": first["id"]})
+            # A write that went around the snapshot
+            conn.execute(text("UPDATE reps SET count = 1 WHERE set_id IN "
+                              "(SELECT sets.id FROM sets JOIN workouts ON workouts.id = sets.workout_id WHERE session_id <> :id)"),
+                         {"id": first["id"]})
+
+        stats = _check(test_engine)
+        assert stats["checked"] == 2 and len(stats["missing"]) == 1 and len(stats["stale"]) == 1
+        assert stats["repaired"] == 0
+
+        assert _check(test_engine, repair=True, batch_size=1)["repaired"] == 2
+        _assert_consistent(test_engine)
+        counts = sorted(s["workouts"][0]["sets"][0]["reps"]["count"] for s in client.get("/sessions/", headers=auth_headers).json())
+        assert counts == [1, 10]
+
+    def test_one_user(self, client, auth_headers, valid_session_data, test_engine):
+        _create(client, auth_headers, valid_session_data)
+        user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+        assert _check(test_engine, user_id=user_id)["checked"] == 1
+        assert _check(test_engine, user_id=user_id + 1)["checked"] == 0
+
+class TestWritesKeepSnapshotsCurrent:
+    def test_patch(self, client, auth_headers, valid_session_data, test_engine):
+        session = _create(client, auth_headers, valid_session_data)
+        workout = session["workouts"][0]
+        started = datetime.fromisoformat(workout["started_at"])
+        response = client.patch(f"/sessions/{session['id']}", headers=auth_headers, json={
+            "version": 1,
+            "notes": "Edited",
+            "update_workouts": [{
+                "id": workout["id"],
+                "add_sets": [{
+                    "started_at": (started + timedelta(minutes=10)).isoformat(),
+                    "finished_at": (started + timedelta(minutes=12)).isoformat(),
+                    "reps": {"count": 5, "intensity": "high", "weight": 200}
+                }]
+            }]
+        })
+        assert response.status_code == 200
+        edited = response.json()
+        assert edited["version"] == 2 and edited["notes"] == "Edited"
+        assert len(edited["workouts"][0]["sets"]) == 2
+        assert client.get("/sessions/", headers=auth_headers).json() == [edited]
+        _assert_consistent(test_engine)
+
+    def test_clone(self, client, auth_headers, valid_session_data, test_engine):
+        session = _create(client, auth_headers, valid_session_data)
+        clone = client.post(f"/sessions/{session['id']}/clone", json={"offset_seconds": 60}, headers=auth_headers).json()
+        assert clone in client.get("/sessions/", headers=auth_headers).json()
+        _assert_consistent(test_engine)
+
+    def test_live(self, client, auth_headers, test_engine):
+        now = datetime.now()
+        token = auth_headers["Authorization"].split()[1]
+        with client.websocket_connect(f"/sessions/live?token={token}") as ws:
+            ws.send_json({"type": "start", "started_at": now.isoformat()})
+            ws.receive_json()
+            ws.send_json({"type": "workout_start", "name": "Squat", "started_at": now.isoformat()})
+            ws.receive_json()
+            ws.send_json({
+                "type": "set",
+                "started_at": now.isoformat(),
+                "finished_at": (now + timedelta(seconds=40)).isoformat(),
+                "reps": {"count": 5, "intensity": "high", "weight": 100}
+            })
+            ws.receive_json()
+            ws.send_json({"type": "end", "notes": "Live"})
+            ws.receive_json()
+        _assert_consistent(test_engine)
+        [session] = client.get("/sessions/", headers=auth_headers).json()
+        assert session["notes"] == "Live" and session["workouts"][0]["name"] == "Squat"
+
+    @pytest.mark.parametrize("method", ["copy", "insert"])
+    def test_import(self, test_engine, test_db, tmp_path, method):
+        user = User(username="importer", email="importer@example.com", password_hash="x")
+        test_db.add(user)
+        test_db.commit()
+        path = tmp_path / "export.jsonl"
+        path.write_text("\n".join(json.dumps(export_record(day, weight=100 + day, user_id=user.id)) for day in range(3)))
+        import_file(test_engine, str(path), method=method, restart=True)
+        _assert_consistent(test_engine)
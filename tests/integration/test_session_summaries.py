@@ -0,0 +1,128 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event, text
+from src.db_models import User
+from src.processor import import_file
+from tests.fixtures.test_data import export_record
+
+# What the summary columns should hold, recomputed from the tree
+ACTUAL = """
+    SELECT w.session_id, count(DISTINCT w.id) AS workouts, count(st.id) AS sets,
+           coalesce(sum(r.count * coalesce(r.weight, 0)), 0) AS volume
+    FROM workouts w LEFT JOIN sets st ON st.workout_id = w.id LEFT JOIN reps r ON r.set_id = st.id
+    GROUP BY w.session_id
+"""
+
+def _mismatches(test_engine):
+    with test_engine.connect() as conn:
+        return conn.execute(text(
+            f"SELECT sessions.id FROM sessions LEFT JOIN ({ACTUAL}) s ON s.session_id = sessions.id "
+            "WHERE (workout_count, set_count, total_volume) IS DISTINCT FROM "
+            "(coalesce(s.workouts, 0), coalesce(s.sets, 0), coalesce(s.volume, 0))"
+        )).scalars().all()
+
+def _summaries(client, auth_headers, query="depth=summary"):
+    response = client.get(f"/sessions/?{query}", headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()
+
+class TestSummaryListing:
+    def test_summary_columns(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        [summary] = _summaries(client, auth_headers)
+        assert "workouts" not in summary
+        assert summary["workout_count"] == 1 and summary["set_count"] == 1
+        assert summary["total_volume"] == 10 * 135
+        assert summary["duration_seconds"] == 3600
+        assert summary["version"] == 1 and summary["notes"] == "Test session"
+
+    def test_sparse_fields(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        [summary] = _summaries(client, auth_headers, "fields=started_at,set_count,duration_seconds")
+        assert set(summary) == {"started_at", "set_count", "duration_seconds"}
+        user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+        response = client.get(f"/sessions/{user_id}?fields=total_volume", headers=auth_headers)
+        assert response.json() == [{"total_volume": 1350}]
+
+    def test_unknown_field(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        response = client.get("/sessions/?fields=id,workouts", headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_reads_only_the_sessions_table(self, client, auth_headers, valid_session_data, test_engine):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(test_engine, "before_cursor_execute", listener)
+        try:
+            _summaries(client, auth_headers)
+        finally:
+            event.remove(test_engine, "before_cursor_execute", listener)
+        [listing] = [statement for statement in statements if "FROM sessions" in statement]
+        assert "workouts" not in listing and "sets" not in listing
+
+class TestSummariesStayCurrent:
+    def test_create(self, client, auth_headers, valid_session_data, test_engine):
+        bodyweight = json.loads(json.dumps(valid_session_data))
+        bodyweight["workouts"][0]["sets"][0]["reps"]["weight"] = None
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        client.post("/sessions/", json=bodyweight, headers=auth_headers)
+        assert sorted(s["total_volume"] for s in _summaries(client, auth_headers)) == [0, 1350]
+        assert _mismatches(test_engine) == []
+
+    def test_patch(self, client, auth_headers, valid_session_data, test_engine):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        [session] = client.get("/sessions/", headers=auth_headers).json()
+        workout = session["workouts"][0]
+        started = datetime.fromisoformat(workout["started_at"])
+        response = client.patch(f"/sessions/{session['id']}", headers=auth_headers, json={
+            "version": 1,
+            "update_workouts": [{
+                "id": workout["id"],
+                "add_sets": [{
+                    "started_at": (started + timedelta(minutes=10)).isoformat(),
+                    "finished_at": (started + timedelta(minutes=12)).isoformat(),
+                    "reps": {"count": 5, "intensity": "high", "weight": 200}
+                }]
+            }]
+        })
+        assert response.status_code == 200
+        [summary] = _summaries(client, auth_headers)
+        assert (summary["set_count"], summary["total_volume"]) == (2, 1350 + 1000)
+        assert _mismatches(test_engine) == []
+
+    def test_live(self, client, auth_headers, test_engine):
+        now = datetime.now()
+        token = auth_headers["Authorization"].split()[1]
+        with client.websocket_connect(f"/sessions/live?token={token}") as ws:
+            ws.send_json({"type": "start", "started_at": now.isoformat()})
+            ws.receive_json()
+            for name in ("Squat", "Row"):
+                ws.send_json({"type": "workout_start", "name": name, "started_at": now.isoformat()})
+                ws.receive_json()
+                for weight in (100, 120):
+                    ws.send_json({
+                        "type": "set",
+                        "started_at": now.isoformat(),
+                        "finished_at": (now + timedelta(seconds=40)).isoformat(),
+                        "reps": {"count": 5, "intensity": "high", "weight": weight}
+                    })
+                    ws.receive_json()
+            ws.send_json({"type": "end"})
+            ws.receive_json()
+        with test_engine.connect() as conn:
+            assert conn.execute(text("SELECT workout_count, set_count, total_volume FROM sessions")).one() == (2, 4, 2200)
+        assert _mismatches(test_engine) == []
+
+    def test_import(self, test_engine, test_db, tmp_path):
+        user = User(username="importer", email="importer@example.com", password_hash="x")
+        test_db.add(user)
+        test_db.commit()
+        path = tmp_path / "export.jsonl"
+        path.write_text("\n".join(json.dumps(export_record(day, weight=100 + day, user_id=user.id)) for day in range(3)))
+        for method in ("copy", "insert"):
+            import_file(test_engine, str(path), method=method, restart=True)
+        with test_engine.connect() as conn:
+            assert sorted(conn.execute(text("SELECT total_volume FROM sessions")).scalars()) == [500, 500, 505, 505, 510, 510]
+        assert _mismatches(test_engine) == []
@@ -1,4 +1,10 @@
 import pytest
+import copy
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from src.models import Session
+from src.processor import validate_records
+
 
 class TestSessionsAPI:
     def test_create_valid_session(self, client, auth_headers, valid_session_data):
@@ -9,6 +15,22 @@ class TestSessionsAPI:
         assert data["notes"] == "Test session"
         assert len(data["workouts"]) == 1
     
+    def test_offsets_stored_like_imports(self, client, auth_headers, valid_session_data, test_db):
+        """A +02:00 session lands on the same UTC instant through the API and the importer"""
+        session = copy.deepcopy(valid_session_data)
+        for item in [session, *session["workouts"], *session["workouts"][0]["sets"]]:
+            for key in ("started_at", "finished_at"):
+                item[key] = item[key].replace("Z", "+02:00")
+        response = client.post("/sessions/", json=session, headers=auth_headers)
+        assert response.status_code == 200
+        
+        stored = test_db.execute(text("SELECT started_at FROM sessions")).scalar_one()
+        [(_, (imported, *_), _)] = validate_records([{"session": session}])
+        # What the route hands the database, whatever time zone the server runs in
+        assert Session(**session).started_at == imported
+        assert stored == imported
+        assert stored == datetime.fromisoformat(valid_session_data["started_at"][:-1]) - timedelta(hours=2)
+    
     def test_unauthorized_session_creation(self, client, valid_session_data):
         """Test that unauthorized requests are rejected"""
         response = client.post("/sessions/", json=valid_session_data)
@@ -25,4 +47,92 @@ class TestSessionsAPI:
         """Test that excessive rep count is rejected"""
         valid_session_data["workouts"][0]["sets"][0]["reps"]["count"] = 2000
         response = client.post("/sessions/", json=valid_session_data, headers=auth_headers)
-        assert response.status_code in [400, 422]
\ No newline at end of file
+        assert response.status_code in [400, 422]
+
+
+class TestSessionSearchAPI:
+    def _create(self, client, auth_headers, session_data, notes, workout_name):
+        data = copy.deepcopy(session_data)
+        data["notes"] = notes
+        data["workouts"][0]["name"] = workout_name
+        response = client.post("/sessions/", json=data, headers=auth_headers)
+        assert response.status_code == 200
+    
+    def test_search_notes_and_workout_names(self, client, auth_headers, valid_session_data):
+        self._create(client, auth_headers, valid_session_data, "felt strong on the bench", "Bench Press")
+        self._create(client, auth_headers, valid_session_data, "easy recovery day", "Squats")
+        self._create(client, auth_headers, valid_session_data, "legs were tired", "Deadlift")
+        
+        response = client.get("/sessions/search?q=squat", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 1
+        assert data["sessions"][0]["notes"] == "easy recovery day"
+        
+        data = client.get("/sessions/search?q=tired", headers=auth_headers).json()
+        assert [s["notes"] for s in data["sessions"]] == ["legs were tired"]
+    
+    def test_search_prefix_and_pagination(self, client, auth_headers, valid_session_data):
+        for i in range(3):
+            self._create(client, auth_headers, valid_session_data, f"deadlift day {i}", "Deadlift")
+        
+        data = client.get("/sessions/search?q=dead&page=2&page_size=2", headers=auth_headers).json()
+        assert data["total"] == 3
+        assert len(data["sessions"]) == 1
+    
+    def test_search_ignores_query_syntax(self, client, auth_headers, valid_session_data):
+        self._create(client, auth_headers, valid_session_data, "bench day", "Bench Press")
+        response = client.get("/sessions/search?q=%27%26%21%7C", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["total"] == 0
+
+    def test_search_non_ascii_words(self, client, auth_headers, valid_session_data):
+        self._create(client, auth_headers, valid_session_data, "Übung: Bankdrücken", "Bench Press")
+        self._create(client, auth_headers, valid_session_data, "bench day", "Bench Press")
+
+        for q in ("Übung", "Bankdrü"):
+            data = client.get("/sessions/search", params={"q": q}, headers=auth_headers).json()
+            assert [s["notes"] for s in data["sessions"]] == ["Übung: Bankdrücken"]
+
+    def test_search_old_sessions_as_listed(self, client, auth_headers, valid_session_data, test_engine):
+        self._create(client, auth_headers, valid_session_data, "Tom's PR & more", "Bench Press")
+        with test_engine.begin() as conn:
+            # History from before the API's one-year window, e.g. imported
+            for table in ("sessions", "workouts", "sets"):
+                conn.execute(text(f"UPDATE {table} SET started_at = started_at - interval '2 years', "
+                                  "finished_at = finished_at - interval '2 years'"))
+            conn.execute(text("UPDATE sessions SET snapshot = NULL"))
+        listed = client.get("/sessions/", headers=auth_headers).json()
+        
+        response = client.get("/sessions/search", params={"q": "Tom"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["sessions"] == listed
+
+
+class TestSessionListAPI:
+    def test_list_my_sessions(self, client, auth_headers, valid_session_data):
+        for _ in range(2):
+            client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        
+        response = client.get("/sessions/", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 2
+        assert data[0]["workouts"][0]["sets"][0]["reps"]["weight"] == 135
+    
+    def test_list_my_sessions_empty(self, client, auth_headers):
+        response = client.get("/sessions/", headers=auth_headers)
+        assert response.status_code == 404
+    
+    def test_list_sessions_by_own_user_id(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+        
+        response = client.get(f"/sessions/{user_id}", headers=auth_headers)
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+    
+    def test_list_sessions_of_another_user_forbidden(self, client, auth_headers):
+        user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+        response = client.get(f"/sessions/{user_id + 1}", headers=auth_headers)
+        assert response.status_code == 403
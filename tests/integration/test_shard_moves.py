@@ -0,0 +1,77 @@
+import threading
+import time
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from main import create_app
+from src.database import sharding
+from src.database.database import ShardedSession, ShardMoving
+from src.database.sharding import move_user, prepare_shards
+from src.db_models import User, SessionDB
+from tests.unit.test_sharding import _count, _create_user, _add_session
+
+SCHEMAS = ("shard_directory", "shard_0", "shard_1")
+
+@pytest.fixture
+def databases(test_engine):
+    """A directory and two Postgres shards, as schemas of the test database"""
+    with test_engine.begin() as conn:
+        for schema in SCHEMAS:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engines = [create_engine(test_engine.url, connect_args={"options": f"-csearch_path={schema}"}) for schema in SCHEMAS]
+    directory, shards = engines[0], engines[1:]
+    prepare_shards([directory])
+    prepare_shards(shards)
+    yield directory, shards
+    for engine in engines:
+        engine.dispose()
+    with test_engine.begin() as conn:
+        for schema in SCHEMAS:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+def test_write_during_a_move_is_refused_not_lost(databases, monkeypatch):
+    directory, shards = databases
+    user_id, source = _create_user(directory, shards, "alice")
+    _add_session(directory, shards, user_id)
+    target = 1 - source
+
+    # A request routed to the source before the move started
+    db = sessionmaker(class_=ShardedSession)(bind=directory, directory=directory, shards=shards)
+    db.route_to(db.get(User, user_id))
+    db.commit()
+
+    copied = threading.Event()
+    user_rows = sharding.user_rows
+
+    def user_rows_then_wait(user_id):
+        yield from user_rows(user_id)
+        copied.set()
+        # The request writes now, before the source rows are deleted
+        time.sleep(0.5)
+    monkeypatch.setattr(sharding, "user_rows", user_rows_then_wait)
+    mover = threading.Thread(target=move_user, args=(directory, shards, user_id, target))
+    mover.start()
+    assert copied.wait(5)
+
+    now = datetime.now()
+    db.add(SessionDB(user_id=user_id, started_at=now, finished_at=now))
+    with pytest.raises(ShardMoving):
+        db.commit()
+    db.close()
+    mover.join()
+
+    assert _count(shards[target], SessionDB, user_id) == 1
+    assert _count(shards[source], SessionDB) == 0
+
+def test_refused_writes_are_503():
+    app = create_app()
+
+    @app.post("/_test/write")
+    def write():
+        raise ShardMoving("moving")
+    response = TestClient(app).post("/_test/write")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
@@ -0,0 +1,141 @@
+import pytest
+import copy
+import threading
+from datetime import datetime
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from src.db_models import User, PersonalRecordDB
+from src.records import apply_session_bests, session_bests
+from tests.unit.test_records import _session
+
+class TestPersonalRecordsAPI:
+    def test_prs_empty_for_new_user(self, client, auth_headers):
+        response = client.get("/stats/prs", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == []
+    
+    def test_prs_updated_on_session_create(self, client, auth_headers, valid_session_data):
+        response = client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["X-Personal-Records"] == "Bench Press"
+        
+        records = client.get("/stats/prs", headers=auth_headers).json()
+        assert len(records) == 1
+        assert records[0]["exercise"] == "Bench Press"
+        assert records[0]["heaviest_weight"] == 135
+        assert records[0]["best_session_volume"] == 1350
+    
+    def test_prs_only_improve(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        
+        lighter = copy.deepcopy(valid_session_data)
+        lighter["workouts"][0]["sets"][0]["reps"]["weight"] = 95
+        response = client.post("/sessions/", json=lighter, headers=auth_headers)
+        assert response.status_code == 200
+        assert "X-Personal-Records" not in response.headers
+        
+        heavier = copy.deepcopy(valid_session_data)
+        heavier["workouts"][0]["sets"][0]["reps"]["weight"] = 155
+        response = client.post("/sessions/", json=heavier, headers=auth_headers)
+        assert response.headers["X-Personal-Records"] == "Bench Press"
+        
+        record = client.get("/stats/prs", headers=auth_headers).json()[0]
+        assert record["heaviest_weight"] == 155
+        assert record["best_session_volume"] == 1550
+    
+    def test_concurrent_first_records(self, test_engine, test_db):
+        user = User(username="racer", email="racer@example.com", password_hash="x")
+        test_db.add(user)
+        test_db.commit()
+        user_id = user.id
+        started_at = datetime(2025, 5, 23, 9, 0)
+
+        first = Session(test_engine)
+        apply_session_bests(first, user_id, [(started_at, session_bests(_session(("Squat", [(5, 225)]))))])
+        first.flush()
+        errors = []
+
+        def second_write():
+            # Blocks on the first transaction's uncommitted record row
+            with Session(test_engine) as second:
+                try:
+                    apply_session_bests(second, user_id, [(started_at, session_bests(_session(("Squat", [(5, 245)]))))])
+                    second.commit()
+                except Exception as e:
+                    errors.append(e)
+
+        thread = threading.Thread(target=second_write)
+        thread.start()
+        thread.join(0.5)
+        assert thread.is_alive()
+        first.commit()
+        first.close()
+        thread.join(5)
+
+        assert errors == []
+        [record] = test_db.execute(select(PersonalRecordDB).where(PersonalRecordDB.user_id == user_id)).scalars().all()
+        assert (record.heaviest_weight, record.best_session_volume) == (245, 5 * 245)
+
+    def test_prs_require_auth(self, client):
+        response = client.get("/stats/prs")
+        assert response.status_code in [401, 403]
+
+class TestTrainingLoadAPI:
+    def test_training_load_after_session(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        
+        response = client.get("/stats/training-load?days=28", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["days"]) == len(data["daily_volume"]) == len(data["acwr"])
+        assert sum(data["daily_volume"]) == 1350
+        assert sum(data["weekly_volume"]["medium"]) == 1350
+    
+    def test_cache_dropped_on_new_session(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        first = client.get("/stats/training-load", headers=auth_headers).json()
+        
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        second = client.get("/stats/training-load", headers=auth_headers).json()
+        assert sum(second["daily_volume"]) == 2 * sum(first["daily_volume"])
+
+    def test_sessions_in_progress_are_left_out(self, client, auth_headers, valid_session_data, test_engine):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        with test_engine.begin() as conn:
+            conn.execute(text("UPDATE sessions SET in_progress = true WHERE id = (SELECT max(id) FROM sessions)"))
+        data = client.get("/stats/training-load?days=28", headers=auth_headers).json()
+        assert sum(data["daily_volume"]) == 1350
+
+class TestCalendarAPI:
+    def test_calendar_counts_sessions_per_day(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        
+        started = datetime.fromisoformat(valid_session_data["started_at"].rstrip("Z"))
+        response = client.get(f"/stats/calendar?year={started.year}", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["counts"]) == len(data["volume"]) == 366
+        slot = started.timetuple().tm_yday - 1
+        assert data["counts"][slot] == 2
+        assert data["volume"][slot] == 2700
+        assert sum(data["counts"]) == 2
+    
+    def test_calendar_leaves_out_sessions_in_progress(self, client, auth_headers, valid_session_data, test_engine):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        # A live session whose first sets have been written
+        with test_engine.begin() as conn:
+            conn.execute(text("UPDATE sessions SET in_progress = true WHERE id = 2"))
+        
+        started = datetime.fromisoformat(valid_session_data["started_at"].rstrip("Z"))
+        data = client.get(f"/stats/calendar?year={started.year}", headers=auth_headers).json()
+        assert sum(data["counts"]) == 1
+        assert sum(data["volume"]) == 1350
+    
+    def test_calendar_empty_year(self, client, auth_headers, valid_session_data):
+        client.post("/sessions/", json=valid_session_data, headers=auth_headers)
+        response = client.get("/stats/calendar?year=2001", headers=auth_headers)
+        assert response.status_code == 200
+        assert sum(response.json()["counts"]) == 0
@@ -0,0 +1,82 @@
+import pytest
+import fakeredis
+from src import cache
+from src.cache import UserCache, LocalGenerations, SharedGenerations, invalidate_user
+
+@pytest.fixture
+def shared():
+    """A generation store shared through Redis, and a second process's view of it"""
+    server = fakeredis.FakeServer()
+    cache.use_generations(SharedGenerations(client=fakeredis.FakeRedis(server=server)))
+    yield SharedGenerations(client=fakeredis.FakeRedis(server=server))
+    cache.use_generations(LocalGenerations())
+
+class TestUserCache:
+    def test_hit_until_the_user_writes(self):
+        values = UserCache("test_values")
+        assert values.get_or_compute(1, lambda: "first") == "first"
+        assert values.get_or_compute(1, lambda: "second") == "first"
+        invalidate_user(1)
+        assert values.get_or_compute(1, lambda: "third") == "third"
+
+    def test_entries_expire(self, monkeypatch):
+        values = UserCache("test_ttl", ttl=60)
+        now = [1000.0]
+        monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+        values.set(1, "value")
+        now[0] += 59
+        assert values.get(1) == "value"
+        now[0] += 2
+        assert values.get(1) is None
+
+    def test_value_computed_across_a_write_is_not_stored(self):
+        values = UserCache("test_race")
+
+        def compute():
+            # Another request writes while this one computes
+            invalidate_user(1)
+            return "stale"
+
+        assert values.get_or_compute(1, compute) == "stale"
+        assert values.get(1) is None
+
+    def test_narrowed_invalidation_keeps_other_keys(self):
+        values = UserCache("test_keys")
+        values.set(1, "2024", key=2024)
+        values.set(1, "2025", key=2025)
+        invalidate_user(1, keys={"test_keys": [2025]})
+        assert values.get(1, key=2024) == "2024"
+        assert values.get(1, key=2025) is None
+
+    def test_advance_applies_only_the_next_write(self):
+        values = UserCache("test_advance", invalidate_on_write=False)
+        values.set(1, ["a"])
+        generation = invalidate_user(1)
+        values.advance(1, generation, lambda value: value.append("b"))
+        assert values.get(1) == ["a", "b"]
+
+        # A write this process didn't apply
+        invalidate_user(1)
+        generation = invalidate_user(1)
+        values.advance(1, generation, lambda value: value.append("c"))
+        assert values.get(1) is None
+
+class TestSharedGenerations:
+    def test_write_in_another_process_invalidates(self, shared):
+        values = UserCache("test_shared")
+        values.set(1, "value")
+        values.set(2, "other user")
+        shared.bump(1)
+        assert values.get(1) is None
+        assert values.get(2) == "other user"
+
+    def test_unreachable_store_computes_uncached(self, shared, monkeypatch):
+        values = UserCache("test_down")
+        values.set(1, "value")
+
+        def down(user_id):
+            raise ConnectionError("redis is down")
+        monkeypatch.setattr(cache._generations, "get", down)
+        assert values.get(1) is None
+        assert values.get_or_compute(1, lambda: "fresh") == "fresh"
+        assert values.get_or_compute(1, lambda: "again") == "again"
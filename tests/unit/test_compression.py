@@ -0,0 +1,36 @@
+import gzip
+import pytest
+from src import compression
+from src.compression import EncodedBody, negotiate
+
+class TestNegotiate:
+    def test_prefers_brotli_when_available(self, monkeypatch):
+        monkeypatch.setattr(compression, "supported_encodings", lambda: ("br", "gzip"))
+        assert negotiate("gzip, deflate, br") == "br"
+    
+    def test_gzip_only_server(self, monkeypatch):
+        monkeypatch.setattr(compression, "supported_encodings", lambda: ("gzip",))
+        assert negotiate("gzip, br") == "gzip"
+    
+    def test_quality_values(self, monkeypatch):
+        monkeypatch.setattr(compression, "supported_encodings", lambda: ("br", "gzip"))
+        assert negotiate("br;q=0.5, gzip;q=0.9") == "gzip"
+        assert negotiate("br;q=0, gzip;q=0") == "identity"
+        assert negotiate("*;q=0.1") == "br"
+    
+    def test_nothing_acceptable(self):
+        assert negotiate(None) == "identity"
+        assert negotiate("") == "identity"
+        assert negotiate("deflate") == "identity"
+
+class TestEncodedBody:
+    def test_each_coding_compressed_once(self, monkeypatch):
+        calls = []
+        real_compress = compression.compress
+        monkeypatch.setattr(compression, "compress", lambda body, encoding: calls.append(encoding) or real_compress(body, encoding))
+        
+        body = EncodedBody(b'{"counts": [' + b"0, " * 2000 + b"0]}")
+        first = body.get("gzip")
+        assert body.get("gzip") is first
+        assert calls == ["gzip"]
+        assert gzip.decompress(first) == body.get("identity")
@@ -0,0 +1,56 @@
+import csv
+import gzip
+import io
+import pytest
+from datetime import datetime
+from src import export
+from src.export import COLUMN_NAMES, export_chunks
+
+ROWS = [
+    (1, 10, datetime(2025, 1, 1, 9), datetime(2025, 1, 1, 10), 100, "Bench Press", datetime(2025, 1, 1, 9),
+     datetime(2025, 1, 1, 9, 30), 1000 + i, datetime(2025, 1, 1, 9, i), datetime(2025, 1, 1, 9, i, 40), 8, "high", 135 if i else None)
+    for i in range(5)
+]
+BATCHES = [ROWS[:2], ROWS[2:4], ROWS[4:]]
+
+class TestCsvExport:
+    def test_header_and_rows(self):
+        text = b"".join(export_chunks(iter(BATCHES), "csv")).decode()
+        rows = list(csv.reader(io.StringIO(text)))
+        assert tuple(rows[0]) == COLUMN_NAMES
+        assert len(rows) == 6
+        assert rows[1][5] == "Bench Press" and rows[1][13] == ""
+        assert rows[2][9] == "2025-01-01 09:01:00"
+    
+    def test_chunk_per_batch(self):
+        assert len(list(export_chunks(iter(BATCHES), "csv"))) == 3
+    
+    def test_gzip(self):
+        compressed = b"".join(export_chunks(iter(BATCHES), "csv.gz"))
+        assert gzip.decompress(compressed) == b"".join(export_chunks(iter(BATCHES), "csv"))
+
+class TestColumnarExport:
+    pyarrow = pytest.importorskip("pyarrow")
+    
+    def test_parquet_round_trip(self):
+        import pyarrow.parquet
+        data = b"".join(export_chunks(iter(BATCHES), "parquet"))
+        parquet = pyarrow.parquet.ParquetFile(io.BytesIO(data))
+        assert parquet.num_row_groups == 3
+        table = parquet.read()
+        assert table.column_names == list(COLUMN_NAMES)
+        assert table.column("weight").to_pylist() == [None, 135, 135, 135, 135]
+        assert table.column("set_started_at").to_pylist()[1] == datetime(2025, 1, 1, 9, 1)
+    
+    def test_arrow_stream(self):
+        import pyarrow.ipc
+        data = b"".join(export_chunks(iter(BATCHES), "arrow"))
+        table = pyarrow.ipc.open_stream(data).read_all()
+        assert table.num_rows == 5
+        assert table.column("intensity").to_pylist() == ["high"] * 5
+    
+    def test_without_pyarrow(self, monkeypatch):
+        monkeypatch.setattr(export, "pyarrow", None)
+        assert export.available_formats() == ["csv", "csv.gz"]
+        with pytest.raises(RuntimeError):
+            list(export_chunks(iter(BATCHES), "parquet"))
@@ -0,0 +1,78 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import create_engine
+from src import health
+from src.health import HealthProber
+
+def _engine(path):
+    return create_engine(f"sqlite:///{path}", pool_size=2, max_overflow=0)
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+class TestHealthProber:
+    def test_ready_after_a_successful_probe(self, tmp_path):
+        engine = _engine(tmp_path / "ok.db")
+        prober = HealthProber(lambda: {"primary": engine})
+        assert prober.readiness()[0] is False
+        _run(prober.probe())
+        ready, report = prober.readiness()
+        assert ready
+        assert report["databases"]["primary"]["ok"]
+        assert report["databases"]["primary"]["latency_ms"] >= 0
+        assert report["databases"]["primary"]["pool"]["checked_out"] == 0
+
+    def test_failing_database_is_not_ready(self, tmp_path):
+        broken = create_engine(f"sqlite:///{tmp_path}/missing/dir/x.db")
+        prober = HealthProber(lambda: {"primary": _engine(tmp_path / "ok.db"), "shard-1": broken})
+        _run(prober.probe())
+        ready, report = prober.readiness()
+        assert not ready
+        assert report["databases"]["primary"]["ok"]
+        assert "unable to open" in report["databases"]["shard-1"]["error"]
+
+    def test_stale_probe_is_not_ready(self, tmp_path):
+        engine = _engine(tmp_path / "ok.db")
+        prober = HealthProber(lambda: {"primary": engine}, stale_after=10)
+        _run(prober.probe())
+        prober.probed_at -= 11
+        assert prober.readiness()[1]["status"] == "not ready"
+
+    def test_exhausted_pool_is_reported_without_waiting(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(health, "POOL_SIZE", 2)
+        monkeypatch.setattr(health, "MAX_OVERFLOW", 0)
+        engine = _engine(tmp_path / "ok.db")
+        held = [engine.connect(), engine.connect()]
+        prober = HealthProber(lambda: {"primary": engine})
+        _run(prober.probe())
+        ready, report = prober.readiness()
+        # Busy isn't unreachable: the instance stays in rotation
+        assert ready
+        assert report["databases"]["primary"]["skipped"] == "connection pool exhausted"
+        assert report["databases"]["primary"]["pool"]["saturation"] == 1.0
+        for conn in held:
+            conn.close()
+
+    def test_slow_probe_times_out(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(health, "probe_database", lambda engine: time.sleep(1) or {"ok": True, "latency_ms": 1000})
+        prober = HealthProber(lambda: {"primary": _engine(tmp_path / "ok.db")}, timeout=0.05)
+        started = time.perf_counter()
+        _run(prober.probe())
+        assert time.perf_counter() - started < 0.5
+        assert prober.results["primary"]["error"] == "probe timed out after 0.05s"
+
+    def test_live_while_the_loop_runs(self, tmp_path):
+        engine = _engine(tmp_path / "ok.db")
+
+        async def scenario():
+            prober = HealthProber(lambda: {"primary": engine}, interval=0.01)
+            assert prober.liveness()[0] is False
+            await prober.probe()
+            prober.start()
+            await asyncio.sleep(0.05)
+            live = prober.liveness()[0]
+            await prober.stop()
+            return live, prober.liveness()[0]
+
+        assert _run(scenario()) == (True, False)
@@ -0,0 +1,39 @@
+import pytest
+from benchmarks.loadtest import OperationStats, parse_mix, percentile
+
+class TestParseMix:
+    def test_weights(self):
+        assert parse_mix("login=1,create=2.5,list=7") == {"login": 1.0, "create": 2.5, "list": 7.0}
+    
+    def test_weight_defaults_to_one(self):
+        assert parse_mix("list") == {"list": 1.0}
+    
+    def test_unknown_operation(self):
+        with pytest.raises(ValueError):
+            parse_mix("login=1,delete=2")
+    
+    def test_all_zero(self):
+        with pytest.raises(ValueError):
+            parse_mix("login=0,list=0")
+
+class TestPercentiles:
+    def test_nearest_rank(self):
+        samples = list(range(1, 101))
+        assert percentile(samples, 50) == 50
+        assert percentile(samples, 95) == 95
+        assert percentile(samples, 99) == 99
+        assert percentile(samples, 100) == 100
+    
+    def test_small_and_empty(self):
+        assert percentile([3.0], 99) == 3.0
+        assert percentile([], 50) == 0.0
+    
+    def test_summary_counts_errors(self):
+        stats = OperationStats()
+        for seconds, status in ((0.01, 200), (0.02, 200), (0.03, 429), (0.04, "error")):
+            stats.record(seconds, status)
+        summary = stats.summary(elapsed=2.0)
+        assert summary["requests"] == 4
+        assert summary["errors"] == 2
+        assert summary["throughput_rps"] == 2.0
+        assert summary["statuses"] == {"200": 2, "429": 1, "error": 1}
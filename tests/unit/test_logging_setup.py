@@ -0,0 +1,90 @@
+import io
+import json
+import logging
+import pytest
+from src import logging_setup
+from src.logging_setup import DeferredQueueHandler, JsonFormatter, SamplingFilter, parse_sample_rates
+
+def make_record(name="src.test", level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+@pytest.fixture
+def pipeline():
+    """configure_logging() writing to a buffer, undone afterwards"""
+    root = logging.getLogger()
+    level = root.level
+    stream = io.StringIO()
+    yield stream
+    logging_setup.shutdown_logging()
+    root.setLevel(level)
+
+class TestJsonFormatter:
+    def test_fields_and_extra(self):
+        entry = json.loads(JsonFormatter().format(make_record(user_id=7)))
+        assert entry["message"] == "hello world"
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "src.test"
+        assert entry["user_id"] == 7
+        assert "args" not in entry and "msg" not in entry
+    
+    def test_exception(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("src.test", logging.ERROR, __file__, 1, "failed", None, __import__("sys").exc_info())
+        entry = json.loads(JsonFormatter().format(record))
+        assert "ValueError: boom" in entry["exception"]
+
+class TestSamplingFilter:
+    def test_parse_rates(self):
+        assert parse_sample_rates("src.routes.sessions=0.1, src.access=2") == {"src.routes.sessions": 0.1, "src.access": 1.0}
+        assert parse_sample_rates("") == {}
+    
+    def test_rate_zero_drops_info_but_not_warnings(self):
+        sampler = SamplingFilter({"src.routes": 0.0})
+        assert not sampler.filter(make_record("src.routes.sessions"))
+        assert sampler.filter(make_record("src.routes.sessions", level=logging.WARNING))
+        assert sampler.filter(make_record("src.records"))
+    
+    def test_kept_records_carry_rate(self, monkeypatch):
+        monkeypatch.setattr(logging_setup.random, "random", lambda: 0.05)
+        record = make_record("src.routes.sessions")
+        assert SamplingFilter({"src.routes.sessions": 0.1}).filter(record)
+        assert record.sample_rate == 0.1
+
+class TestDeferredQueueHandler:
+    def test_plain_arguments_are_formatted_later(self):
+        record = DeferredQueueHandler(None).prepare(make_record())
+        assert record.msg == "hello %s" and record.args == ("world",)
+    
+    def test_other_arguments_are_formatted_now(self):
+        class Mutable:
+            value = "before"
+            def __str__(self):
+                return self.value
+        
+        argument = Mutable()
+        record = DeferredQueueHandler(None).prepare(make_record(args=(argument,)))
+        argument.value = "after"
+        assert record.getMessage() == "hello before"
+
+class TestPipeline:
+    def test_records_written_by_background_thread(self, pipeline):
+        logging_setup.configure_logging(level="INFO", fmt="json", sample_rates="", stream=pipeline)
+        logger = logging.getLogger("src.test_pipeline")
+        logger.info("created %d sets", 3, extra={"user_id": 1})
+        logger.debug("not enabled")
+        logging_setup.shutdown_logging()
+        
+        entries = [json.loads(line) for line in pipeline.getvalue().splitlines()]
+        mine = [entry for entry in entries if entry["logger"] == "src.test_pipeline"]
+        assert mine == [{**mine[0], "message": "created 3 sets", "user_id": 1, "level": "INFO"}]
+    
+    def test_configure_twice_is_a_noop(self, pipeline):
+        logging_setup.configure_logging(stream=pipeline)
+        handlers = len(logging.getLogger().handlers)
+        logging_setup.configure_logging(stream=pipeline)
+        assert len(logging.getLogger().handlers) == handlers
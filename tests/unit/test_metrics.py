@@ -0,0 +1,25 @@
+import pytest
+from src.metrics import Histogram, Registry, RequestDbStats
+
+class TestHistogram:
+    def test_observe_buckets(self):
+        histogram = Histogram((1, 5, 10))
+        for value in (0.5, 1, 3, 7, 50):
+            histogram.observe(value)
+        assert histogram.counts == [2, 1, 1, 1]
+        assert histogram.count == 5
+        assert histogram.total == 61.5
+
+class TestRegistry:
+    def test_render_cumulative_buckets(self):
+        registry = Registry()
+        db = RequestDbStats()
+        db.queries = 3
+        registry.observe("GET", "/sessions/", 200, 0.02, 1500, db)
+        registry.observe("GET", "/sessions/", 200, 0.2, 1500, db)
+        text = registry.render()
+        assert 'http_requests_total{method="GET",route="/sessions/",status="200"} 2' in text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/sessions/",le="0.025"} 1' in text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/sessions/",le="0.25"} 2' in text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/sessions/",le="+Inf"} 2' in text
+        assert 'http_request_db_queries_sum{method="GET",route="/sessions/"} 6' in text
@@ -0,0 +1,83 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from src import processor
+from src.processor import InvalidRecord, iter_records, validate_records
+from tests.fixtures.test_data import export_record
+
+@pytest.fixture
+def records():
+    return [export_record(day, weight=100 + day) for day in range(25)]
+
+class TestIterRecords:
+    def test_json_lines(self, tmp_path, records):
+        path = tmp_path / "export.jsonl"
+        path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n\n", encoding="utf-8")
+        parsed = list(iter_records(str(path)))
+        assert [record for record, _ in parsed] == records
+        assert parsed[-1][1] == path.stat().st_size - 1
+    
+    def test_array_across_read_blocks(self, tmp_path, monkeypatch, records):
+        # Tiny reads make records straddle block (and multi-byte character) boundaries
+        monkeypatch.setattr(processor, "_READ_SIZE", 7)
+        path = tmp_path / "export.json"
+        path.write_text(json.dumps(records, indent=2, ensure_ascii=False), encoding="utf-8")
+        assert [record for record, _ in iter_records(str(path))] == records
+    
+    @pytest.mark.parametrize("suffix, dump", [
+        ("jsonl", lambda rs: "\n".join(json.dumps(r, ensure_ascii=False) for r in rs)),
+        ("json", lambda rs: json.dumps(rs, indent=1, ensure_ascii=False)),
+    ])
+    def test_resume_from_offset(self, tmp_path, records, suffix, dump):
+        path = tmp_path / f"export.{suffix}"
+        path.write_text(dump(records), encoding="utf-8")
+        offsets = [end for _, end in iter_records(str(path))]
+        resumed = [record for record, _ in iter_records(str(path), offsets[9])]
+        assert resumed == records[10:]
+        assert list(iter_records(str(path), offsets[-1])) == []
+    
+    def test_bad_line_becomes_invalidexport_record(self, tmp_path, records):
+        path = tmp_path / "export.jsonl"
+        path.write_text(json.dumps(records[0]) + "\n{not json\n" + json.dumps(records[1]) + "\n")
+        parsed = [record for record, _ in iter_records(str(path))]
+        assert parsed[0] == records[0] and parsed[2] == records[1]
+        assert isinstance(parsed[1], InvalidRecord)
+    
+    def test_truncated_array(self, tmp_path, records):
+        path = tmp_path / "export.json"
+        path.write_text(json.dumps(records)[:-40])
+        with pytest.raises(ValueError):
+            list(iter_records(str(path)))
+
+class TestValidateRecords:
+    def test_historical_sessions_accepted(self, records):
+        [(user_id, rows, bests)] = validate_records(records[:1])
+        started_at, finished_at, notes, workouts = rows
+        assert user_id == 7
+        # Stored as naive UTC like the rest of the tables
+        assert started_at == datetime(2020, 1, 1, 9) and started_at.tzinfo is None
+        assert workouts[0][0] == "Squats"
+        assert workouts[0][3][0][2:] == (5, "high", 100)
+        assert bests["Squats"]["heaviest_weight"] == 100
+    
+    def test_user_override(self, records):
+        [(user_id, _, _)] = validate_records(records[:1], user_id=3)
+        assert user_id == 3
+    
+    def test_errors_are_returned_perexport_record(self, records):
+        bad_intensity = export_record(0)
+        bad_intensity["session"]["workouts"][0]["sets"][0]["reps"]["intensity"] = "extreme"
+        no_owner = export_record(0)
+        del no_owner["session"]["user_id"]
+        results = validate_records([records[0], bad_intensity, no_owner, InvalidRecord("invalid JSON"), [1, 2]])
+        assert not isinstance(results[0], str)
+        assert "intensity" in results[1].lower()
+        assert results[2] == "record has no user_id"
+        assert results[3] == "invalid JSON"
+        assert results[4] == "record is not a JSON object"
+    
+    def test_future_dates_still_rejected(self):
+        future = datetime.now() + timedelta(days=800)
+        record = export_record(0, started_at=future.isoformat(), finished_at=(future + timedelta(hours=1)).isoformat())
+        [error] = validate_records([record])
+        assert "future" in error
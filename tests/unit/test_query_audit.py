@@ -0,0 +1,7 @@
+from src.query_audit import statement_shape
+
+class TestStatementShape:
+    def test_values_and_in_lists_collapse(self):
+        first = statement_shape("SELECT * FROM sets WHERE id IN (%(id_1_1)s, %(id_1_2)s) AND weight > 100")
+        second = statement_shape("SELECT *  FROM sets\nWHERE id IN (%(id_1_1)s) AND weight > 225")
+        assert first == second == "SELECT * FROM sets WHERE id IN (...) AND weight > ?"
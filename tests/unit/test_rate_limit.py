@@ -0,0 +1,68 @@
+import pytest
+from datetime import timedelta
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from starlette.requests import Request as StarletteRequest
+from src.auth import create_access_token, create_refresh_token
+from src.rate_limit import create_limiter, rate_limit_key
+
+def make_request(authorization=None, client=("203.0.113.7", 1234)):
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return StarletteRequest({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": client})
+
+def limited_app(limiter):
+    """A one-route app, standing in for one worker process"""
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    
+    @app.get("/")
+    @limiter.limit("2/minute")
+    def root(request: Request):
+        return {}
+    
+    return app
+
+class TestRateLimitKey:
+    def test_authenticated_user(self):
+        token = create_access_token({"sub": "alice"})
+        assert rate_limit_key(make_request(f"Bearer {token}")) == "user:alice"
+    
+    def test_anonymous_uses_address(self):
+        assert rate_limit_key(make_request()) == "ip:203.0.113.7"
+    
+    def test_invalid_token_uses_address(self):
+        assert rate_limit_key(make_request("Bearer not-a-jwt")) == "ip:203.0.113.7"
+    
+    def test_expired_token_uses_address(self):
+        token = create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=-1))
+        assert rate_limit_key(make_request(f"Bearer {token}")) == "ip:203.0.113.7"
+    
+    def test_refresh_token_uses_address(self):
+        token = create_refresh_token({"sub": "alice"})
+        assert rate_limit_key(make_request(f"Bearer {token}")) == "ip:203.0.113.7"
+
+class TestSharedStorage:
+    def test_workers_share_counters(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = pytest.importorskip("redis")
+        # Local stand-in for a Redis server, shared by both "workers"
+        server = fakeredis.FakeServer()
+        
+        def worker():
+            pool = redis.ConnectionPool(connection_class=fakeredis.FakeRedisConnection, server=server)
+            return TestClient(limited_app(create_limiter("redis://", {"connection_pool": pool}, enabled=True)))
+        
+        first, second = worker(), worker()
+        assert first.get("/").status_code == 200
+        assert second.get("/").status_code == 200
+        assert first.get("/").status_code == 429
+        assert second.get("/").status_code == 429
+    
+    def test_memory_storage_is_per_process(self):
+        first = TestClient(limited_app(create_limiter("memory://", enabled=True)))
+        second = TestClient(limited_app(create_limiter("memory://", enabled=True)))
+        assert [first.get("/").status_code for _ in range(3)] == [200, 200, 429]
+        assert second.get("/").status_code == 200
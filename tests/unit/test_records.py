@@ -0,0 +1,52 @@
+import pytest
+from datetime import datetime
+from src.db_models import SessionDB, WorkoutDB, SetDB, RepsDB
+from src.records import estimate_one_rep_max, session_bests
+
+def _session(*workouts):
+    now = datetime(2025, 5, 23, 9, 0)
+    db_session = SessionDB(started_at=now, finished_at=now)
+    for name, sets in workouts:
+        workout = WorkoutDB(name=name, started_at=now, finished_at=now)
+        for count, weight in sets:
+            set_ = SetDB(started_at=now, finished_at=now)
+            set_.reps = RepsDB(count=count, intensity="medium", weight=weight)
+            workout.sets.append(set_)
+        db_session.workouts.append(workout)
+    return db_session
+
+class TestEstimateOneRepMax:
+    def test_single_rep_is_the_weight(self):
+        assert estimate_one_rep_max(225, 1) == 225.0
+    
+    def test_epley_formula(self):
+        assert estimate_one_rep_max(135, 10) == 180.0
+    
+    def test_bodyweight_has_no_estimate(self):
+        assert estimate_one_rep_max(None, 10) is None
+        assert estimate_one_rep_max(0, 10) is None
+
+class TestSessionBests:
+    def test_bests_per_exercise(self):
+        bests = session_bests(_session(
+            ("Bench Press", [(10, 135), (5, 185), (5, 185)]),
+            ("Pull-ups", [(12, None), (8, None)]),
+        ))
+        bench = bests["Bench Press"]
+        assert bench["heaviest_weight"] == 185
+        assert bench["heaviest_weight_reps"] == 5
+        assert bench["most_reps"] == 10
+        assert bench["most_reps_weight"] == 135
+        assert bench["session_volume"] == 10 * 135 + 2 * 5 * 185
+        
+        pullups = bests["Pull-ups"]
+        assert pullups["heaviest_weight"] is None
+        assert pullups["most_reps"] == 12
+        assert pullups["session_volume"] == 0
+    
+    def test_repeated_exercise_volume_is_combined(self):
+        bests = _session(
+            ("Squats", [(5, 225)]),
+            ("Squats", [(5, 245)]),
+        )
+        assert session_bests(bests)["Squats"]["session_volume"] == 5 * 225 + 5 * 245
@@ -0,0 +1,48 @@
+import argparse
+import pytest
+from serve import gunicorn_command, plan_workers, server_backend
+
+class TestPlanWorkers:
+    def test_two_per_cpu_plus_one(self):
+        plan = plan_workers(2, pool_size=5, max_overflow=5, db_max_connections=1000)
+        assert plan == {"workers": 5, "threads": 10, "connections": 50}
+    
+    def test_capped_by_database_connections(self):
+        plan = plan_workers(16, pool_size=5, max_overflow=10, db_max_connections=90)
+        assert plan["workers"] == 6
+        assert plan["connections"] == 90
+    
+    def test_at_least_one_worker(self):
+        assert plan_workers(4, pool_size=50, max_overflow=50, db_max_connections=20)["workers"] == 1
+    
+    def test_explicit_counts_win(self):
+        plan = plan_workers(8, pool_size=5, max_overflow=10, workers=2, threads=4)
+        assert plan["workers"] == 2
+        assert plan["threads"] == 4
+        assert plan["connections"] == 30
+
+class TestGunicornCommand:
+    def _args(self, **overrides):
+        values = dict(host="127.0.0.1", port=9000, backlog=2048, keep_alive=5, graceful_timeout=30,
+                      log_level="warning", preload=False, max_requests=0)
+        values.update(overrides)
+        return argparse.Namespace(**values)
+    
+    def test_uvicorn_workers_on_the_factory(self):
+        command = gunicorn_command(self._args(), {"workers": 3})
+        assert "main:create_app()" in command
+        assert command[command.index("--worker-class") + 1] == "uvicorn.workers.UvicornWorker"
+        assert command[command.index("--workers") + 1] == "3"
+        assert "--preload" not in command
+    
+    def test_preload_and_recycling(self):
+        command = gunicorn_command(self._args(preload=True, max_requests=1000), {"workers": 1})
+        assert "--preload" in command
+        assert command[command.index("--max-requests") + 1] == "1000"
+        assert command[command.index("--max-requests-jitter") + 1] == "100"
+
+def test_preload_needs_gunicorn(monkeypatch):
+    monkeypatch.setattr("serve.find_spec", lambda name: None)
+    assert server_backend() == "uvicorn"
+    with pytest.raises(SystemExit):
+        server_backend(preload=True)
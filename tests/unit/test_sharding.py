@@ -0,0 +1,138 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from src.database.database import Base, ShardedSession, ShardMoving, SHARD_MOVING, default_shard
+from src.database.sharding import place_user, move_user, plan_moves, stub_user
+from src.db_models import User, SessionDB, WorkoutDB, SetDB, RepsDB, PersonalRecordDB
+
+def _engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def foreign_keys(conn, _):
+        conn.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+@pytest.fixture
+def databases(tmp_path):
+    directory = _engine(tmp_path / "directory.db")
+    shards = [_engine(tmp_path / "shard0.db"), _engine(tmp_path / "shard1.db")]
+    return directory, shards
+
+def _count(engine, model, user_id=None):
+    query = select(func.count()).select_from(model)
+    if user_id is not None:
+        query = query.where(model.user_id == user_id)
+    with engine.connect() as conn:
+        return conn.execute(query).scalar()
+
+def _create_user(directory, shards, username):
+    db = sessionmaker(class_=ShardedSession)(bind=directory, directory=directory, shards=shards)
+    user = User(username=username, email=f"{username}@example.com", password_hash="x")
+    db.add(user)
+    place_user(db, user)
+    db.commit()
+    user_id, shard = user.id, user.shard
+    db.close()
+    return user_id, shard
+
+def _add_session(directory, shards, user_id, record=True):
+    db = sessionmaker(class_=ShardedSession)(bind=directory, directory=directory, shards=shards)
+    db.route_to(db.get(User, user_id))
+    now = datetime(2025, 5, 23, 9, 0)
+    session = SessionDB(user_id=user_id, started_at=now, finished_at=now)
+    workout = WorkoutDB(name="Squat", started_at=now, finished_at=now)
+    set_ = SetDB(started_at=now, finished_at=now)
+    set_.reps = RepsDB(count=5, intensity="high", weight=225)
+    workout.sets.append(set_)
+    session.workouts.append(workout)
+    db.add(session)
+    if record:
+        db.add(PersonalRecordDB(user_id=user_id, exercise="Squat", heaviest_weight=225, heaviest_weight_reps=5))
+    db.commit()
+    db.close()
+
+class TestRouting:
+    def test_data_goes_to_the_users_shard(self, databases):
+        directory, shards = databases
+        user_id, shard = _create_user(directory, shards, "alice")
+        assert shard == default_shard(user_id, 2)
+        _add_session(directory, shards, user_id)
+        assert _count(shards[shard], SessionDB, user_id) == 1
+        assert _count(shards[shard], PersonalRecordDB, user_id) == 1
+        assert _count(shards[1 - shard], SessionDB) == 0
+        assert _count(directory, SessionDB) == 0
+
+    def test_unrouted_session_refuses_sharded_tables(self, databases):
+        directory, shards = databases
+        db = sessionmaker(class_=ShardedSession)(bind=directory, directory=directory, shards=shards)
+        with pytest.raises(RuntimeError):
+            db.execute(select(SessionDB))
+        db.close()
+
+    def test_moving_user_is_not_routed(self, databases):
+        directory, shards = databases
+        db = sessionmaker(class_=ShardedSession)(bind=directory, directory=directory, shards=shards)
+        with pytest.raises(ShardMoving):
+            db.route_to(User(id=1, shard=SHARD_MOVING))
+
+    def test_unsharded_session_is_a_plain_session(self, databases):
+        directory, _ = databases
+        db = sessionmaker(class_=ShardedSession)(bind=directory)
+        db.route_to(User(id=1))
+        assert db.get_bind(SessionDB.__mapper__) is directory
+
+class TestMoveUser:
+    def test_moves_every_row(self, databases):
+        directory, shards = databases
+        user_id, source = _create_user(directory, shards, "alice")
+        _add_session(directory, shards, user_id)
+        _add_session(directory, shards, user_id, record=False)
+        target = 1 - source
+
+        # 2 sessions, workouts, sets and reps, and 1 record
+        assert move_user(directory, shards, user_id, target) == 9
+        with directory.connect() as conn:
+            assert conn.execute(select(User.shard).where(User.id == user_id)).scalar() == target
+        for model in (SessionDB, WorkoutDB, SetDB, RepsDB, PersonalRecordDB):
+            assert _count(shards[source], model) == 0
+        assert _count(shards[target], SessionDB, user_id) == 2
+        assert _count(shards[target], RepsDB) == 2
+
+        # Routed to the new shard from now on
+        _add_session(directory, shards, user_id, record=False)
+        assert _count(shards[target], SessionDB, user_id) == 3
+
+    def test_failed_copy_leaves_the_user_in_place(self, databases):
+        directory, shards = databases
+        user_id, source = _create_user(directory, shards, "alice")
+        _add_session(directory, shards, user_id)
+        target = 1 - source
+        # A leftover stub makes the copy fail
+        with shards[target].begin() as conn:
+            conn.execute(insert(User).values(**stub_user(user_id)))
+
+        with pytest.raises(Exception):
+            move_user(directory, shards, user_id, target)
+        with directory.connect() as conn:
+            assert conn.execute(select(User.shard).where(User.id == user_id)).scalar() == source
+        assert _count(shards[source], SessionDB, user_id) == 1
+        assert _count(shards[target], SessionDB) == 0
+
+def test_plan_moves_evens_out_shards():
+    loads = {0: {1: 50, 2: 30, 3: 20}, 1: {4: 10}, 2: {}}
+    moves = plan_moves(loads)
+    for user_id, source, target in moves:
+        loads[target][user_id] = loads[source].pop(user_id)
+    totals = sorted(sum(users.values()) for users in loads.values())
+    assert totals == [30, 30, 50]
+
+def test_plan_moves_leaves_balanced_shards_alone():
+    assert plan_moves({0: {1: 10}, 1: {2: 10}}) == []
+
+def test_default_shard_is_stable():
+    assert [default_shard(user_id, 4) for user_id in range(1, 6)] == [default_shard(user_id, 4) for user_id in range(1, 6)]
+    assert len({default_shard(user_id, 4) for user_id in range(1, 100)}) == 4
@@ -0,0 +1,29 @@
+import pytest
+from src.suggest import PrefixIndex
+
+class TestPrefixIndex:
+    def test_prefix_matches_ranked_by_count(self):
+        index = PrefixIndex({"Bench Press": 5, "Bent-over Row": 9, "Squats": 20})
+        assert index.search("ben") == [("Bent-over Row", 9), ("Bench Press", 5)]
+    
+    def test_case_insensitive(self):
+        index = PrefixIndex({"Bench Press": 5})
+        assert index.search("BENCH") == [("Bench Press", 5)]
+    
+    def test_no_match(self):
+        index = PrefixIndex({"Bench Press": 5})
+        assert index.search("dead") == []
+    
+    def test_empty_prefix_returns_top_names(self):
+        index = PrefixIndex({"A": 1, "B": 3, "C": 2})
+        assert index.search("", limit=2) == [("B", 3), ("C", 2)]
+    
+    def test_add_updates_counts_and_new_names(self):
+        index = PrefixIndex({"Bench Press": 1})
+        index.add(["Bench Press", "Bench Dips", "Bench Press"])
+        assert index.search("bench") == [("Bench Press", 3), ("Bench Dips", 1)]
+    
+    def test_remove_decrements_and_drops_unused_names(self):
+        index = PrefixIndex({"Bench Press": 2, "Bench Dips": 1})
+        index.remove(["Bench Press", "bench dips", "Squat"])
+        assert index.search("bench") == [("Bench Press", 1)]
@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+from datetime import date
+from src.analytics.history import history_from_rows
+from src.analytics.training_load import (
+    daily_volume,
+    rolling_mean,
+    acute_chronic_ratio,
+    ewma,
+    weekly_volume,
+    compute_training_load
+)
+
+DAY = 86400
+# 2025-01-06 is a Monday
+MONDAY = 1736121600
+
+def _history(*sets):
+    return history_from_rows([(MONDAY + day * DAY + 3600, volume, code) for day, volume, code in sets])
+
+class TestDailyVolume:
+    def test_bins_sets_into_days(self):
+        days, volume = daily_volume(_history((0, 100, 1), (0, 50, 2), (3, 200, 0)))
+        assert len(days) == 4
+        assert str(days[0]) == "2025-01-06"
+        assert volume.tolist() == [150, 0, 0, 200]
+    
+    def test_extends_to_end_date(self):
+        days, volume = daily_volume(_history((0, 100, 1)), end=date(2025, 1, 9))
+        assert str(days[-1]) == "2025-01-09"
+        assert volume.tolist() == [100, 0, 0, 0]
+    
+    def test_empty_history(self):
+        days, volume = daily_volume(history_from_rows([]))
+        assert len(days) == 0 and len(volume) == 0
+
+class TestRatios:
+    def test_rolling_mean(self):
+        assert rolling_mean(np.array([7.0, 7.0, 7.0, 0.0]), 2).tolist() == [3.5, 7.0, 7.0, 3.5]
+    
+    def test_steady_load_has_unit_ratio(self):
+        ratio = acute_chronic_ratio(np.full(60, 100.0))
+        assert ratio[-1] == pytest.approx(1.0)
+    
+    def test_no_chronic_load_is_nan(self):
+        assert np.isnan(acute_chronic_ratio(np.zeros(30))).all()
+
+class TestEwma:
+    def test_matches_recurrence(self):
+        values = np.random.default_rng(0).random(3000) * 1000
+        decay = np.exp(-1 / 7)
+        expected, previous = [], 0.0
+        for value in values:
+            previous = decay * previous + (1 - decay) * value
+            expected.append(previous)
+        assert ewma(values, 7) == pytest.approx(expected, rel=1e-9)
+    
+    def test_short_time_constant_stays_finite(self):
+        assert np.isfinite(ewma(np.ones(10000), 0.5)).all()
+
+class TestWeeklyVolume:
+    def test_weeks_split_by_intensity(self):
+        history = _history((0, 100, 0), (2, 50, 2), (8, 70, 1))
+        days, _ = daily_volume(history)
+        week_starts, volume = weekly_volume(days, history)
+        assert [str(week) for week in week_starts] == ["2025-01-06", "2025-01-13"]
+        assert volume.tolist() == [[100, 0, 50], [0, 70, 0]]
+
+def test_compute_training_load_series_align():
+    load = compute_training_load(_history((0, 100, 1), (10, 100, 1)))
+    for series in ("daily_volume", "acwr", "fitness", "fatigue", "form"):
+        assert len(load[series]) == len(load["days"])